@@ -1,7 +1,7 @@
 import os
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -16,6 +16,129 @@ class Settings(BaseSettings):
 
     # Настройки GigaChat
     GIGACHAT_CREDENTIALS: str
+    # Модель для оценки; None — модель SDK по умолчанию
+    GIGACHAT_MODEL: Optional[str] = None
+    # Не больше стольких одновременных запросов к GigaChat на все процессы
+    GIGACHAT_MAX_CONCURRENCY: int = 4
+    # Ограничение частоты запросов на все процессы: в секунду и допустимый
+    # всплеск (0 — без ограничения)
+    GIGACHAT_RATE_LIMIT: float = 2.0
+    GIGACHAT_RATE_BURST: int = 4
+    # Сколько процессов делят эти лимиты (воркеры gunicorn, воркер очереди,
+    # переоценка): каждый процесс получает свою долю
+    GIGACHAT_PROCESSES: int = 4
+    # Таймаут одного запроса к GigaChat, секунды
+    GIGACHAT_REQUEST_TIMEOUT: float = 30.0
+    # Бюджет времени HTTP-запроса к API, секунды: ожидание очереди, запросы
+    # к модели и повторы укладываются в него (меньше timeout gunicorn)
+    REQUEST_DEADLINE_SECONDS: float = 60.0
+    # Hedging: если ответа нет дольше квантиля GIGACHAT_HEDGE_QUANTILE недавних
+    # задержек (но не раньше GIGACHAT_HEDGE_MIN_DELAY с), отправляем второй
+    # запрос и берём первый ответ. Нужно GIGACHAT_HEDGE_MIN_SAMPLES замеров.
+    GIGACHAT_HEDGE_ENABLED: bool = False
+    GIGACHAT_HEDGE_QUANTILE: float = 0.95
+    GIGACHAT_HEDGE_MIN_DELAY: float = 2.0
+    GIGACHAT_HEDGE_MIN_SAMPLES: int = 20
+    # Предохранитель: окно наблюдения (с), минимум запросов в окне,
+    # доля ошибок и медленных ответов для размыкания, порог медленного
+    # ответа (с) и время до пробного запроса (с)
+    GIGACHAT_BREAKER_WINDOW: float = 60.0
+    GIGACHAT_BREAKER_MIN_REQUESTS: int = 5
+    GIGACHAT_BREAKER_FAILURE_RATIO: float = 0.5
+    GIGACHAT_BREAKER_SLOW_SECONDS: float = 20.0
+    GIGACHAT_BREAKER_OPEN_SECONDS: float = 30.0
+
+    # Предварительный локальный отбор ответов перед GigaChat
+    PRESCORE_ENABLED: bool = True
+    # Ответ короче стольких значимых слов оценивается в 0 без модели
+    PRESCORE_MIN_TERMS: int = 2
+    # TF-IDF сходство с эталоном: ниже — ответ не по теме (0),
+    # не ниже — ответ совпадает с эталоном (1.0)
+    PRESCORE_OFF_TOPIC_SIMILARITY: float = 0.05
+    PRESCORE_ACCEPT_SIMILARITY: float = 0.9
+
+    # Промпт оценки: grounded — эталон из базы передаётся модели, и она не
+    # генерирует правильный ответ заново; full — прежний промпт с генерацией
+    EVALUATION_PROMPT_MODE: str = "grounded"
+    # Ответ модели вызовом функции со строгой схемой вместо JSON в тексте
+    EVALUATION_STRUCTURED_OUTPUT: bool = True
+
+    # Бэкенд оценки: gigachat, local (без сети) или http (внешний сервис,
+    # например заглушка benchmarks/evaluator_stub.py для нагрузочных тестов)
+    EVALUATOR_BACKEND: str = "gigachat"
+    EVALUATOR_HTTP_URL: str = "http://localhost:8100"
+    EVALUATOR_HTTP_TIMEOUT: float = 30.0
+    # Каскад (EVALUATOR_BACKEND=cascade): сначала дешёвая оценка — local или
+    # лёгкая модель (model, EVALUATION_CASCADE_LIGHT_MODEL); полной модели
+    # передаются только ответы с оценкой в полосе неуверенности [LOW, HIGH]
+    EVALUATION_CASCADE_FIRST_TIER: str = "local"
+    EVALUATION_CASCADE_LIGHT_MODEL: str = "GigaChat"
+    EVALUATION_CASCADE_LOW: float = 0.3
+    EVALUATION_CASCADE_HIGH: float = 0.7
+
+    # Подготовка к оценке при выдаче вопроса (GET /interview/question):
+    # вектор эталона, части промпта и, если эталона нет, правильный ответ
+    PREFETCH_ENABLED: bool = True
+    # Не больше стольких фоновых подготовок одновременно на воркер
+    PREFETCH_MAX_TASKS: int = 16
+    # Генерировать правильный ответ заранее (тратит токены, только когда
+    # очередь к модели пуста)
+    PREFETCH_GENERATE_REFERENCE: bool = True
+    PREFETCH_TIMEOUT: float = 30.0
+
+    # Кэш банка вопросов: как часто сверять версию банка с базой, секунды
+    QUESTION_BANK_CHECK_INTERVAL: float = 5.0
+    # Выбор вопросов интервью: weighted — пропорционально chance (частоте
+    # вопроса на собеседованиях), uniform — равновероятно
+    QUESTION_SAMPLING: str = "weighted"
+    # Интервальное повторение: в интервью попадают вопросы, на которые
+    # пользователь ответил ниже проходного балла, и вопросы, которые пора
+    # повторить (user_question_reviews), — не больше доли ADAPTIVE_REVIEW_SHARE.
+    # Остальные вопросы — новые или давно не повторявшиеся
+    ADAPTIVE_SELECTION_ENABLED: bool = True
+    ADAPTIVE_REVIEW_SHARE: float = 0.5
+    # Сколько раз добирать кандидатов, отбрасывая недавно освоенные вопросы
+    ADAPTIVE_FILL_ROUNDS: int = 3
+    # Расписание повторения (триггер на user_answers, app.interview.review_schedule):
+    # ответ ниже REVIEW_PASS_SCORE — к повторению сразу, после n верных
+    # ответов подряд — через REVIEW_BASE_INTERVAL_DAYS * 2^(n-1) дней, но не
+    # реже REVIEW_MAX_INTERVAL_DAYS. Применяется при старте приложения
+    REVIEW_PASS_SCORE: float = 0.6
+    REVIEW_BASE_INTERVAL_DAYS: float = 1.0
+    REVIEW_MAX_INTERVAL_DAYS: float = 90.0
+    # Вопросы завершённых интервью не повторяются в ближайших интервью:
+    # они копятся в битовом множестве пользователя двумя поколениями по
+    # RECENT_QUESTIONS_GENERATION вопросов (не больше четверти банка)
+    RECENT_QUESTIONS_ENABLED: bool = True
+    RECENT_QUESTIONS_GENERATION: int = 50
+
+    # Максимальная длина ответа в запросе: длиннее — сразу 422
+    ANSWER_MAX_LENGTH: int = 20000
+    # Бюджет ответа в промпте оценки, символы (0 — без ограничения); длинные
+    # ответы сокращаются (app.services.answer_budget). Для отдельных типов
+    # вопросов — EVALUATION_INPUT_BUDGETS, например {"golangquestions": 6000}
+    EVALUATION_INPUT_BUDGET: int = 4000
+    EVALUATION_INPUT_BUDGETS: Dict[str, int] = {}
+
+    # Кэш оценок: размер in-process LRU на воркер
+    EVALUATION_CACHE_SIZE: int = 1024
+    # Объединять одинаковые одновременные оценки между воркерами
+    # advisory-блокировкой Postgres (внутри процесса объединяются всегда)
+    EVALUATION_SINGLE_FLIGHT_DB: bool = False
+
+    # Режим оценки ответов: sync — в запросе, queue — воркером (python -m app.worker)
+    EVALUATION_MODE: str = "sync"
+    # Сколько ответов воркер оценивает одновременно
+    EVALUATION_WORKER_CONCURRENCY: int = 4
+    # Пауза между опросами пустой очереди, секунды
+    EVALUATION_WORKER_POLL_INTERVAL: float = 1.0
+    # Через сколько секунд задание в processing считается брошенным
+    EVALUATION_JOB_LOCK_TIMEOUT: int = 300
+    # Максимум попыток оценки одного ответа
+    EVALUATION_JOB_MAX_ATTEMPTS: int = 3
+
+    # Режим экзамена: сколько ответов оценивать одним запросом к модели
+    EXAM_BATCH_SIZE: int = 5
 
     @property
     def DATABASE_URL(self) -> str:
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.dao.session_maker import SessionDep
 from app.history.schemas import (
@@ -7,6 +9,9 @@ from app.history.schemas import (
     InterviewHistoryItem,
 )
 from app.history.dao import InterviewHistoryDAO
+from app.interview.dao import UserAnswerDAO
+from app.interview.schemas import UserAnswer
+from app.services.feedback import EVALUATION_FIELDS, render_feedback
 from app.auth.dependencies import get_current_user
 from app.auth.models import User
 from fastapi_versioning import version
@@ -15,6 +20,21 @@ from fastapi_versioning import version
 router = APIRouter(prefix="/history", tags=["history"])
 
 
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Список полей оценки из параметра ?fields=score,strengths"""
+    if fields is None:
+        return None
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in EVALUATION_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестные поля оценки: {', '.join(unknown)}. "
+            f"Допустимые: {', '.join(EVALUATION_FIELDS)}",
+        )
+    return selected
+
+
 @router.get("", response_model=InterviewHistoryList)
 async def get_interview_history(
     current_user: User = Depends(get_current_user), session: AsyncSession = SessionDep
@@ -39,10 +59,16 @@ async def get_interview_history(
 @router.get("/{interview_id}", response_model=InterviewHistoryDetail)
 async def get_interview_detail(
     interview_id: int,
+    fields: Optional[str] = Query(
+        None,
+        description="Поля оценки через запятую; без параметра — "
+        "обратная связь текстом",
+    ),
     current_user: User = Depends(get_current_user),
     session: AsyncSession = SessionDep,
 ):
     """Получить детальную информацию об интервью"""
+    selected = _parse_fields(fields)
     interview = await InterviewHistoryDAO.get_user_interview_detail(
         session, current_user.id, interview_id
     )
@@ -53,10 +79,26 @@ async def get_interview_detail(
             detail="Интервью не найдено или не принадлежит текущему пользователю",
         )
 
+    # Обратная связь собирается из оценки при чтении и только из нужных полей
+    evaluations = await UserAnswerDAO.load_evaluations(
+        session, interview.answers, selected
+    )
+    answers = []
+    for answer in interview.answers:
+        item = UserAnswer.model_validate(answer).model_copy(
+            update={"feedback": None, "evaluation": None}
+        )
+        evaluation = evaluations[answer.id]
+        if selected is None:
+            item.feedback = render_feedback(evaluation)
+        else:
+            item.evaluation = evaluation
+        answers.append(item)
+
     return InterviewHistoryDetail(
         id=interview.user_interview_id,
         date=interview.created_at,
         score=int(interview.total_score * 100) if interview.total_score else 0,
         feedback=interview.feedback,
-        answers=interview.answers,
+        answers=answers,
     )
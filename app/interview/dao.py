@@ -1,12 +1,61 @@
 from app.dao.base import BaseDAO
-from app.interview.models import PythonQuestion, GolangQuestion, Interview, UserAnswer
+from app.interview.models import (
+    PythonQuestion,
+    GolangQuestion,
+    Interview,
+    UserAnswer,
+    EvaluationCacheEntry,
+    EvaluationJob,
+    EvaluationJobStatus,
+    InterviewStatus,
+    UserQuestionReview,
+    UserRecentQuestions,
+)
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func, text, literal_column, and_, union_all
+from sqlalchemy import func, text, literal_column, and_, or_, union_all, delete
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload
-import random
-from typing import List, Optional, Tuple, Dict, Type, Any, Union
-from app.services.gigachat import GigaChatService
+import asyncio
+import hashlib
+from contextlib import ExitStack
+from typing import (
+    AsyncIterator,
+    List,
+    Sequence,
+    Optional,
+    Tuple,
+    Dict,
+    Type,
+    Any,
+    Union,
+)
+from app.config import settings
+from app.services.gigachat import (
+    FAILED_EVALUATION_MESSAGES,
+    PROVISIONAL_FEEDBACK_PREFIX,
+    is_not_know_answer,
+    needs_regrading,
+)
+from app.services.answer_budget import fit_answer
+from app.services.evaluators import evaluator
+from app.services.evaluation_cache import (
+    EvaluationCacheKey,
+    evaluation_cache,
+    make_cache_key,
+)
+from app.services.feedback import (
+    needs_reference,
+    pack_evaluation,
+    select_fields,
+    stored_evaluation,
+    unpack_evaluation,
+)
+from app.services.local_scorer import prescore_answer
+from app.services.metrics import metrics
+from app.services.question_bank import ExcludedIds, question_bank
+from app.services.recent_questions import RecentQuestions
+from app.services.single_flight import evaluation_flights
 import logging
 
 logger = logging.getLogger(__name__)
@@ -67,26 +116,15 @@ class QuestionDAO(BaseDAO):
         question_type: str = "pythonn",
         exclude_ids: List[int] = None,
     ) -> Optional[Any]:
-        """Получить случайный вопрос, исключая уже отвеченные"""
-        model = cls.get_model_by_type(question_type)
-        query = select(model)
-
-        if exclude_ids and len(exclude_ids) > 0:
-            query = query.filter(model.id.not_in(exclude_ids))
-
-        # Получаем общее количество вопросов
-        count_query = select(func.count()).select_from(query.subquery())
-        count = await session.scalar(count_query)
-
-        if count == 0:
-            return None
-
-        # Выбираем случайный вопрос
-        offset = random.randint(0, count - 1)
-        query = query.offset(offset).limit(1)
+        """
+        Получить случайный вопрос, исключая уже отвеченные.
 
-        result = await session.execute(query)
-        return result.scalar_one_or_none()
+        Выбор по плотному массиву id из кэша банка вопросов: без COUNT и
+        OFFSET, время не зависит от размера таблицы и списка исключений.
+        """
+        return await question_bank.random_question(
+            session, question_type, exclude_ids or ()
+        )
 
     @classmethod
     async def find_one_or_none_by_id(
@@ -98,6 +136,128 @@ class QuestionDAO(BaseDAO):
         result = await session.execute(query)
         return result.scalar_one_or_none()
 
+    @classmethod
+    async def get_cached_question(
+        cls, session: AsyncSession, question_id: int, question_type: str = "pythonn"
+    ) -> Optional[Any]:
+        """Найти вопрос в кэше банка вопросов (без запроса к таблице вопросов)"""
+        return await question_bank.get(session, question_type, question_id)
+
+    @classmethod
+    async def get_question_ids(
+        cls, session: AsyncSession, question_type: str = "pythonn"
+    ) -> Sequence[int]:
+        """ID всех вопросов типа из кэша банка вопросов"""
+        return await question_bank.ids(session, question_type)
+
+    @classmethod
+    async def select_questions(
+        cls,
+        session: AsyncSession,
+        question_type: str,
+        count: int,
+        user_id: Optional[int] = None,
+    ) -> List[int]:
+        """
+        Выбрать count разных вопросов для интервью (или все, если их меньше).
+
+        Случайные вопросы выбираются равновероятно или с учётом chance — по
+        настройке QUESTION_SAMPLING. Если передан user_id, выбор учитывает
+        пользователя (см. select_user_questions): при ADAPTIVE_SELECTION_ENABLED
+        часть интервью отдаётся вопросам на повторение, при
+        RECENT_QUESTIONS_ENABLED пропускаются вопросы последних интервью.
+        """
+        adaptive = settings.ADAPTIVE_SELECTION_ENABLED
+        if user_id is None or not (adaptive or settings.RECENT_QUESTIONS_ENABLED):
+            return await question_bank.select_questions(session, question_type, count)
+
+        recent = None
+        if settings.RECENT_QUESTIONS_ENABLED:
+            recent = await UserRecentQuestionsDAO.get(session, user_id, question_type)
+        return await cls.select_user_questions(
+            session, question_type, count, user_id, adaptive=adaptive, recent=recent
+        )
+
+    @classmethod
+    async def select_user_questions(
+        cls,
+        session: AsyncSession,
+        question_type: str,
+        count: int,
+        user_id: int,
+        adaptive: bool = True,
+        recent: Optional[RecentQuestions] = None,
+    ) -> List[int]:
+        """
+        Выбор вопросов с учётом истории пользователя.
+
+        adaptive — интервальное повторение: сначала до ADAPTIVE_REVIEW_SHARE
+        вопросов, срок повторения которых наступил (ответы ниже проходного
+        балла — сразу), в порядке срока. Остальные — случайные кандидаты из
+        банка без вопросов recent (последних интервью, проверка по битовому
+        множеству в памяти), из которых при adaptive отбрасываются освоенные
+        и ещё не подошедшие к повторению. Недавние вопросы выдаются, только
+        если других в банке не осталось. Запросы к базе читают только записи
+        повторения по индексу и по id кандидатов, поэтому их стоимость не
+        растёт с историей ответов пользователя.
+        """
+        table = await question_bank.table(session, question_type)
+        selected = []
+        if adaptive:
+            review_limit = min(count, round(count * settings.ADAPTIVE_REVIEW_SHARE))
+            due_ids = await UserQuestionReviewDAO.get_due_question_ids(
+                session, user_id, question_type, review_limit
+            )
+            # Вопросы, удалённые из банка, не выдаём
+            selected = [question_id for question_id in due_ids if question_id in table]
+        excluded = set(selected)
+        # Недавние вопросы не выбираются вовсе, а не отбрасываются после выбора
+        not_recent = ExcludedIds(excluded, recent) if recent is not None else excluded
+
+        for _ in range(settings.ADAPTIVE_FILL_ROUNDS):
+            needed = count - len(selected)
+            if needed <= 0:
+                break
+            # С запасом: часть кандидатов может оказаться освоенной
+            candidates = await question_bank.select_questions(
+                session,
+                question_type,
+                needed * 2 if adaptive else needed,
+                exclude_ids=not_recent,
+            )
+            if not candidates:
+                break
+            excluded.update(candidates)
+            scheduled = set()
+            if adaptive:
+                scheduled = await UserQuestionReviewDAO.get_scheduled_question_ids(
+                    session, user_id, question_type, candidates
+                )
+            fresh = [
+                question_id
+                for question_id in candidates
+                if question_id not in scheduled
+            ]
+            selected.extend(fresh[:needed])
+
+        # Новых вопросов не хватило — добираем освоенными, а если и их нет —
+        # недавними
+        for exclude_recent in (True, False):
+            if len(selected) >= count:
+                break
+            chosen = set(selected)
+            exclude = (
+                ExcludedIds(chosen, recent)
+                if exclude_recent and recent is not None
+                else chosen
+            )
+            selected.extend(
+                await question_bank.select_questions(
+                    session, question_type, count - len(selected), exclude_ids=exclude
+                )
+            )
+        return selected
+
     @classmethod
     async def count_questions(
         cls, session: AsyncSession, question_type: str = "pythonn"
@@ -169,6 +329,22 @@ class QuestionDAO(BaseDAO):
         result = await session.execute(query)
         return result.scalars().all()
 
+    @classmethod
+    async def get_answers_by_ids(
+        cls,
+        session: AsyncSession,
+        question_ids: List[int],
+        question_type: str = "pythonn",
+    ) -> Dict[int, str]:
+        """Эталонные ответы вопросов по списку ID и типу"""
+        if not question_ids:
+            return {}
+
+        model = cls.get_model_by_type(question_type)
+        query = select(model.id, model.answer).filter(model.id.in_(question_ids))
+        result = await session.execute(query)
+        return {question_id: answer for question_id, answer in result}
+
     @classmethod
     async def get_question_by_id_and_type(
         cls, session: AsyncSession, question_id: int, question_type: str
@@ -189,6 +365,15 @@ class QuestionDAO(BaseDAO):
         result = await session.execute(query)
         return result.scalar_one_or_none()
 
+    @classmethod
+    async def get_reference_answers(cls, session: AsyncSession) -> List[str]:
+        """Эталонные ответы всех вопросов банка (для локального отбора)"""
+        answers = []
+        for model in cls.question_models.values():
+            result = await session.execute(select(model.answer))
+            answers.extend(result.scalars().all())
+        return answers
+
 
 class InterviewDAO(BaseDAO):
     model = Interview
@@ -206,6 +391,25 @@ class InterviewDAO(BaseDAO):
         result = await session.execute(query)
         return result.scalar_one_or_none()
 
+    @classmethod
+    async def lock(
+        cls, session: AsyncSession, interview_id: int
+    ) -> Optional[Interview]:
+        """
+        Получить интервью с блокировкой строки (SELECT ... FOR UPDATE).
+
+        Конкурирующие транзакции, завершающие то же интервью, выполняются по
+        очереди: следующая после ожидания видит изменения предыдущей.
+        """
+        query = (
+            select(cls.model)
+            .filter(cls.model.id == interview_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        result = await session.execute(query)
+        return result.scalar_one_or_none()
+
     @classmethod
     async def calculate_interview_score(
         cls, session: AsyncSession, interview_id: int
@@ -218,6 +422,54 @@ class InterviewDAO(BaseDAO):
         avg_score = result.scalar_one_or_none()
         return avg_score if avg_score is not None else 0.0
 
+    @classmethod
+    def get_final_feedback(cls, total_score: float) -> str:
+        """Итоговая обратная связь по оценке интервью"""
+        if total_score > 0.8:
+            return "Отличный результат! Вы хорошо знаете материал."
+        elif total_score > 0.6:
+            return "Хороший результат! Подтяните некоторые темы для улучшения."
+        elif total_score > 0.4:
+            return "Средний результат. Рекомендуем повторить основные темы."
+        return "Результат ниже среднего. Рекомендуем дополнительное изучение материала."
+
+    @classmethod
+    async def complete_interview(
+        cls, session: AsyncSession, interview: Interview
+    ) -> tuple[float, str]:
+        """Завершить интервью: рассчитать итоговую оценку и обратную связь"""
+        total_score = await cls.calculate_interview_score(session, interview.id)
+        final_feedback = cls.get_final_feedback(total_score)
+
+        interview.status = InterviewStatus.COMPLETED
+        interview.total_score = total_score
+        interview.feedback = final_feedback
+        await session.flush()
+
+        if settings.RECENT_QUESTIONS_ENABLED:
+            await cls.remember_questions(session, interview)
+
+        return total_score, final_feedback
+
+    @classmethod
+    async def remember_questions(
+        cls, session: AsyncSession, interview: Interview
+    ) -> None:
+        """Добавить вопросы интервью в недавние вопросы пользователя"""
+        question_ids = await UserAnswerDAO.get_answered_question_ids(
+            session, interview.id
+        )
+        table = await question_bank.table(session, interview.question_type)
+        # В маленьком банке недавние вопросы не должны вытеснять все остальные
+        generation_size = min(settings.RECENT_QUESTIONS_GENERATION, len(table) // 4)
+        await UserRecentQuestionsDAO.add(
+            session,
+            interview.user_id,
+            interview.question_type,
+            question_ids,
+            generation_size,
+        )
+
 
 class UserAnswerDAO(BaseDAO):
     model = UserAnswer
@@ -246,12 +498,396 @@ class UserAnswerDAO(BaseDAO):
         session: AsyncSession,
         question: Union[PythonQuestion, GolangQuestion],
         user_answer: str,
-    ) -> tuple[float, str]:
-        """Оценить ответ пользователя с помощью GigaChat"""
-        gigachat_service = GigaChatService()
-        return await gigachat_service.evaluate_answer(
-            question=question.question, user_answer=user_answer
+    ) -> tuple[float, dict]:
+        """
+        Оценить ответ пользователя бэкендом оценки (EVALUATOR_BACKEND).
+
+        Возвращает оценку и поля обратной связи (app.services.feedback).
+
+        Сначала ищем оценку в кэше: in-process LRU, затем таблица
+        evaluation_cache, общая для всех воркеров. Одинаковые одновременные
+        запросы ждут одну оценку (single flight).
+        """
+        # Пустые ответы и ответы "не знаю" оцениваются без модели — кэш не нужен
+        if not user_answer.strip() or is_not_know_answer(user_answer):
+            return await evaluator.evaluate_answer(
+                question=question.question,
+                user_answer=user_answer,
+                reference_answer=question.answer,
+            )
+
+        prescored = cls.prescore(question, user_answer)
+        if prescored is not None:
+            return prescored
+
+        key = make_cache_key(question.__tablename__, question.id, user_answer)
+        cached = await cls.get_cached_evaluation(session, key, question.answer)
+        if cached is not None:
+            return cached
+
+        async def evaluate() -> tuple[float, dict]:
+            if settings.EVALUATION_SINGLE_FLIGHT_DB:
+                # Ждём, пока другой воркер оценит такой же ответ
+                await EvaluationCacheDAO.lock(session, key)
+                cached = await EvaluationCacheDAO.get(session, key)
+                if cached is not None:
+                    metrics.inc("evaluation_single_flight_shared_db")
+                    evaluation_cache.put(key, cached)
+                    score, evaluation = cached
+                    return score, unpack_evaluation(evaluation, question.answer)
+
+            score, evaluation = await evaluator.evaluate_answer(
+                question=question.question,
+                user_answer=fit_answer(user_answer, question.__tablename__),
+                reference_answer=question.answer,
+            )
+            await cls.store_evaluation(session, key, score, evaluation, question.answer)
+            return score, evaluation
+
+        return await evaluation_flights.run(key, evaluate)
+
+    @classmethod
+    async def evaluate_answers_batch(
+        cls,
+        session: AsyncSession,
+        items: List[Tuple[Union[PythonQuestion, GolangQuestion], str]],
+    ) -> List[tuple[float, dict]]:
+        """
+        Оценить несколько ответов пакетами по EXAM_BATCH_SIZE.
+
+        Пустые ответы, "не знаю" и попадания в кэш оцениваются без модели;
+        ответы, пропущенные моделью в пакете, дооцениваются по одному.
+        Отправляемые модели ответы регистрируются в single flight, как в
+        evaluate_answer: одновременные одиночные оценки тех же ответов ждут
+        результат пакета.
+        """
+        results: List[Optional[tuple[float, dict]]] = [None] * len(items)
+        pending = []
+        # Повторы уже отправляемого в этом пакете ответа: индекс -> ключ
+        duplicates: dict[int, EvaluationCacheKey] = {}
+
+        flights: dict[EvaluationCacheKey, asyncio.Future] = {}
+
+        # При ошибке выход из stack отменяет незавершённые flights:
+        # ожидающие оценят свои ответы сами
+        with ExitStack() as stack:
+            for index, (question, user_answer) in enumerate(items):
+                if not user_answer.strip() or is_not_know_answer(user_answer):
+                    results[index] = await evaluator.evaluate_answer(
+                        question=question.question,
+                        user_answer=user_answer,
+                        reference_answer=question.answer,
+                    )
+                    continue
+
+                prescored = cls.prescore(question, user_answer)
+                if prescored is not None:
+                    results[index] = prescored
+                    continue
+
+                key = make_cache_key(question.__tablename__, question.id, user_answer)
+                if key in flights:
+                    duplicates[index] = key
+                    continue
+                cached = await cls.get_cached_evaluation(
+                    session, key, question.answer
+                ) or await evaluation_flights.wait(key)
+                if cached is not None:
+                    results[index] = cached
+                    continue
+                # Между wait и lead нет await — ключ не успеет занять другой
+                metrics.inc("evaluation_single_flight_leader")
+                flights[key] = stack.enter_context(evaluation_flights.lead(key))
+                pending.append((index, key, question, user_answer))
+
+            batch_size = settings.EXAM_BATCH_SIZE
+            batches = [
+                pending[start : start + batch_size]
+                for start in range(0, len(pending), batch_size)
+            ]
+            # Пакеты независимы, отправляем их параллельно
+            batch_results = await asyncio.gather(
+                *(
+                    evaluator.evaluate_batch(
+                        [
+                            (
+                                question.question,
+                                fit_answer(user_answer, question.__tablename__),
+                                question.answer,
+                            )
+                            for _, _, question, user_answer in batch
+                        ]
+                    )
+                    for batch in batches
+                )
+            )
+
+            for batch, evaluations in zip(batches, batch_results):
+                for (index, key, question, user_answer), evaluation in zip(
+                    batch, evaluations
+                ):
+                    if evaluation is None:
+                        evaluation = await evaluator.evaluate_answer(
+                            question=question.question,
+                            user_answer=fit_answer(user_answer, question.__tablename__),
+                            reference_answer=question.answer,
+                        )
+                    results[index] = evaluation
+                    await cls.store_evaluation(
+                        session, key, *evaluation, question.answer
+                    )
+                    flights[key].set_result(evaluation)
+
+        for index, key in duplicates.items():
+            results[index] = flights[key].result()
+
+        return results
+
+    @classmethod
+    async def grade_interview_answers(
+        cls, session: AsyncSession, interview: Interview
+    ) -> None:
+        """Оценить все неоцененные ответы интервью (режим экзамена)"""
+        query = select(cls.model).filter(
+            cls.model.interview_id == interview.id, cls.model.score.is_(None)
+        )
+        result = await session.execute(query)
+        answers = result.scalars().all()
+        if not answers:
+            return
+
+        questions = await QuestionDAO.get_questions_by_ids(
+            session,
+            [answer.question_id for answer in answers],
+            question_type=interview.question_type,
+        )
+        questions_by_id = {question.id: question for question in questions}
+
+        graded = [answer for answer in answers if answer.question_id in questions_by_id]
+        evaluations = await cls.evaluate_answers_batch(
+            session,
+            [
+                (questions_by_id[answer.question_id], answer.user_answer)
+                for answer in graded
+            ],
+        )
+        for answer, (score, evaluation) in zip(graded, evaluations):
+            cls.apply_evaluation(
+                answer, score, evaluation, questions_by_id[answer.question_id].answer
+            )
+        await session.flush()
+        for answer in graded:
+            if needs_regrading(answer.evaluation):
+                await EvaluationJobDAO.enqueue(session, answer.id)
+        logger.info(
+            f"Интервью {interview.id}: оценено {len(graded)} ответов в режиме экзамена"
+        )
+
+    @classmethod
+    def prescore(
+        cls, question: Union[PythonQuestion, GolangQuestion], user_answer: str
+    ) -> Optional[tuple[float, dict]]:
+        """
+        Оценить очевидный ответ локально по сходству с эталоном.
+
+        None — ответ неоднозначный и требует оценки моделью.
+        """
+        if not settings.PRESCORE_ENABLED:
+            return None
+        prescored = prescore_answer(user_answer, question.answer)
+        metrics.inc("prescore_local" if prescored else "prescore_to_llm")
+        return prescored
+
+    @classmethod
+    async def get_cached_evaluation(
+        cls,
+        session: AsyncSession,
+        key: EvaluationCacheKey,
+        reference_answer: Optional[str] = None,
+    ) -> Optional[tuple[float, dict]]:
+        """Найти оценку в кэше: in-process LRU, затем таблица evaluation_cache"""
+        cached = evaluation_cache.get(key)
+        if cached is not None:
+            metrics.inc("evaluation_cache_hits_memory")
+        else:
+            cached = await EvaluationCacheDAO.get(session, key)
+            if cached is None:
+                metrics.inc("evaluation_cache_misses")
+                return None
+            metrics.inc("evaluation_cache_hits_db")
+            evaluation_cache.put(key, cached)
+
+        score, evaluation = cached
+        return score, unpack_evaluation(evaluation, reference_answer)
+
+    @classmethod
+    async def store_evaluation(
+        cls,
+        session: AsyncSession,
+        key: EvaluationCacheKey,
+        score: float,
+        evaluation: dict,
+        reference_answer: Optional[str] = None,
+    ) -> None:
+        """Сохранить оценку в оба уровня кэша"""
+        # Заглушки при сбоях и локальные оценки не кэшируем,
+        # чтобы следующая попытка дошла до модели
+        if needs_regrading(evaluation):
+            return
+        packed = pack_evaluation(evaluation, reference_answer)
+        evaluation_cache.put(key, (score, packed))
+        await EvaluationCacheDAO.put(session, key, score, packed)
+
+    @classmethod
+    async def load_evaluations(
+        cls,
+        session: AsyncSession,
+        answers: List[UserAnswer],
+        fields: Optional[List[str]] = None,
+    ) -> Dict[int, Optional[dict]]:
+        """
+        Оценки ответов с запрошенными полями (None — все поля).
+
+        Эталоны вопросов загружаются, только если нужен правильный ответ.
+        """
+        evaluations = {
+            answer.id: stored_evaluation(answer.evaluation, answer.feedback)
+            for answer in answers
+        }
+
+        by_type: Dict[str, List[UserAnswer]] = {}
+        for answer in answers:
+            if needs_reference(evaluations[answer.id], fields):
+                by_type.setdefault(answer.question_type, []).append(answer)
+        for question_type, typed_answers in by_type.items():
+            references = await QuestionDAO.get_answers_by_ids(
+                session,
+                list({answer.question_id for answer in typed_answers}),
+                question_type=question_type,
+            )
+            for answer in typed_answers:
+                evaluations[answer.id] = unpack_evaluation(
+                    evaluations[answer.id], references.get(answer.question_id)
+                )
+
+        return {
+            answer_id: select_fields(evaluation, fields) if evaluation else None
+            for answer_id, evaluation in evaluations.items()
+        }
+
+    @classmethod
+    def apply_evaluation(
+        cls,
+        answer: UserAnswer,
+        score: float,
+        evaluation: dict,
+        reference_answer: Optional[str],
+    ) -> None:
+        """Записать оценку в ответ: поля в JSONB, эталон вопроса — флагом"""
+        answer.score = score
+        answer.evaluation = pack_evaluation(evaluation, reference_answer)
+        answer.feedback = None
+
+    @classmethod
+    def _rescoring_filters(
+        cls,
+        after_id: int,
+        only_failed: bool,
+        question_type: Optional[str],
+        only_ids: Optional[Sequence[int]] = None,
+    ) -> list:
+        """
+        Условия отбора ответов для повторной оценки (app.rescore).
+
+        only_ids — только эти ответы (повтор неудавшихся в прошлом запуске)
+        """
+        unfinished_job = (
+            select(EvaluationJob.id)
+            .filter(
+                EvaluationJob.user_answer_id == cls.model.id,
+                EvaluationJob.status.in_(
+                    [EvaluationJobStatus.PENDING, EvaluationJobStatus.PROCESSING]
+                ),
+            )
+            .exists()
+        )
+        filters = [
+            cls.model.id > after_id,
+            cls.model.score.is_not(None),
+            # Ответы в очереди оценивает воркер
+            ~unfinished_job,
+        ]
+        if only_ids is not None:
+            filters.append(cls.model.id.in_(only_ids))
+        if question_type is not None:
+            filters.append(cls.model.question_type == question_type)
+        if only_failed:
+            # Текст обратной связи из JSONB или из старой колонки feedback
+            feedback = func.coalesce(
+                cls.model.evaluation["feedback"].astext, cls.model.feedback
+            )
+            filters.append(
+                or_(
+                    feedback.in_(sorted(FAILED_EVALUATION_MESSAGES)),
+                    feedback.startswith(PROVISIONAL_FEEDBACK_PREFIX),
+                )
+            )
+        return filters
+
+    @classmethod
+    async def count_for_rescoring(
+        cls,
+        session: AsyncSession,
+        after_id: int = 0,
+        only_failed: bool = True,
+        question_type: Optional[str] = None,
+        only_ids: Optional[Sequence[int]] = None,
+    ) -> int:
+        """Количество ответов для повторной оценки с id больше after_id"""
+        query = (
+            select(func.count())
+            .select_from(cls.model)
+            .filter(
+                *cls._rescoring_filters(after_id, only_failed, question_type, only_ids)
+            )
+        )
+        result = await session.execute(query)
+        return result.scalar_one()
+
+    @classmethod
+    async def stream_for_rescoring(
+        cls,
+        session: AsyncSession,
+        after_id: int = 0,
+        only_failed: bool = True,
+        question_type: Optional[str] = None,
+        batch_size: int = 500,
+        only_ids: Optional[Sequence[int]] = None,
+    ) -> AsyncIterator[Any]:
+        """
+        Ответы для повторной оценки по возрастанию id.
+
+        Строки читаются серверным курсором порциями по batch_size, поэтому
+        память не зависит от размера таблицы. Курсор живёт в транзакции
+        переданной сессии — записи делайте в других сессиях.
+        """
+        query = (
+            select(
+                cls.model.id,
+                cls.model.interview_id,
+                cls.model.question_id,
+                cls.model.question_type,
+                cls.model.user_answer,
+            )
+            .filter(
+                *cls._rescoring_filters(after_id, only_failed, question_type, only_ids)
+            )
+            .order_by(cls.model.id)
+            .execution_options(yield_per=batch_size)
         )
+        result = await session.stream(query)
+        async for row in result:
+            yield row
 
     @classmethod
     async def find_one_or_none(
@@ -287,6 +923,19 @@ class UserAnswerDAO(BaseDAO):
         result = await session.execute(query)
         return result.scalar_one_or_none()
 
+    @classmethod
+    async def get_user_answer(
+        cls, session: AsyncSession, answer_id: int, user_id: int
+    ) -> Optional[UserAnswer]:
+        """Найти ответ, принадлежащий пользователю"""
+        query = (
+            select(cls.model)
+            .join(Interview, Interview.id == cls.model.interview_id)
+            .filter(cls.model.id == answer_id, Interview.user_id == user_id)
+        )
+        result = await session.execute(query)
+        return result.scalar_one_or_none()
+
     @classmethod
     async def get_answer_with_question(
         cls, session: AsyncSession, answer_id: int
@@ -318,3 +967,294 @@ class UserAnswerDAO(BaseDAO):
             return {"answer": answer, "question": None}
 
         return {"answer": answer, "question": question}
+
+
+class UserQuestionReviewDAO(BaseDAO):
+    model = UserQuestionReview
+
+    @classmethod
+    async def get_due_question_ids(
+        cls, session: AsyncSession, user_id: int, question_type: str, limit: int
+    ) -> List[int]:
+        """ID вопросов, которые пользователю пора повторить, по сроку повторения"""
+        if limit <= 0:
+            return []
+        query = (
+            select(cls.model.question_id)
+            .filter(
+                cls.model.user_id == user_id,
+                cls.model.question_type == question_type,
+                cls.model.due_at <= func.localtimestamp(),
+            )
+            .order_by(cls.model.due_at)
+            .limit(limit)
+        )
+        result = await session.execute(query)
+        return list(result.scalars().all())
+
+    @classmethod
+    async def get_scheduled_question_ids(
+        cls,
+        session: AsyncSession,
+        user_id: int,
+        question_type: str,
+        question_ids: Sequence[int],
+    ) -> set[int]:
+        """Какие из question_ids пользователь освоил и их ещё рано повторять"""
+        if not question_ids:
+            return set()
+        query = select(cls.model.question_id).filter(
+            cls.model.user_id == user_id,
+            cls.model.question_type == question_type,
+            cls.model.question_id.in_(question_ids),
+            cls.model.due_at > func.localtimestamp(),
+        )
+        result = await session.execute(query)
+        return set(result.scalars().all())
+
+
+class UserRecentQuestionsDAO(BaseDAO):
+    model = UserRecentQuestions
+
+    @classmethod
+    async def get(
+        cls, session: AsyncSession, user_id: int, question_type: str
+    ) -> RecentQuestions:
+        """Недавние вопросы пользователя (пустое множество, если записи нет)"""
+        query = select(cls.model.current, cls.model.previous).filter(
+            cls.model.user_id == user_id, cls.model.question_type == question_type
+        )
+        row = (await session.execute(query)).first()
+        if row is None:
+            return RecentQuestions()
+        return RecentQuestions.from_bytes(row.current, row.previous)
+
+    @classmethod
+    async def add(
+        cls,
+        session: AsyncSession,
+        user_id: int,
+        question_type: str,
+        question_ids: Sequence[int],
+        generation_size: int,
+    ) -> None:
+        """Добавить вопросы в недавние (строка блокируется до конца транзакции)"""
+        await session.execute(
+            insert(cls.model)
+            .values(
+                user_id=user_id, question_type=question_type, current=b"", previous=b""
+            )
+            .on_conflict_do_nothing()
+        )
+        query = (
+            select(cls.model)
+            .filter(
+                cls.model.user_id == user_id,
+                cls.model.question_type == question_type,
+            )
+            .with_for_update()
+        )
+        record = (await session.execute(query)).scalar_one()
+        recent = RecentQuestions.from_bytes(record.current, record.previous)
+        recent.add(question_ids, generation_size)
+        record.current = recent.current.to_bytes()
+        record.previous = recent.previous.to_bytes()
+        await session.flush()
+
+
+class EvaluationCacheDAO(BaseDAO):
+    model = EvaluationCacheEntry
+
+    @classmethod
+    async def get(
+        cls, session: AsyncSession, key: EvaluationCacheKey
+    ) -> Optional[tuple[float, dict]]:
+        """Найти закэшированную оценку по ключу (эталон вопроса — флагом)"""
+        query = select(
+            cls.model.score, cls.model.evaluation, cls.model.feedback
+        ).filter_by(**key._asdict())
+        result = await session.execute(query)
+        row = result.first()
+        if row is None:
+            return None
+        return row.score, stored_evaluation(row.evaluation, row.feedback)
+
+    @classmethod
+    async def put(
+        cls,
+        session: AsyncSession,
+        key: EvaluationCacheKey,
+        score: float,
+        evaluation: dict,
+    ) -> None:
+        """Сохранить оценку; если параллельный запрос уже сохранил её — ничего не делаем"""
+        stmt = (
+            insert(cls.model)
+            .values(**key._asdict(), score=score, evaluation=evaluation)
+            .on_conflict_do_nothing(constraint="uq_evaluation_cache_key")
+        )
+        await session.execute(stmt)
+
+    @classmethod
+    async def lock(cls, session: AsyncSession, key: EvaluationCacheKey) -> None:
+        """
+        Взять advisory-блокировку ключа до конца транзакции.
+
+        Второй воркер с тем же ключом ждёт, пока первый сохранит оценку и
+        завершит транзакцию, и затем находит её в таблице.
+        """
+        lock_id = int.from_bytes(
+            hashlib.sha256(repr(tuple(key)).encode()).digest()[:8],
+            "big",
+            signed=True,
+        )
+        await session.execute(
+            text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": lock_id}
+        )
+
+    @classmethod
+    async def delete_stale(
+        cls, session: AsyncSession, backend_pattern: str, current_pattern: str
+    ) -> int:
+        """
+        Удалить оценки текущего бэкенда, полученные с другими версиями промпта
+        (шаблоны — stale_prompt_version_patterns)
+        """
+        stmt = delete(cls.model).where(
+            cls.model.prompt_version.regexp_match(backend_pattern),
+            ~cls.model.prompt_version.regexp_match(current_pattern),
+        )
+        result = await session.execute(stmt)
+        logger.info(f"Удалено {result.rowcount} устаревших записей кэша оценок")
+        return result.rowcount
+
+
+class EvaluationJobDAO(BaseDAO):
+    model = EvaluationJob
+
+    @classmethod
+    async def enqueue(cls, session: AsyncSession, user_answer_id: int) -> EvaluationJob:
+        """Поставить ответ в очередь на оценку"""
+        job = cls.model(
+            user_answer_id=user_answer_id, status=EvaluationJobStatus.PENDING
+        )
+        session.add(job)
+        await session.flush()
+        return job
+
+    @classmethod
+    async def claim(
+        cls, session: AsyncSession, limit: int, lock_timeout: int, max_attempts: int
+    ) -> List[Tuple[int, int]]:
+        """
+        Забрать до limit заданий на обработку.
+
+        FOR UPDATE SKIP LOCKED позволяет нескольким воркерам разбирать очередь
+        без блокировок друг друга. Задания, зависшие в processing дольше
+        lock_timeout секунд (воркер упал), забираются повторно, пока не
+        исчерпаны max_attempts попыток (см. fail_abandoned).
+        """
+        query = text("""
+            UPDATE evaluation_jobs
+            SET status = :processing, locked_at = now(), attempts = attempts + 1,
+                updated_at = now()
+            WHERE id IN (
+                SELECT id FROM evaluation_jobs
+                WHERE (status = :pending
+                       OR (status = :processing
+                           AND locked_at < now() - make_interval(secs => :lock_timeout)))
+                  AND attempts < :max_attempts
+                ORDER BY id
+                LIMIT :limit
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, user_answer_id
+            """)
+        result = await session.execute(
+            query,
+            {
+                "pending": EvaluationJobStatus.PENDING.value,
+                "processing": EvaluationJobStatus.PROCESSING.value,
+                "lock_timeout": lock_timeout,
+                "max_attempts": max_attempts,
+                "limit": limit,
+            },
+        )
+        return [(row.id, row.user_answer_id) for row in result]
+
+    @classmethod
+    async def fail_abandoned(
+        cls, session: AsyncSession, lock_timeout: int, max_attempts: int
+    ) -> List[int]:
+        """
+        Пометить failed зависшие задания, исчерпавшие попытки.
+
+        Такие задания claim больше не забирает; без этого они навсегда
+        остались бы в processing и держали бы интервью незавершённым.
+        Возвращает ID интервью затронутых ответов.
+        """
+        query = text("""
+            UPDATE evaluation_jobs j
+            SET status = :failed, locked_at = NULL, updated_at = now(),
+                last_error = coalesce(j.last_error, :error)
+            FROM user_answers a
+            WHERE a.id = j.user_answer_id
+              AND j.status = :processing
+              AND j.locked_at < now() - make_interval(secs => :lock_timeout)
+              AND j.attempts >= :max_attempts
+            RETURNING a.interview_id
+            """)
+        result = await session.execute(
+            query,
+            {
+                "failed": EvaluationJobStatus.FAILED.value,
+                "processing": EvaluationJobStatus.PROCESSING.value,
+                "error": "Попытки оценки исчерпаны",
+                "lock_timeout": lock_timeout,
+                "max_attempts": max_attempts,
+            },
+        )
+        return sorted(set(result.scalars().all()))
+
+    @classmethod
+    async def mark(
+        cls,
+        session: AsyncSession,
+        job_id: int,
+        status: EvaluationJobStatus,
+        error: Optional[str] = None,
+    ) -> None:
+        """Обновить статус задания"""
+        job = await session.get(cls.model, job_id)
+        job.status = status
+        job.last_error = error
+        job.locked_at = None
+        await session.flush()
+
+    @classmethod
+    async def count_unfinished(cls, session: AsyncSession, interview_id: int) -> int:
+        """Количество неоценённых ответов интервью"""
+        query = (
+            select(func.count())
+            .select_from(cls.model)
+            .join(UserAnswer, UserAnswer.id == cls.model.user_answer_id)
+            .filter(
+                UserAnswer.interview_id == interview_id,
+                cls.model.status.in_(
+                    [EvaluationJobStatus.PENDING, EvaluationJobStatus.PROCESSING]
+                ),
+            )
+        )
+        result = await session.execute(query)
+        return result.scalar_one()
+
+    @classmethod
+    async def get_status(
+        cls, session: AsyncSession, user_answer_id: int
+    ) -> Optional[EvaluationJobStatus]:
+        """Статус оценки ответа; None — ответ оценён синхронно"""
+        query = select(cls.model.status).filter(
+            cls.model.user_answer_id == user_answer_id
+        )
+        result = await session.execute(query)
+        return result.scalar_one_or_none()
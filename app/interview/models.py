@@ -1,5 +1,6 @@
 from sqlalchemy import (
     Column,
+    BigInteger,
     Integer,
     String,
     Float,
@@ -7,8 +8,12 @@ from sqlalchemy import (
     Text,
     Enum,
     DateTime,
+    UniqueConstraint,
+    Index,
+    LargeBinary,
     and_,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from app.dao.database import Base
 import enum
@@ -20,6 +25,18 @@ class InterviewStatus(str, enum.Enum):
     COMPLETED = "completed"
 
 
+class InterviewMode(str, enum.Enum):
+    STANDARD = "standard"  # Каждый ответ оценивается сразу
+    EXAM = "exam"  # Ответы оцениваются пакетами в конце интервью
+
+
+class EvaluationJobStatus(str, enum.Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+
+
 class PythonQuestion(Base):
     """Модель для вопросов по Python"""
 
@@ -44,6 +61,18 @@ class GolangQuestion(Base):
     answer = Column(Text, nullable=False)  # Правильный ответ
 
 
+class QuestionBankVersion(Base):
+    """
+    Версия банка вопросов типа: растёт при любом изменении таблицы
+    (триггер bump_question_bank_version), по ней сбрасывается кэш вопросов
+    """
+
+    __tablename__ = "question_bank_versions"
+
+    question_type = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=1)
+
+
 class Interview(Base):
     __tablename__ = "interviews"
 
@@ -61,6 +90,12 @@ class Interview(Base):
     user_interview_id = Column(
         Integer, nullable=True
     )  # ID интервью для конкретного пользователя
+    mode = Column(
+        String,
+        nullable=False,
+        default=InterviewMode.STANDARD,
+        server_default="standard",
+    )  # Режим оценки (standard или exam)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
@@ -82,6 +117,9 @@ class UserAnswer(Base):
     )  # Тип вопроса (pythonn или golangquestions)
     user_answer = Column(Text, nullable=False)
     score = Column(Float, nullable=True)
+    # Поля оценки (app.services.feedback); текст собирается при чтении
+    evaluation = Column(JSONB, nullable=True)
+    # Текст обратной связи ответов, оцененных до появления evaluation
     feedback = Column(Text, nullable=True)
 
     # Связь с интервью
@@ -106,3 +144,87 @@ class UserAnswer(Base):
 
         result = await session.execute(query)
         return result.scalar_one_or_none()
+
+
+class UserQuestionReview(Base):
+    """
+    Итог последнего ответа пользователя на вопрос для интервального повторения.
+
+    Записи ведёт триггер record_question_review на user_answers при каждой
+    оценке ответа: box — число верных ответов подряд (0 — последний ответ
+    ниже проходного балла), due_at — когда вопрос пора повторить.
+    """
+
+    __tablename__ = "user_question_reviews"
+    __table_args__ = (
+        Index("ix_user_question_reviews_due", "user_id", "question_type", "due_at"),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    question_type = Column(String, primary_key=True)
+    question_id = Column(Integer, primary_key=True)
+    answer_id = Column(Integer, nullable=False)  # Последний учтённый ответ
+    score = Column(Float, nullable=False)
+    box = Column(Integer, nullable=False)
+    # box до последнего ответа: при переоценке ответа box считается от него
+    previous_box = Column(Integer, nullable=False)
+    reviewed_at = Column(DateTime, nullable=False)
+    due_at = Column(DateTime, nullable=False)
+
+
+class UserRecentQuestions(Base):
+    """
+    Вопросы последних интервью пользователя: два поколения битового
+    множества id вопросов, сжатых zlib (app.services.recent_questions)
+    """
+
+    __tablename__ = "user_recent_questions"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    question_type = Column(String, primary_key=True)
+    current = Column(LargeBinary, nullable=False, default=b"")
+    previous = Column(LargeBinary, nullable=False, default=b"")
+
+
+class EvaluationCacheEntry(Base):
+    """Кэш оценок: одинаковый ответ на один вопрос оценивается один раз"""
+
+    __tablename__ = "evaluation_cache"
+    __table_args__ = (
+        UniqueConstraint(
+            "question_type",
+            "question_id",
+            "answer_hash",
+            "prompt_version",
+            name="uq_evaluation_cache_key",
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    question_type = Column(String, nullable=False)
+    question_id = Column(Integer, nullable=False)
+    answer_hash = Column(String(64), nullable=False)  # sha256 нормализованного ответа
+    prompt_version = Column(String, nullable=False)
+    score = Column(Float, nullable=False)
+    evaluation = Column(JSONB, nullable=True)
+    # Текст обратной связи записей до появления evaluation
+    feedback = Column(Text, nullable=True)
+
+
+class EvaluationJob(Base):
+    """Задание на отложенную оценку ответа воркером"""
+
+    __tablename__ = "evaluation_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_answer_id = Column(
+        Integer, ForeignKey("user_answers.id"), nullable=False, unique=True
+    )
+    status = Column(
+        String, default=EvaluationJobStatus.PENDING, nullable=False, index=True
+    )
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    locked_at = Column(DateTime, nullable=True)  # Когда воркер взял задание
+
+    user_answer = relationship("UserAnswer")
@@ -0,0 +1,140 @@
+"""
+Расписание интервального повторения вопросов (user_question_reviews).
+
+Строку повторения ведёт триггер на user_answers: каждая оценка ответа
+(сразу, воркером, пакетом в экзамене или при переоценке) обновляет одну
+строку на пару пользователь—вопрос. Переоценка того же ответа заменяет его
+результат, а не считается новым повторением; переоценка более старого
+ответа строку не меняет.
+
+Ответ ниже REVIEW_PASS_SCORE — к повторению сразу; после n верных ответов
+подряд вопрос повторяется через REVIEW_BASE_INTERVAL_DAYS * 2^(n-1) дней, но
+не реже REVIEW_MAX_INTERVAL_DAYS. Функция триггера собирается из этих
+настроек и при старте приложения заменяется, если пороги изменились,
+поэтому они задаются только в настройках.
+"""
+
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory-блокировки: воркеры gunicorn стартуют одновременно
+INSTALL_LOCK_KEY = 0x7265766965
+
+REVIEW_TRIGGER_NAME = "user_answers_question_review"
+
+REVIEW_TRIGGER_SQL = f"""
+    CREATE TRIGGER {REVIEW_TRIGGER_NAME}
+    AFTER INSERT OR UPDATE OF score ON user_answers
+    FOR EACH ROW WHEN (NEW.score IS NOT NULL)
+    EXECUTE FUNCTION record_question_review()
+    """
+
+
+def review_interval_sql(box: str) -> str:
+    """Выражение интервала до повторения для SQL-выражения box"""
+    return (
+        f"CASE WHEN {box} = 0 THEN interval '0' ELSE least("
+        f"interval '1 day' * {float(settings.REVIEW_BASE_INTERVAL_DAYS)!r}"
+        f" * power(2, least({box} - 1, 16)), "
+        f"interval '1 day' * {float(settings.REVIEW_MAX_INTERVAL_DAYS)!r}) END"
+    )
+
+
+def review_function_body() -> str:
+    """Тело функции триггера record_question_review с порогами из настроек"""
+    return f"""
+        DECLARE
+            review_user integer;
+            review user_question_reviews%ROWTYPE;
+            base_box integer := 0;
+            new_box integer;
+            new_reviewed_at timestamp := LOCALTIMESTAMP;
+        BEGIN
+            SELECT user_id INTO review_user FROM interviews WHERE id = NEW.interview_id;
+            IF review_user IS NULL THEN
+                RETURN NULL;
+            END IF;
+
+            SELECT * INTO review FROM user_question_reviews
+            WHERE user_id = review_user
+              AND question_type = NEW.question_type
+              AND question_id = NEW.question_id
+            FOR UPDATE;
+            IF FOUND THEN
+                IF review.answer_id > NEW.id THEN
+                    RETURN NULL;
+                ELSIF review.answer_id = NEW.id THEN
+                    base_box := review.previous_box;
+                    new_reviewed_at := review.reviewed_at;
+                ELSE
+                    base_box := review.box;
+                END IF;
+            END IF;
+            new_box := CASE WHEN NEW.score >= {float(settings.REVIEW_PASS_SCORE)!r}
+                THEN base_box + 1 ELSE 0 END;
+
+            INSERT INTO user_question_reviews (
+                user_id, question_type, question_id, answer_id, score,
+                box, previous_box, reviewed_at, due_at
+            )
+            VALUES (
+                review_user, NEW.question_type, NEW.question_id, NEW.id, NEW.score,
+                new_box, base_box, new_reviewed_at,
+                new_reviewed_at + {review_interval_sql("new_box")}
+            )
+            ON CONFLICT (user_id, question_type, question_id) DO UPDATE SET
+                answer_id = EXCLUDED.answer_id,
+                score = EXCLUDED.score,
+                box = EXCLUDED.box,
+                previous_box = EXCLUDED.previous_box,
+                reviewed_at = EXCLUDED.reviewed_at,
+                due_at = EXCLUDED.due_at;
+            RETURN NULL;
+        END;
+        """
+
+
+def review_function_sql() -> str:
+    """Создание или замена функции триггера с порогами из настроек"""
+    return (
+        "CREATE OR REPLACE FUNCTION record_question_review() RETURNS trigger "
+        f"AS $${review_function_body()}$$ LANGUAGE plpgsql"
+    )
+
+
+async def install_review_trigger(conn: AsyncConnection) -> None:
+    """
+    Установить функцию и триггер повторения с текущими настройками.
+
+    Выполняется при старте приложения в транзакции conn: база, созданная
+    create_all без миграций, тоже получает триггер, а изменённые пороги
+    применяются после перезапуска. Функция заменяется, только если её тело
+    изменилось, а триггер создаётся, только если его нет: обычный старт не
+    берёт блокировок на user_answers.
+    """
+    await conn.execute(
+        text("SELECT pg_advisory_xact_lock(:key)"), {"key": INSTALL_LOCK_KEY}
+    )
+    installed_body = await conn.scalar(text("""
+            SELECT prosrc FROM pg_proc
+            WHERE oid = to_regprocedure('record_question_review()')
+            """))
+    if installed_body != review_function_body():
+        logger.info("Устанавливается функция триггера повторения вопросов")
+        await conn.execute(text(review_function_sql()))
+
+    trigger_exists = await conn.scalar(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_trigger "
+            "WHERE tgname = :name AND tgrelid = to_regclass('user_answers'))"
+        ),
+        {"name": REVIEW_TRIGGER_NAME},
+    )
+    if not trigger_exists:
+        await conn.execute(text(REVIEW_TRIGGER_SQL))
@@ -1,6 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.dao.session_maker import SessionDep, TransactionSessionDep
+from fastapi.responses import StreamingResponse
+from app.dao.session_maker import (
+    SessionDep,
+    TransactionSessionDep,
+    async_session_maker,
+)
 from app.interview.schemas import (
     InterviewStart,
     QuestionResponse,
@@ -11,19 +16,41 @@ from app.interview.schemas import (
     InterviewCreate,
     UserAnswerCreate,
     QuestionListResponse,
+    AnswerEvaluation,
+)
+from app.interview.dao import (
+    QuestionDAO,
+    InterviewDAO,
+    UserAnswerDAO,
+    EvaluationJobDAO,
 )
-from app.interview.dao import QuestionDAO, InterviewDAO, UserAnswerDAO
 from app.interview.models import (
     Interview,
     UserAnswer,
     InterviewStatus as InterviewStatusEnum,
+    InterviewMode as InterviewModeEnum,
+    EvaluationJobStatus,
+)
+from app.config import settings
+from app.services.answer_budget import fit_answer
+from app.services.feedback import render_feedback
+from app.services.evaluation_cache import make_cache_key
+from app.services.prefetch import prefetcher
+from app.services.scheduler import current_evaluation_user
+from app.services.single_flight import evaluation_flights
+from app.services.gigachat import (
+    is_not_know_answer,
+    needs_regrading,
+    provisional_evaluation,
 )
+from app.services.evaluators import evaluator
 from app.auth.dependencies import get_current_user
 from app.auth.models import User
+import json
 import logging
 from sqlalchemy import text
 import random
-from typing import Optional, List
+from typing import Any, Optional, List
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +62,10 @@ QUESTIONS_PER_INTERVIEW = 10
 
 @router.get("/start", response_model=InterviewStart)
 async def start_interview(
+    mode: InterviewModeEnum = Query(
+        InterviewModeEnum.STANDARD,
+        description="Режим оценки: standard — после каждого ответа, exam — в конце",
+    ),
     current_user: User = Depends(get_current_user),
     session: AsyncSession = TransactionSessionDep,
 ):
@@ -55,21 +86,18 @@ async def start_interview(
         status=InterviewStatusEnum.ONGOING,
         user_interview_id=user_interview_count,  # Добавляем ID интервью для пользователя
         question_type=question_type,  # Сохраняем тип вопросов
+        mode=mode,
     )
 
     # Добавляем в базу данных
     session.add(new_interview)
     await session.flush()
 
-    # Получаем все вопросы соответствующего типа
-    query = await session.execute(text(f"SELECT id FROM {question_type}"))
-    all_question_ids = query.scalars().all()
-
-    # Выбираем 10 случайных вопросов, если их больше 10
-    if len(all_question_ids) > QUESTIONS_PER_INTERVIEW:
-        selected_question_ids = random.sample(all_question_ids, QUESTIONS_PER_INTERVIEW)
-    else:
-        selected_question_ids = all_question_ids
+    # Выбираем 10 вопросов соответствующего типа (или все, если их меньше):
+    # вопросы на повторение по истории ответов пользователя и новые
+    selected_question_ids = await QuestionDAO.select_questions(
+        session, question_type, QUESTIONS_PER_INTERVIEW, user_id=current_user.id
+    )
 
     # Сохраняем выбранные вопросы в атрибуте интервью
     await session.execute(
@@ -84,6 +112,7 @@ async def start_interview(
         interview_id=user_interview_count,  # Возвращаем ID интервью для пользователя
         status="ongoing",
         message="Interview started",
+        mode=mode,
     )
 
 
@@ -116,17 +145,10 @@ async def get_question(
             int(float(id_str)) for id_str in question_ids.split(",")
         ]
     else:
-        # Если question_ids пуста, получаем все вопросы соответствующего типа
-        query = await session.execute(text(f"SELECT id FROM {question_type}"))
-        all_question_ids = query.scalars().all()
-
-        # Выбираем 10 случайных вопросов, если их больше 10
-        if len(all_question_ids) > QUESTIONS_PER_INTERVIEW:
-            selected_question_ids = random.sample(
-                all_question_ids, QUESTIONS_PER_INTERVIEW
-            )
-        else:
-            selected_question_ids = all_question_ids
+        # Если question_ids пуста, выбираем 10 вопросов соответствующего типа
+        selected_question_ids = await QuestionDAO.select_questions(
+            session, question_type, QUESTIONS_PER_INTERVIEW, user_id=current_user.id
+        )
 
         # Сохраняем выбранные вопросы
         await session.execute(
@@ -148,11 +170,12 @@ async def get_question(
     ]
 
     if not unanswered_question_ids:
-        # Если все вопросы отвечены, завершаем интервью
+        # Если все вопросы отвечены, завершаем интервью (с оценкой ответов
+        # экзамена) и фиксируем результат до ответа клиенту
         interview = await InterviewDAO.find_one_or_none_by_id(interview_id, session)
         if interview:
-            interview.status = InterviewStatusEnum.COMPLETED
-            await session.flush()
+            await _complete_interview(session, interview)
+            await session.commit()
         raise HTTPException(
             status_code=404, detail="Все вопросы уже отвечены. Интервью завершено."
         )
@@ -161,13 +184,17 @@ async def get_question(
     random_question_id = random.choice(unanswered_question_ids)
 
     # Получаем вопрос соответствующего типа
-    question = await QuestionDAO.find_one_or_none_by_id(
-        random_question_id, session, question_type=question_type
+    question = await QuestionDAO.get_cached_question(
+        session, random_question_id, question_type=question_type
     )
 
     if not question:
         raise HTTPException(status_code=404, detail="Вопрос не найден")
 
+    # Пока пользователь пишет ответ, готовим вопрос к оценке
+    current_evaluation_user.set(current_user.id)
+    prefetcher.schedule(current_user.id, question.question, question.answer)
+
     return QuestionResponse(
         question_id=question.id, question_text=question.question, tag=question.tag
     )
@@ -180,10 +207,46 @@ async def submit_answer(
     session: AsyncSession = TransactionSessionDep,
 ):
     """Отправить ответ на вопрос"""
+    current_evaluation_user.set(current_user.id)
+    interview_id, question_type, mode, question = await _get_answer_context(
+        session, current_user, answer_data
+    )
+
+    if mode == InterviewModeEnum.EXAM:
+        return await _save_exam_answer(
+            session, interview_id, question_type, answer_data
+        )
+
+    if settings.EVALUATION_MODE == "queue":
+        return await _enqueue_answer(session, interview_id, question_type, answer_data)
+
+    # Оцениваем ответ
+    score, evaluation = await UserAnswerDAO.evaluate_answer(
+        session, question, answer_data.user_answer
+    )
+
+    return await _save_answer(
+        session,
+        interview_id,
+        question_type,
+        answer_data,
+        score,
+        evaluation,
+        question.answer,
+    )
+
+
+async def _get_answer_context(
+    session: AsyncSession, current_user: User, answer_data: AnswerRequest
+) -> tuple[int, str, str, Any]:
+    """
+    Проверить, что на вопрос можно ответить, и вернуть ID интервью,
+    тип вопросов, режим интервью и вопрос
+    """
     # Находим активное интервью пользователя
     query = await session.execute(
         text(
-            "SELECT id, question_ids, user_interview_id, question_type FROM interviews WHERE user_id = :user_id AND status = :status ORDER BY id DESC LIMIT 1"
+            "SELECT id, question_ids, user_interview_id, question_type, mode FROM interviews WHERE user_id = :user_id AND status = :status ORDER BY id DESC LIMIT 1"
         ),
         {"user_id": current_user.id, "status": InterviewStatusEnum.ONGOING},
     )
@@ -195,11 +258,11 @@ async def submit_answer(
             detail="Активное интервью не найдено. Начните новое интервью.",
         )
 
-    interview_id, question_ids, user_interview_id, question_type = result
+    interview_id, question_ids, user_interview_id, question_type, mode = result
 
     # Проверяем, что вопрос существует
-    question = await QuestionDAO.find_one_or_none_by_id(
-        answer_data.question_id, session, question_type=question_type
+    question = await QuestionDAO.get_cached_question(
+        session, answer_data.question_id, question_type=question_type
     )
     if not question:
         raise HTTPException(status_code=404, detail="Вопрос не найден")
@@ -223,67 +286,296 @@ async def submit_answer(
     if existing_answer:
         raise HTTPException(status_code=400, detail="Вы уже ответили на этот вопрос")
 
-    # Оцениваем ответ
-    score, feedback = await UserAnswerDAO.evaluate_answer(
-        session, question, answer_data.user_answer
-    )
+    return interview_id, question_type, mode, question
 
+
+async def _save_answer(
+    session: AsyncSession,
+    interview_id: int,
+    question_type: str,
+    answer_data: AnswerRequest,
+    score: float,
+    evaluation: dict,
+    reference_answer: Optional[str],
+) -> AnswerResponse:
+    """Сохранить оцененный ответ и завершить интервью, если ответ последний"""
     # Сохраняем ответ
     user_answer = UserAnswer(
         interview_id=interview_id,
         question_id=answer_data.question_id,
         question_type=question_type,
         user_answer=answer_data.user_answer,
-        score=score,
-        feedback=feedback,
     )
+    UserAnswerDAO.apply_evaluation(user_answer, score, evaluation, reference_answer)
 
     session.add(user_answer)
     await session.flush()
 
+    # Текст обратной связи собирается из полей оценки только для ответа клиенту
+    feedback = render_feedback(evaluation)
+
+    # Предварительную оценку уточнит воркер, когда GigaChat восстановится
+    evaluation_status = EvaluationJobStatus.DONE
+    if needs_regrading(evaluation):
+        await EvaluationJobDAO.enqueue(session, user_answer.id)
+        evaluation_status = EvaluationJobStatus.PENDING
+
     # Проверяем количество отвеченных вопросов
     answered_questions = await UserAnswerDAO.count_answers(session, interview_id)
+    interview = await InterviewDAO.find_one_or_none_by_id(interview_id, session)
 
     # Если ответили на все вопросы, завершаем интервью и возвращаем результат
-    if answered_questions >= QUESTIONS_PER_INTERVIEW:
-        # Получаем интервью
-        interview = await InterviewDAO.find_one_or_none_by_id(interview_id, session)
-
-        # Рассчитываем итоговую оценку
-        total_score = await InterviewDAO.calculate_interview_score(
-            session, interview_id
+    if answered_questions >= _questions_in_interview(interview):
+        # Рассчитываем итоговую оценку и обновляем интервью
+        total_score, final_feedback = await InterviewDAO.complete_interview(
+            session, interview
         )
-        score_percentage = int(total_score * 100)
-
-        # Формируем обратную связь
-        if total_score > 0.8:
-            final_feedback = "Отличный результат! Вы хорошо знаете материал."
-        elif total_score > 0.6:
-            final_feedback = (
-                "Хороший результат! Подтяните некоторые темы для улучшения."
-            )
-        elif total_score > 0.4:
-            final_feedback = "Средний результат. Рекомендуем повторить основные темы."
-        else:
-            final_feedback = "Результат ниже среднего. Рекомендуем дополнительное изучение материала."
-
-        # Обновляем интервью
-        interview.status = InterviewStatusEnum.COMPLETED
-        interview.total_score = total_score
-        interview.feedback = final_feedback
-
-        await session.flush()
 
         # Возвращаем результат последнего ответа и итоговый результат
         return AnswerResponse(
             score=score,
             feedback=feedback,
             interview_completed=True,
-            final_score=score_percentage,
+            answer_id=user_answer.id,
+            evaluation_status=evaluation_status,
+            final_score=int(total_score * 100),
             final_feedback=final_feedback,
         )
 
-    return AnswerResponse(score=score, feedback=feedback, interview_completed=False)
+    return AnswerResponse(
+        score=score,
+        feedback=feedback,
+        interview_completed=False,
+        answer_id=user_answer.id,
+        evaluation_status=evaluation_status,
+    )
+
+
+@router.post("/answer/stream")
+async def submit_answer_stream(
+    answer_data: AnswerRequest,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = SessionDep,
+):
+    """
+    Отправить ответ и получить оценку потоком (Server-Sent Events).
+
+    События:
+    - token: очередной фрагмент ответа модели;
+    - result: итоговый AnswerResponse в JSON после сохранения ответа.
+
+    Ответ сохраняется в отдельной короткой транзакции после окончания потока,
+    поэтому соединение с БД не удерживается на время генерации.
+    """
+    current_evaluation_user.set(current_user.id)
+    interview_id, question_type, mode, question = await _get_answer_context(
+        session, current_user, answer_data
+    )
+    if mode == InterviewModeEnum.EXAM:
+        raise HTTPException(
+            status_code=400,
+            detail="В режиме экзамена ответы оцениваются в конце интервью",
+        )
+    user_answer = answer_data.user_answer
+    key = make_cache_key(question_type, question.id, user_answer)
+
+    # Ответы, которые оцениваются без модели, и попадания в кэш отдаём сразу
+    ready = None
+    if not user_answer.strip() or is_not_know_answer(user_answer):
+        ready = await UserAnswerDAO.evaluate_answer(session, question, user_answer)
+    else:
+        ready = UserAnswerDAO.prescore(
+            question, user_answer
+        ) or await UserAnswerDAO.get_cached_evaluation(session, key, question.answer)
+    # Освобождаем соединение до начала потока
+    await session.close()
+
+    async def event_stream():
+        # Такой же ответ уже оценивается (повторный клик) — ждём его оценку
+        shared = ready or await evaluation_flights.wait(key)
+        if shared is not None:
+            score, evaluation = shared
+        elif not evaluator.supports_streaming:
+            # Бэкенд без потоковой оценки: отдаём только итоговое событие.
+            # Модели уходит ответ в пределах бюджета, сохраняется — исходный
+            model_answer = fit_answer(user_answer, question_type)
+            score, evaluation = await evaluation_flights.run(
+                key,
+                lambda: evaluator.evaluate_answer(
+                    question.question, model_answer, question.answer
+                ),
+            )
+        else:
+            model_answer = fit_answer(user_answer, question_type)
+            with evaluation_flights.lead(key) as flight:
+                chunks = []
+                try:
+                    async for chunk in evaluator.stream_evaluation(
+                        question.question, model_answer, question.answer
+                    ):
+                        chunks.append(chunk)
+                        yield _sse_event("token", json.dumps(chunk, ensure_ascii=False))
+                    score, evaluation = evaluator.parse_evaluation(
+                        "".join(chunks), question.answer
+                    )
+                except Exception as e:
+                    logger.error(f"Ошибка потоковой оценки ответа: {str(e)}")
+                    score, evaluation = provisional_evaluation(
+                        user_answer, question.answer
+                    )
+                flight.set_result((score, evaluation))
+
+        async with async_session_maker() as write_session:
+            async with write_session.begin():
+                if shared is None:
+                    await UserAnswerDAO.store_evaluation(
+                        write_session, key, score, evaluation, question.answer
+                    )
+                response = await _save_answer(
+                    write_session,
+                    interview_id,
+                    question_type,
+                    answer_data,
+                    score,
+                    evaluation,
+                    question.answer,
+                )
+        yield _sse_event("result", response.model_dump_json())
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse_event(event: str, data: str) -> str:
+    """Сформировать событие Server-Sent Events"""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def _questions_in_interview(interview: Interview) -> int:
+    """
+    Число вопросов интервью: в маленьком банке их может быть меньше
+    QUESTIONS_PER_INTERVIEW
+    """
+    if interview.question_ids:
+        return len([id_str for id_str in interview.question_ids.split(",") if id_str])
+    return QUESTIONS_PER_INTERVIEW
+
+
+async def _complete_interview(
+    session: AsyncSession, interview: Interview
+) -> tuple[float, str]:
+    """Завершить интервью; в режиме экзамена ответы оцениваются только сейчас"""
+    if interview.mode == InterviewModeEnum.EXAM:
+        await UserAnswerDAO.grade_interview_answers(session, interview)
+    return await InterviewDAO.complete_interview(session, interview)
+
+
+async def _save_exam_answer(
+    session: AsyncSession,
+    interview_id: int,
+    question_type: str,
+    answer_data: AnswerRequest,
+) -> AnswerResponse:
+    """
+    Сохранить ответ без оценки (режим экзамена).
+
+    Когда приходит последний ответ, все ответы интервью оцениваются
+    пакетными запросами и интервью завершается.
+    """
+    user_answer = UserAnswer(
+        interview_id=interview_id,
+        question_id=answer_data.question_id,
+        question_type=question_type,
+        user_answer=answer_data.user_answer,
+    )
+    session.add(user_answer)
+    await session.flush()
+
+    answered_questions = await UserAnswerDAO.count_answers(session, interview_id)
+    interview = await InterviewDAO.find_one_or_none_by_id(interview_id, session)
+    if answered_questions < _questions_in_interview(interview):
+        return AnswerResponse(
+            interview_completed=False,
+            answer_id=user_answer.id,
+            evaluation_status=EvaluationJobStatus.PENDING,
+        )
+
+    total_score, final_feedback = await _complete_interview(session, interview)
+    evaluations = await UserAnswerDAO.load_evaluations(session, [user_answer])
+
+    return AnswerResponse(
+        score=user_answer.score,
+        feedback=render_feedback(evaluations[user_answer.id]),
+        interview_completed=True,
+        answer_id=user_answer.id,
+        final_score=int(total_score * 100),
+        final_feedback=final_feedback,
+    )
+
+
+async def _enqueue_answer(
+    session: AsyncSession,
+    interview_id: int,
+    question_type: str,
+    answer_data: AnswerRequest,
+) -> AnswerResponse:
+    """
+    Сохранить ответ без оценки и поставить его в очередь воркеру.
+
+    Транзакция не держит соединение на время запроса к GigaChat; результат
+    клиент получает через GET /interview/answers/{answer_id}.
+    """
+    user_answer = UserAnswer(
+        interview_id=interview_id,
+        question_id=answer_data.question_id,
+        question_type=question_type,
+        user_answer=answer_data.user_answer,
+    )
+    session.add(user_answer)
+    await session.flush()
+    await EvaluationJobDAO.enqueue(session, user_answer.id)
+
+    answered_questions = await UserAnswerDAO.count_answers(session, interview_id)
+    interview = await InterviewDAO.find_one_or_none_by_id(interview_id, session)
+    interview_completed = answered_questions >= _questions_in_interview(interview)
+    if interview_completed:
+        # Итоговую оценку пересчитает воркер, когда оценит последний ответ
+        interview.status = InterviewStatusEnum.COMPLETED
+        await session.flush()
+
+    return AnswerResponse(
+        interview_completed=interview_completed,
+        answer_id=user_answer.id,
+        evaluation_status=EvaluationJobStatus.PENDING,
+    )
+
+
+@router.get("/answers/{answer_id}", response_model=AnswerEvaluation)
+async def get_answer_evaluation(
+    answer_id: int,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = SessionDep,
+):
+    """Получить оценку ответа (для опроса в режиме очереди)"""
+    user_answer = await UserAnswerDAO.get_user_answer(
+        session, answer_id, current_user.id
+    )
+    if not user_answer:
+        raise HTTPException(status_code=404, detail="Ответ не найден")
+
+    job_status = await EvaluationJobDAO.get_status(session, answer_id)
+    evaluations = await UserAnswerDAO.load_evaluations(session, [user_answer])
+
+    return AnswerEvaluation(
+        answer_id=user_answer.id,
+        question_id=user_answer.question_id,
+        evaluation_status=job_status or EvaluationJobStatus.DONE,
+        score=user_answer.score,
+        feedback=render_feedback(evaluations[user_answer.id]),
+    )
 
 
 @router.get("/status", response_model=InterviewStatus)
@@ -339,6 +631,7 @@ async def finish_interview(
     session: AsyncSession = TransactionSessionDep,
 ):
     """Завершить текущее интервью"""
+    current_evaluation_user.set(current_user.id)
     # Находим активное интервью пользователя
     query = await session.execute(
         text(
@@ -359,29 +652,10 @@ async def finish_interview(
     # Получаем интервью
     interview = await InterviewDAO.find_one_or_none_by_id(interview_id, session)
 
-    # Рассчитываем итоговую оценку
-    score = await InterviewDAO.calculate_interview_score(session, interview_id)
+    # Рассчитываем итоговую оценку и обновляем интервью
+    score, feedback = await _complete_interview(session, interview)
     score_percentage = int(score * 100)
 
-    # Формируем обратную связь
-    if score > 0.8:
-        feedback = "Отличный результат! Вы хорошо знаете материал."
-    elif score > 0.6:
-        feedback = "Хороший результат! Подтяните некоторые темы для улучшения."
-    elif score > 0.4:
-        feedback = "Средний результат. Рекомендуем повторить основные темы."
-    else:
-        feedback = (
-            "Результат ниже среднего. Рекомендуем дополнительное изучение материала."
-        )
-
-    # Обновляем интервью
-    interview.status = InterviewStatusEnum.COMPLETED
-    interview.total_score = score
-    interview.feedback = feedback
-
-    await session.flush()
-
     return InterviewFinish(
         interview_id=user_interview_id,  # Используем ID интервью для пользователя
         score=score_percentage,
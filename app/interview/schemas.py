@@ -1,12 +1,14 @@
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional
 from datetime import datetime
+from app.config import settings
 
 
 class InterviewStart(BaseModel):
     interview_id: int = Field(description="ID интервью")
     status: str = Field(description="Статус интервью")
     message: str = Field(description="Сообщение о начале интервью")
+    mode: str = Field("standard", description="Режим оценки: standard или exam")
 
 
 class QuestionResponse(BaseModel):
@@ -17,13 +19,23 @@ class QuestionResponse(BaseModel):
 
 class AnswerRequest(BaseModel):
     question_id: int = Field(description="ID вопроса")
-    user_answer: str = Field(description="Ответ пользователя")
+    user_answer: str = Field(
+        description="Ответ пользователя", max_length=settings.ANSWER_MAX_LENGTH
+    )
 
 
 class AnswerResponse(BaseModel):
-    score: float = Field(description="Оценка ответа")
-    feedback: str = Field(description="Обратная связь по ответу")
+    score: Optional[float] = Field(
+        None, description="Оценка ответа (None, пока оценка в очереди)"
+    )
+    feedback: Optional[str] = Field(
+        None, description="Обратная связь по ответу (None, пока оценка в очереди)"
+    )
     interview_completed: bool = Field(description="Флаг завершения интервью")
+    answer_id: Optional[int] = Field(None, description="ID сохраненного ответа")
+    evaluation_status: str = Field(
+        "done", description="Статус оценки: pending, processing, done или failed"
+    )
     final_score: Optional[float] = Field(
         None, description="Итоговая оценка интервью (если завершено)"
     )
@@ -32,6 +44,16 @@ class AnswerResponse(BaseModel):
     )
 
 
+class AnswerEvaluation(BaseModel):
+    answer_id: int = Field(description="ID ответа")
+    question_id: int = Field(description="ID вопроса")
+    evaluation_status: str = Field(
+        description="Статус оценки: pending, processing, done или failed"
+    )
+    score: Optional[float] = Field(None, description="Оценка ответа")
+    feedback: Optional[str] = Field(None, description="Обратная связь по ответу")
+
+
 class InterviewStatus(BaseModel):
     interview_id: int = Field(description="ID интервью")
     answered_questions: int = Field(description="Количество отвеченных вопросов")
@@ -82,6 +104,9 @@ class UserAnswer(UserAnswerBase):
     interview_id: int = Field(description="ID интервью")
     score: Optional[float] = Field(None, description="Оценка ответа")
     feedback: Optional[str] = Field(None, description="Обратная связь по ответу")
+    evaluation: Optional[dict] = Field(
+        None, description="Запрошенные поля оценки (вместо feedback)"
+    )
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -22,6 +22,15 @@ from fastapi.staticfiles import StaticFiles
 from app.auth.init_data import init_data
 from app.dao.session_maker import get_async_session
 from app.dao.database import Base, engine
+from app.services.deadline import DeadlineMiddleware
+from app.services.evaluators import evaluator
+from app.services.gigachat import stale_prompt_version_patterns
+from app.interview.dao import EvaluationCacheDAO, QuestionDAO
+from app.interview.review_schedule import install_review_trigger
+from app.services.local_scorer import lexical_index
+from app.services.metrics import metrics
+from app.services.prefetch import prefetcher
+from app.services.question_bank import install_bank_versions
 
 app = FastAPI(title="Interview Training API")
 
@@ -36,6 +45,12 @@ async def root():
     return HTMLResponse("Cваггер <a href='/docs'>тут</a>")
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Метрики текущего воркера"""
+    return metrics.snapshot()
+
+
 @app.on_event("startup")
 async def startup_event():
     """Инициализация данных при запуске приложения"""
@@ -46,6 +61,27 @@ async def startup_event():
     async with engine.begin() as conn:
         # await conn.run_sync(Base.metadata.drop_all)  # Раскомментировать для сброса БД
         await conn.run_sync(Base.metadata.create_all)
+        # Версии банков вопросов и их триггеры, если база создана без миграций
+        await install_bank_versions(conn)
+        # Триггер повторения с порогами из текущих настроек
+        await install_review_trigger(conn)
+
+    # Оценки этого бэкенда, полученные со старым промптом, больше не используются
+    async for session in get_async_session():
+        await EvaluationCacheDAO.delete_stale(session, *stale_prompt_version_patterns())
+        await session.commit()
+        # Веса слов для локального отбора ответов
+        lexical_index.fit(await QuestionDAO.get_reference_answers(session))
+        break
+
+    await evaluator.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Освобождение ресурсов при остановке приложения"""
+    await prefetcher.close()
+    await evaluator.close()
 
 
 # Подключаем маршрутизаторы к приложению
@@ -64,3 +100,5 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Бюджет времени запроса передаётся до вызовов модели (app.services.deadline)
+app.add_middleware(DeadlineMiddleware)
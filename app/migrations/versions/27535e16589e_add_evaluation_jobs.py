@@ -0,0 +1,57 @@
+"""add_evaluation_jobs
+
+Revision ID: 27535e16589e
+Revises: 37b26ea5ba6c
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "27535e16589e"
+down_revision: Union[str, None] = "37b26ea5ba6c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "evaluation_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_answer_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("locked_at", sa.DateTime(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.TIMESTAMP(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.TIMESTAMP(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["user_answer_id"], ["user_answers.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_answer_id"),
+    )
+    op.create_index(
+        op.f("ix_evaluation_jobs_id"), "evaluation_jobs", ["id"], unique=False
+    )
+    op.create_index(
+        op.f("ix_evaluation_jobs_status"), "evaluation_jobs", ["status"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_evaluation_jobs_status"), table_name="evaluation_jobs")
+    op.drop_index(op.f("ix_evaluation_jobs_id"), table_name="evaluation_jobs")
+    op.drop_table("evaluation_jobs")
@@ -0,0 +1,59 @@
+"""add_evaluation_cache
+
+Revision ID: 37b26ea5ba6c
+Revises: a5b3c4d5e6f7
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "37b26ea5ba6c"
+down_revision: Union[str, None] = "a5b3c4d5e6f7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "evaluation_cache",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("question_type", sa.String(), nullable=False),
+        sa.Column("question_id", sa.Integer(), nullable=False),
+        sa.Column("answer_hash", sa.String(length=64), nullable=False),
+        sa.Column("prompt_version", sa.String(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("feedback", sa.Text(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.TIMESTAMP(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.TIMESTAMP(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "question_type",
+            "question_id",
+            "answer_hash",
+            "prompt_version",
+            name="uq_evaluation_cache_key",
+        ),
+    )
+    op.create_index(
+        op.f("ix_evaluation_cache_id"), "evaluation_cache", ["id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_evaluation_cache_id"), table_name="evaluation_cache")
+    op.drop_table("evaluation_cache")
@@ -0,0 +1,61 @@
+"""add_question_bank_versions
+
+Revision ID: 5d2f8a61c3b7
+Revises: c41e9b7d2a10
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "5d2f8a61c3b7"
+down_revision: Union[str, None] = "c41e9b7d2a10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+QUESTION_TABLES = ("pythonn", "golangquestions")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "question_bank_versions",
+        sa.Column("question_type", sa.String(), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("question_type"),
+    )
+    for table in QUESTION_TABLES:
+        op.execute(
+            f"INSERT INTO question_bank_versions (question_type, version) "
+            f"VALUES ('{table}', 1)"
+        )
+
+    # Любое изменение таблицы вопросов увеличивает версию её банка:
+    # воркеры перечитывают кэш вопросов только после этого
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_question_bank_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO question_bank_versions (question_type, version)
+            VALUES (TG_TABLE_NAME, 1)
+            ON CONFLICT (question_type)
+            DO UPDATE SET version = question_bank_versions.version + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """)
+    for table in QUESTION_TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_bank_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_question_bank_version()
+            """)
+
+
+def downgrade() -> None:
+    for table in QUESTION_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_bank_version ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS bump_question_bank_version()")
+    op.drop_table("question_bank_versions")
@@ -0,0 +1,143 @@
+"""add_user_question_reviews
+
+Revision ID: 8e3c1f7a9b24
+Revises: 5d2f8a61c3b7
+Create Date: 2026-10-16 20:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "8e3c1f7a9b24"
+down_revision: Union[str, None] = "5d2f8a61c3b7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Проходной балл и интервалы повторения: после n верных ответов подряд
+# вопрос повторяется через REVIEW_BASE_INTERVAL * 2^(n-1), но не реже
+# REVIEW_MAX_INTERVAL; ответ ниже проходного балла — к повторению сразу.
+# Значения зафиксированы на момент ревизии; при старте приложение заменяет
+# функцию триггера версией с порогами из настроек REVIEW_*
+# (app.interview.review_schedule)
+PASS_SCORE = 0.6
+REVIEW_BASE_INTERVAL = "1 day"
+REVIEW_MAX_INTERVAL = "90 days"
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_question_reviews",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("question_type", sa.String(), nullable=False),
+        sa.Column("question_id", sa.Integer(), nullable=False),
+        sa.Column("answer_id", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("box", sa.Integer(), nullable=False),
+        sa.Column("previous_box", sa.Integer(), nullable=False),
+        sa.Column("reviewed_at", sa.DateTime(), nullable=False),
+        sa.Column("due_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id", "question_type", "question_id"),
+    )
+    op.create_index(
+        "ix_user_question_reviews_due",
+        "user_question_reviews",
+        ["user_id", "question_type", "due_at"],
+        unique=False,
+    )
+
+    # Каждая оценка ответа (сразу, воркером, пакетом в экзамене или при
+    # переоценке) обновляет одну строку повторения вопроса. Переоценка того
+    # же ответа заменяет его результат, а не считается новым повторением;
+    # переоценка более старого ответа строку не меняет.
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION record_question_review() RETURNS trigger AS $$
+        DECLARE
+            review_user integer;
+            review user_question_reviews%ROWTYPE;
+            base_box integer := 0;
+            new_box integer;
+            new_reviewed_at timestamp := LOCALTIMESTAMP;
+        BEGIN
+            SELECT user_id INTO review_user FROM interviews WHERE id = NEW.interview_id;
+            IF review_user IS NULL THEN
+                RETURN NULL;
+            END IF;
+
+            SELECT * INTO review FROM user_question_reviews
+            WHERE user_id = review_user
+              AND question_type = NEW.question_type
+              AND question_id = NEW.question_id
+            FOR UPDATE;
+            IF FOUND THEN
+                IF review.answer_id > NEW.id THEN
+                    RETURN NULL;
+                ELSIF review.answer_id = NEW.id THEN
+                    base_box := review.previous_box;
+                    new_reviewed_at := review.reviewed_at;
+                ELSE
+                    base_box := review.box;
+                END IF;
+            END IF;
+            new_box := CASE WHEN NEW.score >= {PASS_SCORE} THEN base_box + 1 ELSE 0 END;
+
+            INSERT INTO user_question_reviews AS r (
+                user_id, question_type, question_id, answer_id, score,
+                box, previous_box, reviewed_at, due_at
+            )
+            VALUES (
+                review_user, NEW.question_type, NEW.question_id, NEW.id, NEW.score,
+                new_box, base_box, new_reviewed_at,
+                new_reviewed_at + CASE WHEN new_box = 0 THEN interval '0'
+                    ELSE least(
+                        interval '{REVIEW_BASE_INTERVAL}' * power(2, least(new_box - 1, 16)),
+                        interval '{REVIEW_MAX_INTERVAL}'
+                    ) END
+            )
+            ON CONFLICT (user_id, question_type, question_id) DO UPDATE SET
+                answer_id = EXCLUDED.answer_id,
+                score = EXCLUDED.score,
+                box = EXCLUDED.box,
+                previous_box = EXCLUDED.previous_box,
+                reviewed_at = EXCLUDED.reviewed_at,
+                due_at = EXCLUDED.due_at;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """)
+    op.execute("""
+        CREATE TRIGGER user_answers_question_review
+        AFTER INSERT OR UPDATE OF score ON user_answers
+        FOR EACH ROW WHEN (NEW.score IS NOT NULL)
+        EXECUTE FUNCTION record_question_review()
+        """)
+
+    # Уже оцененные ответы: последний ответ на каждый вопрос, время —
+    # начало интервью (в user_answers своего времени нет)
+    op.execute(f"""
+        INSERT INTO user_question_reviews (
+            user_id, question_type, question_id, answer_id, score,
+            box, previous_box, reviewed_at, due_at
+        )
+        SELECT DISTINCT ON (i.user_id, a.question_type, a.question_id)
+            i.user_id, a.question_type, a.question_id, a.id, a.score,
+            CASE WHEN a.score >= {PASS_SCORE} THEN 1 ELSE 0 END, 0,
+            i.created_at,
+            i.created_at + CASE WHEN a.score >= {PASS_SCORE}
+                THEN interval '{REVIEW_BASE_INTERVAL}' ELSE interval '0' END
+        FROM user_answers a
+        JOIN interviews i ON i.id = a.interview_id
+        WHERE a.score IS NOT NULL
+        ORDER BY i.user_id, a.question_type, a.question_id, a.id DESC
+        """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS user_answers_question_review ON user_answers")
+    op.execute("DROP FUNCTION IF EXISTS record_question_review()")
+    op.drop_index("ix_user_question_reviews_due", table_name="user_question_reviews")
+    op.drop_table("user_question_reviews")
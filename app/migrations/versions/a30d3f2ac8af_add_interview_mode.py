@@ -0,0 +1,29 @@
+"""add_interview_mode
+
+Revision ID: a30d3f2ac8af
+Revises: 27535e16589e
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "a30d3f2ac8af"
+down_revision: Union[str, None] = "27535e16589e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Режим оценки интервью: standard — сразу, exam — пакетами в конце
+    op.execute(
+        "ALTER TABLE interviews ADD COLUMN IF NOT EXISTS mode VARCHAR DEFAULT 'standard' NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("interviews", "mode")
@@ -0,0 +1,34 @@
+"""add_user_recent_questions
+
+Revision ID: b7f04c2e6d15
+Revises: 8e3c1f7a9b24
+Create Date: 2026-10-16 21:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "b7f04c2e6d15"
+down_revision: Union[str, None] = "8e3c1f7a9b24"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_recent_questions",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("question_type", sa.String(), nullable=False),
+        sa.Column("current", sa.LargeBinary(), nullable=False),
+        sa.Column("previous", sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id", "question_type"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("user_recent_questions")
@@ -0,0 +1,40 @@
+"""add_structured_evaluation
+
+Revision ID: c41e9b7d2a10
+Revises: a30d3f2ac8af
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "c41e9b7d2a10"
+down_revision: Union[str, None] = "a30d3f2ac8af"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Оценка хранится полями в JSONB, текст обратной связи собирается при чтении.
+    # Колонка feedback остаётся для ответов, оцененных до миграции.
+    op.add_column(
+        "user_answers",
+        sa.Column("evaluation", postgresql.JSONB(), nullable=True),
+    )
+    op.add_column(
+        "evaluation_cache",
+        sa.Column("evaluation", postgresql.JSONB(), nullable=True),
+    )
+    op.alter_column("evaluation_cache", "feedback", nullable=True)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM evaluation_cache WHERE feedback IS NULL")
+    op.alter_column("evaluation_cache", "feedback", nullable=False)
+    op.drop_column("evaluation_cache", "evaluation")
+    op.drop_column("user_answers", "evaluation")
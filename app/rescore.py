@@ -0,0 +1,456 @@
+"""
+Повторная оценка сохранённых ответов.
+
+Нужна после смены промпта оценки (PROMPT_VERSION) или после сбоев
+GigaChat, когда ответы остались с заглушкой или предварительной оценкой.
+Ответы читаются серверным курсором по возрастанию id и оцениваются тем же
+конвейером, что и в API (UserAnswerDAO.evaluate_answer: кэш, single
+flight, бэкенд EVALUATOR_BACKEND), с ограниченной параллельностью.
+
+Прогресс сохраняется в файл: после прерывания (Ctrl+C, SIGTERM, падение)
+повторный запуск продолжает с последнего ответа, до которого всё оценено.
+Ответы, которые не удалось оценить (сбой модели, ошибка), запоминаются в
+том же файле и оцениваются в начале следующего запуска. После оценки
+пересчитываются итоги затронутых завершённых интервью; если неудавшихся
+ответов не осталось, файл прогресса удаляется.
+
+Запуск:
+    python -m app.rescore                 # только сбои и предварительные оценки
+    python -m app.rescore --all           # все ответы, например после смены промпта
+    python -m app.rescore --dry-run       # только посчитать ответы
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+from app.config import settings
+from app.auth.models import User  # noqa: F401 — связи Interview.user
+from app.dao.session_maker import async_session_maker
+from app.interview.dao import EvaluationJobDAO, InterviewDAO, QuestionDAO, UserAnswerDAO
+from app.interview.models import Interview, InterviewStatus, UserAnswer
+from app.services.evaluators import evaluator
+from app.services.gigachat import needs_regrading
+from app.services.local_scorer import lexical_index
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT = "rescore_checkpoint.json"
+
+
+class Checkpoint:
+    """Прогресс повторной оценки в JSON-файле"""
+
+    def __init__(
+        self, path: str, only_failed: bool = True, question_type: Optional[str] = None
+    ):
+        self.path = path
+        self.only_failed = only_failed
+        self.question_type = question_type
+        # Все ответы с id <= last_id обработаны
+        self.last_id = 0
+        self.processed = 0
+        self.regraded = 0
+        self.failed = 0
+        # Интервью, итог которых ещё нужно пересчитать
+        self.interview_ids: set[int] = set()
+        # Ответы с id <= last_id, которые не удалось оценить: повторить
+        self.retry_ids: set[int] = set()
+
+    @classmethod
+    def load(
+        cls, path: str, only_failed: bool = True, question_type: Optional[str] = None
+    ) -> "Checkpoint":
+        """
+        Прочитать прогресс или начать заново, если файла нет.
+
+        Raises:
+            ValueError: файл записан с другими условиями отбора
+        """
+        checkpoint = cls(path, only_failed, question_type)
+        if not os.path.exists(path):
+            return checkpoint
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if (data["only_failed"], data["question_type"]) != (only_failed, question_type):
+            raise ValueError(
+                f"Прогресс в {path} сохранён с другими условиями отбора "
+                f"(only_failed={data['only_failed']}, "
+                f"question_type={data['question_type']}); используйте --restart"
+            )
+        checkpoint.last_id = data["last_id"]
+        checkpoint.processed = data["processed"]
+        checkpoint.regraded = data["regraded"]
+        checkpoint.failed = data["failed"]
+        checkpoint.interview_ids = set(data["interview_ids"])
+        checkpoint.retry_ids = set(data.get("retry_ids", []))
+        return checkpoint
+
+    def save(self) -> None:
+        """Записать прогресс атомарно: прерывание не оставит битый файл"""
+        data = {
+            "only_failed": self.only_failed,
+            "question_type": self.question_type,
+            "last_id": self.last_id,
+            "processed": self.processed,
+            "regraded": self.regraded,
+            "failed": self.failed,
+            "interview_ids": sorted(self.interview_ids),
+            "retry_ids": sorted(self.retry_ids),
+            "updated_at": datetime.utcnow().isoformat(),
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def remove(self) -> None:
+        """Удалить файл после полного прохода: следующий запуск начнёт заново"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Watermark:
+    """
+    Наибольший id, до которого обработаны все ответы.
+
+    Ответы выдаются по возрастанию id, но оцениваются параллельно и
+    завершаются вразнобой; продолжать можно только с id, перед которым
+    не осталось необработанных ответов.
+    """
+
+    def __init__(self, value: int = 0):
+        self.value = value
+        self._started: deque[int] = deque()
+        self._done: set[int] = set()
+
+    def start(self, item_id: int) -> None:
+        self._started.append(item_id)
+
+    def done(self, item_id: int) -> None:
+        self._done.add(item_id)
+        while self._started and self._started[0] in self._done:
+            self.value = self._started.popleft()
+            self._done.discard(self.value)
+
+
+class Progress:
+    """Скорость обработки и оставшееся время"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.started = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        """Ответов в секунду с начала запуска"""
+        elapsed = time.monotonic() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Секунд до окончания; None — скорость ещё неизвестна"""
+        if not self.rate:
+            return None
+        return max(0, self.total - self.done) / self.rate
+
+    def report(self) -> str:
+        eta = self.eta
+        eta_text = "?" if eta is None else time.strftime("%H:%M:%S", time.gmtime(eta))
+        return (
+            f"{self.done}/{self.total} ответов, "
+            f"{self.rate:.2f} отв/с, осталось ~{eta_text}"
+        )
+
+
+class Rescorer:
+    """Повторная оценка ответов с ограниченной параллельностью"""
+
+    def __init__(
+        self,
+        checkpoint: Checkpoint,
+        concurrency: int,
+        batch_size: int,
+        report_interval: float,
+    ):
+        self.checkpoint = checkpoint
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.report_interval = report_interval
+        self.watermark = Watermark(checkpoint.last_id)
+        self.progress = Progress(0)
+        self._questions: dict[tuple[str, int], object] = {}
+
+    async def count(self) -> int:
+        """Сколько ответов осталось оценить (с повтором неудавшихся)"""
+        checkpoint = self.checkpoint
+        async with async_session_maker() as session:
+            count = await UserAnswerDAO.count_for_rescoring(
+                session,
+                checkpoint.last_id,
+                checkpoint.only_failed,
+                checkpoint.question_type,
+            )
+            if checkpoint.retry_ids:
+                count += await UserAnswerDAO.count_for_rescoring(
+                    session,
+                    0,
+                    checkpoint.only_failed,
+                    checkpoint.question_type,
+                    only_ids=sorted(checkpoint.retry_ids),
+                )
+            return count
+
+    async def run(self, stop: asyncio.Event) -> None:
+        self.progress = Progress(await self.count())
+        logger.info(
+            f"Повторная оценка: {self.progress.total} ответов "
+            f"после id {self.checkpoint.last_id} "
+            f"(повтор неудавшихся: {len(self.checkpoint.retry_ids)}), "
+            f"параллельность {self.concurrency}"
+        )
+
+        # Очередь ограничена: курсор читает не быстрее, чем идёт оценка
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [
+            asyncio.create_task(self._work(queue, stop))
+            for _ in range(self.concurrency)
+        ]
+        reporter = asyncio.create_task(self._report(stop))
+        try:
+            await self._read(queue, stop)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            reporter.cancel()
+            for worker in workers:
+                worker.cancel()
+            self._save()
+            logger.info(f"Оценено: {self.progress.report()}")
+
+        if not stop.is_set():
+            await self.finalize_interviews()
+            self.finish()
+
+    def finish(self) -> None:
+        """Проход завершён: удалить прогресс или оставить неудавшиеся ответы"""
+        retry_ids = self.checkpoint.retry_ids
+        if retry_ids:
+            self.checkpoint.save()
+            logger.warning(
+                f"Не удалось оценить {len(retry_ids)} ответов, они будут "
+                f"оценены при следующем запуске"
+            )
+        else:
+            self.checkpoint.remove()
+
+    async def _read(self, queue: asyncio.Queue, stop: asyncio.Event) -> None:
+        checkpoint = self.checkpoint
+        async with async_session_maker() as session:
+            if checkpoint.retry_ids:
+                # Сначала неудавшиеся в прошлый раз; они ниже отметки, поэтому
+                # отметка по ним не двигается
+                pending = set(checkpoint.retry_ids)
+                async for row in UserAnswerDAO.stream_for_rescoring(
+                    session,
+                    0,
+                    checkpoint.only_failed,
+                    checkpoint.question_type,
+                    batch_size=self.batch_size,
+                    only_ids=sorted(pending),
+                ):
+                    if stop.is_set():
+                        return
+                    pending.discard(row.id)
+                    await queue.put((row, True))
+                # Остальные уже не подходят под отбор (например, их оценил воркер)
+                checkpoint.retry_ids -= pending
+
+        async with async_session_maker() as session:
+            async for row in UserAnswerDAO.stream_for_rescoring(
+                session,
+                checkpoint.last_id,
+                checkpoint.only_failed,
+                checkpoint.question_type,
+                batch_size=self.batch_size,
+            ):
+                if stop.is_set():
+                    return
+                self.watermark.start(row.id)
+                await queue.put((row, False))
+
+    async def _work(self, queue: asyncio.Queue, stop: asyncio.Event) -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            row, retry = item
+            # Сервис оценки недоступен — ждём, а не портим ответы заглушками
+            while not evaluator.is_available and not stop.is_set():
+                await asyncio.sleep(settings.EVALUATION_WORKER_POLL_INTERVAL)
+            if stop.is_set():
+                # Очередь дочитываем, чтобы не заблокировать курсор; невзятые
+                # ответы остаются за отметкой и будут оценены при продолжении
+                continue
+            if await self._rescore(row):
+                self.checkpoint.retry_ids.discard(row.id)
+            else:
+                # Отметку не задерживаем: ответ повторится в следующем запуске
+                self.checkpoint.retry_ids.add(row.id)
+            if not retry:
+                self.watermark.done(row.id)
+            self.progress.done += 1
+
+    async def _rescore(self, row) -> bool:
+        """Оценить ответ заново; False — не удалось, ответ нужно повторить"""
+        checkpoint = self.checkpoint
+        checkpoint.processed += 1
+        try:
+            async with async_session_maker() as session:
+                async with session.begin():
+                    question = await self._question(
+                        session, row.question_type, row.question_id
+                    )
+                    if question is None:
+                        checkpoint.failed += 1
+                        logger.warning(f"Вопрос для ответа {row.id} не найден")
+                        # Повтор не поможет
+                        return True
+                    score, evaluation = await UserAnswerDAO.evaluate_answer(
+                        session, question, row.user_answer
+                    )
+                    if needs_regrading(evaluation):
+                        # Старую оценку не трогаем, ответ попадёт в следующий запуск
+                        checkpoint.failed += 1
+                        metrics.inc("rescore_failed")
+                        return False
+                    user_answer = await session.get(UserAnswer, row.id)
+                    UserAnswerDAO.apply_evaluation(
+                        user_answer, score, evaluation, question.answer
+                    )
+            checkpoint.regraded += 1
+            checkpoint.interview_ids.add(row.interview_id)
+            metrics.inc("rescore_regraded")
+            return True
+        except Exception as e:
+            checkpoint.failed += 1
+            metrics.inc("rescore_errors")
+            logger.error(f"Ошибка повторной оценки ответа {row.id}: {e!r}")
+            return False
+
+    async def _question(self, session, question_type: str, question_id: int):
+        # Вопросов немного, а ответов на каждый — много
+        key = (question_type, question_id)
+        if key not in self._questions:
+            self._questions[key] = await QuestionDAO.find_one_or_none_by_id(
+                question_id, session, question_type=question_type
+            )
+        return self._questions[key]
+
+    async def _report(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            await asyncio.sleep(self.report_interval)
+            self._save()
+            logger.info(self.progress.report())
+
+    def _save(self) -> None:
+        self.checkpoint.last_id = self.watermark.value
+        self.checkpoint.save()
+
+    async def finalize_interviews(self) -> None:
+        """Пересчитать итоговые оценки завершённых интервью с новыми оценками"""
+        checkpoint = self.checkpoint
+        for interview_id in sorted(checkpoint.interview_ids):
+            async with async_session_maker() as session:
+                async with session.begin():
+                    interview = await session.get(Interview, interview_id)
+                    if (
+                        interview is not None
+                        and interview.status == InterviewStatus.COMPLETED
+                        and not await EvaluationJobDAO.count_unfinished(
+                            session, interview_id
+                        )
+                    ):
+                        await InterviewDAO.complete_interview(session, interview)
+            checkpoint.interview_ids.discard(interview_id)
+        checkpoint.save()
+        logger.info("Итоги затронутых интервью пересчитаны")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="оценить все ответы, а не только сбои и предварительные оценки",
+    )
+    parser.add_argument("--question-type", help="только вопросы этого типа")
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.EVALUATION_WORKER_CONCURRENCY
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=500, help="строк за чтение курсора"
+    )
+    parser.add_argument(
+        "--report-interval",
+        type=float,
+        default=10.0,
+        help="период отчёта и сохранения прогресса, секунды",
+    )
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument(
+        "--restart", action="store_true", help="начать заново, не читая прогресс"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="только посчитать ответы"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    only_failed = not args.all
+    if args.restart:
+        checkpoint = Checkpoint(args.checkpoint, only_failed, args.question_type)
+    else:
+        try:
+            checkpoint = Checkpoint.load(
+                args.checkpoint, only_failed, args.question_type
+            )
+        except ValueError as e:
+            parser.error(str(e))
+    rescorer = Rescorer(
+        checkpoint, args.concurrency, args.batch_size, args.report_interval
+    )
+
+    if args.dry_run:
+        print(f"Ответов для оценки: {await rescorer.count()}")
+        return
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    async with async_session_maker() as session:
+        lexical_index.fit(await QuestionDAO.get_reference_answers(session))
+    await evaluator.start()
+    try:
+        await rescorer.run(stop)
+    finally:
+        await evaluator.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+Бюджет размера ответа, который передаётся модели на оценку.
+
+Вставленные целиком большие фрагменты кода раздувают промпт: растут расход
+токенов, задержка и доля сбоев. Ответ длиннее бюджета (EVALUATION_INPUT_BUDGET,
+для отдельных типов вопросов — EVALUATION_INPUT_BUDGETS) сокращается перед
+оценкой: сначала лишние пробелы, затем длинные блоки кода (остаются начало и
+конец блока), и только если этого мало — середина всего текста. Пояснения
+пользователя сохраняются в первую очередь: по ним оценивается понимание.
+
+В базе хранится исходный ответ, ключ кэша оценок тоже строится по нему.
+"""
+
+import re
+from typing import Optional
+
+from app.config import settings
+from app.services.metrics import metrics
+
+CODE_BLOCK = re.compile(r"```.*?(?:```|$)", re.DOTALL)
+# Подсказка модели, что часть ответа не показана
+TRIM_MARKER = "[... пропущено символов: {count} ...]"
+CODE_TRIM_MARKER = "# ... пропущено строк: {count}"
+
+
+def input_budget(question_type: Optional[str]) -> int:
+    """Бюджет в символах для ответа на вопрос данного типа"""
+    return settings.EVALUATION_INPUT_BUDGETS.get(
+        question_type, settings.EVALUATION_INPUT_BUDGET
+    )
+
+
+def fit_answer(user_answer: str, question_type: Optional[str] = None) -> str:
+    """Ответ для промпта оценки: не длиннее бюджета типа вопроса"""
+    budget = input_budget(question_type)
+    if budget <= 0 or len(user_answer) <= budget:
+        return user_answer
+
+    fitted = _compact(user_answer)
+    if len(fitted) > budget:
+        fitted = _trim_code(fitted, budget)
+    if len(fitted) > budget:
+        fitted = _trim_middle(fitted, budget)
+
+    metrics.inc("answers_over_budget")
+    metrics.observe("answer_trimmed_chars", len(user_answer) - len(fitted))
+    return fitted
+
+
+def _compact(text: str) -> str:
+    """Убрать пробелы в конце строк и серии пустых строк"""
+    text = "\n".join(line.rstrip() for line in text.strip().splitlines())
+    return re.sub(r"\n{3,}", "\n\n", text)
+
+
+def _trim_code(text: str, budget: int) -> str:
+    """Сократить блоки кода так, чтобы текст с пояснениями уложился в бюджет"""
+    blocks = [match.span() for match in CODE_BLOCK.finditer(text)]
+    code_length = sum(end - start for start, end in blocks)
+    if not code_length:
+        return text
+    # Сколько символов остаётся на код после пояснений
+    code_budget = budget - (len(text) - code_length)
+    if code_budget <= 0:
+        return text
+
+    parts = []
+    position = 0
+    for start, end in blocks:
+        parts.append(text[position:start])
+        block = text[start:end]
+        # Бюджет делится между блоками пропорционально их длине
+        limit = code_budget * len(block) // code_length
+        parts.append(_trim_lines(block, limit))
+        position = end
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def _trim_lines(block: str, limit: int) -> str:
+    """Оставить первые и последние строки блока кода, не длиннее limit"""
+    if len(block) <= limit:
+        return block
+    lines = block.split("\n")
+    head, tail = [], []
+    # Запас на строку-пометку о пропуске
+    room = limit - len(CODE_TRIM_MARKER) - 8
+    used = 0
+    for line in lines:
+        if used + len(line) + 1 > room * 2 // 3:
+            break
+        head.append(line)
+        used += len(line) + 1
+    for line in reversed(lines[len(head) :]):
+        if used + len(line) + 1 > room:
+            break
+        tail.insert(0, line)
+        used += len(line) + 1
+
+    skipped = len(lines) - len(head) - len(tail)
+    if skipped <= 0:
+        return block
+    return "\n".join(head + [CODE_TRIM_MARKER.format(count=skipped)] + tail)
+
+
+def _trim_middle(text: str, budget: int) -> str:
+    """Оставить начало (2/3 бюджета) и конец ответа, середину пропустить"""
+    marker = "\n" + TRIM_MARKER.format(count=len(text)) + "\n"
+    room = max(0, budget - len(marker))
+    head = room * 2 // 3
+    tail = room - head
+    skipped = len(text) - head - tail
+    marker = "\n" + TRIM_MARKER.format(count=skipped) + "\n"
+    return text[:head] + marker + (text[len(text) - tail :] if tail else "")
@@ -0,0 +1,137 @@
+import logging
+import time
+from collections import deque
+from enum import Enum
+
+from app.config import settings
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Провайдер признан недоступным, запрос не отправлялся"""
+
+
+class CircuitBreaker:
+    """
+    Предохранитель для запросов к внешнему провайдеру.
+
+    Следит за долей ошибок и медленных ответов в скользящем окне.
+    Если доля превышает порог, предохранитель размыкается, и запросы
+    сразу завершаются CircuitOpenError, не дожидаясь таймаута. Через
+    open_seconds пропускается один пробный запрос: успех замыкает
+    предохранитель, ошибка снова размыкает его.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float,
+        min_requests: int,
+        failure_ratio: float,
+        slow_seconds: float,
+        open_seconds: float,
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_requests = min_requests
+        self.failure_ratio = failure_ratio
+        self.slow_seconds = slow_seconds
+        self.open_seconds = open_seconds
+        self.state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        # (время, признак неудачи) для запросов в окне
+        self._outcomes: deque[tuple[float, bool]] = deque()
+
+    @property
+    def is_open(self) -> bool:
+        """Разомкнут ли предохранитель (без пробных запросов)"""
+        return self.state == CircuitState.OPEN and not self._cooldown_passed()
+
+    @property
+    def is_probing(self) -> bool:
+        """Пропускается только один пробный запрос (полуоткрыт или вот-вот будет)"""
+        return self.state == CircuitState.HALF_OPEN or (
+            self.state == CircuitState.OPEN and self._cooldown_passed()
+        )
+
+    def _cooldown_passed(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.open_seconds
+
+    def before_request(self) -> None:
+        """Проверить, можно ли отправить запрос; иначе CircuitOpenError"""
+        if self.state == CircuitState.CLOSED:
+            return
+        if self.state == CircuitState.OPEN and self._cooldown_passed():
+            self._set_state(CircuitState.HALF_OPEN)
+        if self.state == CircuitState.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return
+        metrics.inc(f"{self.name}_circuit_rejected")
+        raise CircuitOpenError(f"{self.name}: предохранитель разомкнут")
+
+    def release(self) -> None:
+        """Запрос отменён до результата: освободить место пробного запроса"""
+        if self.state == CircuitState.HALF_OPEN:
+            self._probe_in_flight = False
+
+    def record(self, duration: float, failed: bool) -> None:
+        """Учесть результат запроса; медленный ответ считается неудачей"""
+        failed = failed or duration >= self.slow_seconds
+        if self.state == CircuitState.HALF_OPEN:
+            self._probe_in_flight = False
+            if failed:
+                self._open()
+            else:
+                self._outcomes.clear()
+                self._set_state(CircuitState.CLOSED)
+            return
+        if self.state == CircuitState.OPEN:
+            # Запрос начат до размыкания — на состояние не влияет
+            return
+
+        now = time.monotonic()
+        self._outcomes.append((now, failed))
+        while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+            self._outcomes.popleft()
+
+        if len(self._outcomes) < self.min_requests:
+            return
+        failures = sum(1 for _, outcome in self._outcomes if outcome)
+        if failures / len(self._outcomes) >= self.failure_ratio:
+            self._open()
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        metrics.inc(f"{self.name}_circuit_opened")
+        self._set_state(CircuitState.OPEN)
+
+    def _set_state(self, state: CircuitState) -> None:
+        if state != self.state:
+            logger.warning(
+                f"Предохранитель {self.name}: {self.state.value} -> {state.value}"
+            )
+        self.state = state
+        metrics.set_gauge(
+            f"{self.name}_circuit_open", 0 if state == CircuitState.CLOSED else 1
+        )
+
+
+def make_gigachat_breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        name="gigachat",
+        window_seconds=settings.GIGACHAT_BREAKER_WINDOW,
+        min_requests=settings.GIGACHAT_BREAKER_MIN_REQUESTS,
+        failure_ratio=settings.GIGACHAT_BREAKER_FAILURE_RATIO,
+        slow_seconds=settings.GIGACHAT_BREAKER_SLOW_SECONDS,
+        open_seconds=settings.GIGACHAT_BREAKER_OPEN_SECONDS,
+    )
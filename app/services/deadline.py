@@ -0,0 +1,104 @@
+"""
+Бюджет времени запроса (deadline) и статистика задержек для hedging.
+
+Срок запроса задаёт DeadlineMiddleware (REQUEST_DEADLINE_SECONDS) и
+передаётся через ContextVar вниз по стеку: ожидание в планировщике,
+запрос к модели и повторные попытки укладываются в один бюджет. Когда он
+исчерпан, бэкенд оценки возвращает предварительную оценку (ответ уйдёт на
+переоценку), а не держит запрос до таймаута gunicorn.
+"""
+
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from app.config import settings
+from app.services.metrics import metrics
+
+# Момент time.monotonic(), к которому запрос должен быть обслужен
+current_deadline: ContextVar[Optional[float]] = ContextVar(
+    "current_deadline", default=None
+)
+
+
+class DeadlineExceeded(Exception):
+    """Бюджет времени запроса исчерпан"""
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Ограничить время выполнения блока.
+
+    Вложенный срок не может быть позже внешнего. None или 0 — без ограничения.
+    """
+    deadline = current_deadline.get()
+    if seconds:
+        scoped = time.monotonic() + seconds
+        deadline = scoped if deadline is None else min(deadline, scoped)
+    token = current_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        current_deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Сколько секунд осталось до срока; None — срока нет"""
+    deadline = current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def timeout_for(limit: float) -> float:
+    """
+    Таймаут операции: её собственный лимит, но не дольше остатка бюджета.
+
+    Raises:
+        DeadlineExceeded: бюджет уже исчерпан
+    """
+    left = remaining()
+    if left is None:
+        return limit
+    if left <= 0:
+        metrics.inc("deadline_exceeded")
+        raise DeadlineExceeded("Бюджет времени запроса исчерпан")
+    return min(limit, left)
+
+
+class LatencyWindow:
+    """Задержки последних запросов для оценки квантилей (p95 и т.п.)"""
+
+    def __init__(self, size: int = 200):
+        self._values: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def observe(self, value: float) -> None:
+        self._values.append(value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._values:
+            return None
+        ordered = sorted(self._values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class DeadlineMiddleware:
+    """ASGI middleware: срок REQUEST_DEADLINE_SECONDS на каждый HTTP-запрос"""
+
+    def __init__(self, app, seconds: Optional[float] = None):
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        seconds = self.seconds or settings.REQUEST_DEADLINE_SECONDS
+        with deadline_scope(seconds):
+            await self.app(scope, receive, send)
@@ -0,0 +1,68 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from app.config import settings
+from app.services.gigachat import current_prompt_version
+
+
+class EvaluationCacheKey(NamedTuple):
+    question_type: str
+    question_id: int
+    answer_hash: str
+    prompt_version: str
+
+
+def normalize_answer(user_answer: str) -> str:
+    """
+    Нормализовать ответ для сравнения: регистр, пробелы и пунктуация по краям
+    не влияют на оценку
+    """
+    normalized = re.sub(r"\s+", " ", user_answer or "").strip().lower()
+    return normalized.strip(".,;:!?-–— ")
+
+
+def make_cache_key(
+    question_type: str, question_id: int, user_answer: str
+) -> EvaluationCacheKey:
+    """Ключ кэша для ответа на вопрос при текущей версии промпта"""
+    answer_hash = hashlib.sha256(normalize_answer(user_answer).encode()).hexdigest()
+    return EvaluationCacheKey(
+        question_type, question_id, answer_hash, current_prompt_version()
+    )
+
+
+class LRUCache:
+    """Потокобезопасный LRU-кэш фиксированного размера"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[tuple[float, dict]]:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value: tuple[float, dict]) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# In-process уровень кэша оценок; общий уровень хранится в таблице evaluation_cache
+evaluation_cache = LRUCache(settings.EVALUATION_CACHE_SIZE)
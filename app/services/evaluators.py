@@ -0,0 +1,472 @@
+"""
+Бэкенды оценки ответов.
+
+Выбираются настройкой EVALUATOR_BACKEND:
+- gigachat — оценка моделью GigaChat (по умолчанию);
+- local — детерминированная локальная оценка по совпадению с эталоном,
+  без сети и токенов;
+- http — внешний сервис оценки по HTTP, например заглушка
+  benchmarks/evaluator_stub.py для нагрузочного тестирования;
+- cascade — сначала дешёвая оценка (локальная или лёгкой моделью),
+  полная модель GigaChat — только для спорных ответов.
+"""
+
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from app.config import settings
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.deadline import DeadlineExceeded, remaining, timeout_for
+from app.services.gigachat import (
+    EMPTY_ANSWER_MESSAGE,
+    gigachat_service,
+    is_not_know_answer,
+    model_kind,
+    needs_regrading,
+    provisional_evaluation,
+)
+from app.services.feedback import plain_evaluation
+from app.services.local_scorer import lexical_index, score_against_reference
+from app.services.metrics import metrics
+from app.services.scheduler import evaluation_scheduler
+
+logger = logging.getLogger(__name__)
+
+LOCAL_FEEDBACK = "Оценка выставлена локально по совпадению с эталонным ответом."
+NO_REFERENCE_FEEDBACK = (
+    "Для вопроса нет эталонного ответа, локальная оценка невозможна."
+)
+
+
+class EvaluatorBackend:
+    """Интерфейс бэкенда оценки ответов"""
+
+    name = "base"
+    # Умеет ли бэкенд отдавать оценку потоком (POST /interview/answer/stream)
+    supports_streaming = False
+
+    @property
+    def is_available(self) -> bool:
+        """Можно ли сейчас отправлять запросы (воркер не берёт задания, если нет)"""
+        return True
+
+    @property
+    def is_probing(self) -> bool:
+        """
+        Предохранитель пропускает один пробный запрос: воркер берёт одно
+        задание, остальные получили бы отказ и потратили попытку
+        """
+        return False
+
+    async def start(self) -> None:
+        """Подготовка при старте приложения или воркера"""
+
+    async def close(self) -> None:
+        """Освобождение ресурсов при остановке"""
+
+    async def warm(
+        self,
+        question: str,
+        reference_answer: Optional[str],
+        generate_reference: bool = False,
+    ) -> None:
+        """Подготовить данные вопроса до прихода ответа (см. app.services.prefetch)"""
+        if reference_answer and reference_answer.strip():
+            lexical_index.reference_vector(reference_answer)
+
+    async def evaluate_answer(
+        self, question: str, user_answer: str, reference_answer: Optional[str] = None
+    ) -> tuple[float, dict]:
+        """Оценка (от 0 до 1) и поля обратной связи (app.services.feedback)"""
+        if not user_answer or not user_answer.strip():
+            return 0.0, plain_evaluation(EMPTY_ANSWER_MESSAGE)
+        if is_not_know_answer(user_answer):
+            if reference_answer and reference_answer.strip():
+                return 0.0, {"correct_answer": reference_answer.strip()}
+            return 0.0, plain_evaluation(NO_REFERENCE_FEEDBACK)
+        return await self._evaluate(question, user_answer, reference_answer)
+
+    async def _evaluate(
+        self, question: str, user_answer: str, reference_answer: Optional[str]
+    ) -> tuple[float, dict]:
+        raise NotImplementedError
+
+    async def evaluate_batch(
+        self, items: list[tuple[str, str, Optional[str]]]
+    ) -> list[Optional[tuple[float, dict]]]:
+        """Оценить несколько ответов; по умолчанию — параллельно по одному"""
+        return list(
+            await asyncio.gather(*(self.evaluate_answer(*item) for item in items))
+        )
+
+
+class GigaChatEvaluator(EvaluatorBackend):
+    """Оценка моделью GigaChat через общий GigaChatService"""
+
+    name = "gigachat"
+    supports_streaming = True
+
+    def __init__(self):
+        self.service = gigachat_service
+
+    @property
+    def is_available(self) -> bool:
+        return not self.service.breaker.is_open
+
+    @property
+    def is_probing(self) -> bool:
+        return self.service.breaker.is_probing
+
+    async def start(self) -> None:
+        await self.service.start()
+
+    async def close(self) -> None:
+        await self.service.close()
+
+    async def warm(
+        self,
+        question: str,
+        reference_answer: Optional[str],
+        generate_reference: bool = False,
+    ) -> None:
+        await super().warm(question, reference_answer)
+        await self.service.warm(question, reference_answer, generate_reference)
+
+    async def evaluate_answer(
+        self, question: str, user_answer: str, reference_answer: Optional[str] = None
+    ) -> tuple[float, dict]:
+        return await self.service.evaluate_answer(
+            question, user_answer, reference_answer
+        )
+
+    async def evaluate_batch(
+        self, items: list[tuple[str, str, Optional[str]]]
+    ) -> list[Optional[tuple[float, dict]]]:
+        return await self.service.evaluate_batch(items)
+
+    def stream_evaluation(
+        self, question: str, user_answer: str, reference_answer: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        return self.service.stream_evaluation(question, user_answer, reference_answer)
+
+    def parse_evaluation(
+        self, result: str, reference_answer: Optional[str] = None
+    ) -> tuple[float, dict]:
+        return self.service.parse_evaluation(result, reference_answer)
+
+
+class LocalEvaluator(EvaluatorBackend):
+    """Детерминированная оценка по совпадению ключевых слов с эталоном"""
+
+    name = "local"
+
+    async def _evaluate(
+        self, question: str, user_answer: str, reference_answer: Optional[str]
+    ) -> tuple[float, dict]:
+        if not reference_answer or not reference_answer.strip():
+            return 0.0, plain_evaluation(NO_REFERENCE_FEEDBACK)
+        score = score_against_reference(user_answer, reference_answer)
+        return score, plain_evaluation(LOCAL_FEEDBACK, reference_answer)
+
+
+class HttpEvaluator(EvaluatorBackend):
+    """
+    Оценка внешним сервисом: POST {EVALUATOR_HTTP_URL}/evaluate.
+
+    Запросы проходят через тот же планировщик и предохранитель, что и
+    запросы к GigaChat, поэтому нагрузочный тест с заглушкой воспроизводит
+    поведение под ограничениями провайдера.
+    """
+
+    name = "http"
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self.breaker = CircuitBreaker(
+            name="evaluator_http",
+            window_seconds=settings.GIGACHAT_BREAKER_WINDOW,
+            min_requests=settings.GIGACHAT_BREAKER_MIN_REQUESTS,
+            failure_ratio=settings.GIGACHAT_BREAKER_FAILURE_RATIO,
+            slow_seconds=settings.GIGACHAT_BREAKER_SLOW_SECONDS,
+            open_seconds=settings.GIGACHAT_BREAKER_OPEN_SECONDS,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=settings.EVALUATOR_HTTP_URL,
+                timeout=settings.EVALUATOR_HTTP_TIMEOUT,
+            )
+        return self._client
+
+    @property
+    def is_available(self) -> bool:
+        return not self.breaker.is_open
+
+    @property
+    def is_probing(self) -> bool:
+        return self.breaker.is_probing
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _evaluate(
+        self, question: str, user_answer: str, reference_answer: Optional[str]
+    ) -> tuple[float, dict]:
+        try:
+            return await self._request(question, user_answer, reference_answer)
+        except CircuitOpenError:
+            metrics.inc("evaluations_fallback_circuit_open")
+        except (DeadlineExceeded, asyncio.TimeoutError, httpx.TimeoutException):
+            metrics.inc("evaluations_fallback_deadline")
+        except Exception as e:
+            logger.error(f"Ошибка сервиса оценки {settings.EVALUATOR_HTTP_URL}: {e!r}")
+        return provisional_evaluation(user_answer, reference_answer)
+
+    async def _request(
+        self, question: str, user_answer: str, reference_answer: Optional[str]
+    ) -> tuple[float, dict]:
+        # Бюджет уже исчерпан — не встаём в очередь планировщика
+        timeout_for(settings.EVALUATOR_HTTP_TIMEOUT)
+        self.breaker.before_request()
+        recorded = False
+        acquired = False
+        try:
+            async with evaluation_scheduler.slot(timeout=remaining()):
+                acquired = True
+                # Таймаут считается с получения слота: очередь его не сокращает
+                timeout = timeout_for(settings.EVALUATOR_HTTP_TIMEOUT)
+                limited_by_budget = timeout < settings.EVALUATOR_HTTP_TIMEOUT
+                started = time.perf_counter()
+                try:
+                    response = await self.client.post(
+                        "/evaluate",
+                        json={
+                            "question": question,
+                            "user_answer": user_answer,
+                            "reference_answer": reference_answer,
+                        },
+                        timeout=timeout,
+                    )
+                    response.raise_for_status()
+                    data = response.json()
+                    feedback = data["feedback"]
+                    # Сервис может вернуть готовые поля оценки или только текст
+                    if not isinstance(feedback, dict):
+                        feedback = plain_evaluation(str(feedback))
+                    result = float(data["score"]), feedback
+                except httpx.TimeoutException:
+                    if limited_by_budget:
+                        metrics.inc("deadline_exceeded")
+                        raise DeadlineExceeded(
+                            "Бюджет времени запроса исчерпан"
+                        ) from None
+                    self.breaker.record(time.perf_counter() - started, failed=True)
+                    recorded = True
+                    raise
+                except Exception:
+                    self.breaker.record(time.perf_counter() - started, failed=True)
+                    recorded = True
+                    raise
+                finally:
+                    metrics.observe(
+                        "evaluator_http_seconds", time.perf_counter() - started
+                    )
+                self.breaker.record(time.perf_counter() - started, failed=False)
+                recorded = True
+                return result
+        except asyncio.TimeoutError:
+            if acquired:
+                raise
+            # Бюджет кончился в очереди планировщика
+            metrics.inc("deadline_exceeded")
+            raise DeadlineExceeded("Бюджет времени запроса исчерпан") from None
+        finally:
+            if not recorded:
+                # Отмена или не дождались слота — сервис тут ни при чём
+                self.breaker.release()
+
+
+class CascadeEvaluator(EvaluatorBackend):
+    """
+    Каскад: дешёвая первая ступень, полная модель — только для спорных ответов.
+
+    Первая ступень (EVALUATION_CASCADE_FIRST_TIER) — локальная оценка по
+    эталону (local) или лёгкая модель EVALUATION_CASCADE_LIGHT_MODEL (model).
+    Полной модели передаётся ответ, если оценка первой ступени попала в
+    полосу [EVALUATION_CASCADE_LOW, EVALUATION_CASCADE_HIGH], не удалась или
+    невозможна (нет эталона для local).
+
+    Метрики: cascade_accepted и cascade_escalated, доля эскалаций
+    cascade_escalation_ratio и оценка сэкономленного на полной модели:
+    cascade_saved_seconds и cascade_saved_tokens (по средним задержке и
+    расходу токенов полной модели).
+    """
+
+    name = "cascade"
+    FIRST_TIERS = ("local", "model")
+
+    def __init__(self):
+        if settings.EVALUATION_CASCADE_FIRST_TIER not in self.FIRST_TIERS:
+            raise ValueError(
+                f"Неизвестная EVALUATION_CASCADE_FIRST_TIER="
+                f"{settings.EVALUATION_CASCADE_FIRST_TIER!r}, "
+                f"допустимые: {', '.join(self.FIRST_TIERS)}"
+            )
+        self.first_tier = settings.EVALUATION_CASCADE_FIRST_TIER
+        self.service = gigachat_service
+
+    @property
+    def is_available(self) -> bool:
+        return not self.service.breaker.is_open
+
+    @property
+    def is_probing(self) -> bool:
+        return self.service.breaker.is_probing
+
+    async def start(self) -> None:
+        await self.service.start()
+
+    async def close(self) -> None:
+        await self.service.close()
+
+    async def warm(
+        self,
+        question: str,
+        reference_answer: Optional[str],
+        generate_reference: bool = False,
+    ) -> None:
+        await super().warm(question, reference_answer)
+        await self.service.warm(question, reference_answer, generate_reference)
+
+    async def evaluate_answer(
+        self, question: str, user_answer: str, reference_answer: Optional[str] = None
+    ) -> tuple[float, dict]:
+        # Пустые ответы и "не знаю" сервис оценивает без запроса оценки;
+        # для вопроса без эталона он сгенерирует правильный ответ
+        if (
+            not user_answer
+            or not user_answer.strip()
+            or is_not_know_answer(user_answer)
+        ):
+            return await self.service.evaluate_answer(
+                question, user_answer, reference_answer
+            )
+        return await self._evaluate(question, user_answer, reference_answer)
+
+    async def _evaluate(
+        self, question: str, user_answer: str, reference_answer: Optional[str]
+    ) -> tuple[float, dict]:
+        started = time.perf_counter()
+        first = await self._first_tier(question, user_answer, reference_answer)
+        first_seconds = time.perf_counter() - started
+        metrics.observe("cascade_first_tier_seconds", first_seconds)
+
+        if first is not None and not self.is_uncertain(first[0]):
+            metrics.inc("cascade_accepted")
+            self._record_savings(reference_answer, first_seconds)
+            self._update_ratio()
+            return first
+
+        metrics.inc("cascade_escalated")
+        self._update_ratio()
+        started = time.perf_counter()
+        result = await self.service.evaluate_answer(
+            question, user_answer, reference_answer
+        )
+        if not needs_regrading(result[1]):
+            metrics.observe("cascade_full_seconds", time.perf_counter() - started)
+        return result
+
+    async def _first_tier(
+        self, question: str, user_answer: str, reference_answer: Optional[str]
+    ) -> Optional[tuple[float, dict]]:
+        """Оценка первой ступени; None — её нет, ответ идёт полной модели"""
+        if self.first_tier == "local":
+            if not reference_answer or not reference_answer.strip():
+                return None
+            score = score_against_reference(user_answer, reference_answer)
+            return score, plain_evaluation(LOCAL_FEEDBACK, reference_answer)
+
+        result = await self.service.evaluate_answer(
+            question,
+            user_answer,
+            reference_answer,
+            model=settings.EVALUATION_CASCADE_LIGHT_MODEL,
+        )
+        if needs_regrading(result[1]):
+            return None
+        return result
+
+    @staticmethod
+    def is_uncertain(score: float) -> bool:
+        """Попала ли оценка в полосу, где решает полная модель"""
+        return (
+            settings.EVALUATION_CASCADE_LOW <= score <= settings.EVALUATION_CASCADE_HIGH
+        )
+
+    def _record_savings(
+        self, reference_answer: Optional[str], first_seconds: float
+    ) -> None:
+        # Сколько стоил бы ответ полной модели — по средним её прошлых оценок
+        full_seconds = metrics.average("cascade_full_seconds")
+        if full_seconds is not None:
+            metrics.inc("cascade_saved_seconds", max(0.0, full_seconds - first_seconds))
+
+        kind = f"evaluation_{self.service.prompt_mode(reference_answer)}"
+        full_tokens = self._average_tokens(kind)
+        if full_tokens is None:
+            return
+        first_tokens = 0.0
+        if self.first_tier == "model":
+            first_tokens = (
+                self._average_tokens(
+                    model_kind(kind, settings.EVALUATION_CASCADE_LIGHT_MODEL)
+                )
+                or 0.0
+            )
+        metrics.inc("cascade_saved_tokens", max(0.0, full_tokens - first_tokens))
+
+    @staticmethod
+    def _average_tokens(kind: str) -> Optional[float]:
+        prompt = metrics.average(f"gigachat_{kind}_prompt_tokens")
+        completion = metrics.average(f"gigachat_{kind}_completion_tokens")
+        if prompt is None or completion is None:
+            return None
+        return prompt + completion
+
+    @staticmethod
+    def _update_ratio() -> None:
+        accepted = metrics.get("cascade_accepted")
+        escalated = metrics.get("cascade_escalated")
+        metrics.set_gauge(
+            "cascade_escalation_ratio", escalated / (accepted + escalated)
+        )
+
+
+EVALUATOR_BACKENDS: dict[str, type[EvaluatorBackend]] = {
+    backend.name: backend
+    for backend in (GigaChatEvaluator, LocalEvaluator, HttpEvaluator, CascadeEvaluator)
+}
+
+
+def create_evaluator(name: str) -> EvaluatorBackend:
+    """Создать бэкенд оценки по имени из настроек"""
+    try:
+        return EVALUATOR_BACKENDS[name]()
+    except KeyError:
+        raise ValueError(
+            f"Неизвестный EVALUATOR_BACKEND={name!r}, "
+            f"допустимые: {', '.join(EVALUATOR_BACKENDS)}"
+        ) from None
+
+
+# Бэкенд оценки процесса; жизненным циклом управляют app.main и app.worker
+evaluator = create_evaluator(settings.EVALUATOR_BACKEND)
@@ -0,0 +1,127 @@
+"""
+Структурированная оценка ответа и её отображение.
+
+Оценка — словарь с полями:
+- feedback — комментарий (у оценок без модели — единственный текст);
+- score — оценка от 0 до 1 (только у оценок моделью);
+- strengths, weaknesses, recommendations — списки;
+- correct_answer — правильный ответ.
+
+В базе оценка хранится в JSONB (user_answers.evaluation,
+evaluation_cache.evaluation), markdown собирается при чтении и только из
+запрошенных полей. Правильный ответ, совпадающий с эталоном вопроса, не
+хранится повторно: вместо него флаг reference.
+"""
+
+from typing import Iterable, Optional
+
+# Поля оценки в порядке отображения
+EVALUATION_FIELDS = (
+    "feedback",
+    "score",
+    "strengths",
+    "weaknesses",
+    "recommendations",
+    "correct_answer",
+)
+
+SECTION_TITLES = {
+    "score": "Оценка",
+    "strengths": "Сильные стороны",
+    "weaknesses": "Что нужно улучшить",
+    "recommendations": "Рекомендации",
+    "correct_answer": "Правильный ответ",
+}
+
+# Флаг «правильный ответ — эталон вопроса» вместо копии текста эталона
+REFERENCE_FLAG = "reference"
+
+
+def plain_evaluation(feedback: str, correct_answer: Optional[str] = None) -> dict:
+    """Оценка без модели: только текст и, если есть, правильный ответ"""
+    evaluation = {"feedback": feedback}
+    if correct_answer and correct_answer.strip():
+        evaluation["correct_answer"] = correct_answer.strip()
+    return evaluation
+
+
+def feedback_message(evaluation: Optional[dict]) -> Optional[str]:
+    """Основной текст обратной связи (без разделов)"""
+    if not evaluation:
+        return None
+    return evaluation.get("feedback")
+
+
+def select_fields(evaluation: dict, fields: Optional[Iterable[str]] = None) -> dict:
+    """Оставить только запрошенные поля; None — все"""
+    if fields is None:
+        return dict(evaluation)
+    return {field: evaluation[field] for field in fields if field in evaluation}
+
+
+def render_feedback(
+    evaluation: Optional[dict], fields: Optional[Iterable[str]] = None
+) -> Optional[str]:
+    """Собрать текст обратной связи в markdown из (запрошенных) полей оценки"""
+    if not evaluation:
+        return None
+    evaluation = select_fields(evaluation, fields)
+
+    parts = []
+    if evaluation.get("feedback"):
+        parts.append(evaluation["feedback"])
+    for field, title in SECTION_TITLES.items():
+        value = evaluation.get(field)
+        if value is None:
+            continue
+        if isinstance(value, list):
+            value = "\n".join(f"- {item}" for item in value)
+        parts.append(f"**{title}:**\n{value}")
+    return "\n\n".join(parts)
+
+
+def pack_evaluation(evaluation: dict, reference_answer: Optional[str]) -> dict:
+    """Оценка для хранения: эталон вопроса заменяется флагом"""
+    correct_answer = evaluation.get("correct_answer")
+    if (
+        correct_answer
+        and reference_answer
+        and correct_answer.strip() == reference_answer.strip()
+    ):
+        evaluation = {
+            key: value for key, value in evaluation.items() if key != "correct_answer"
+        }
+        evaluation[REFERENCE_FLAG] = True
+    return evaluation
+
+
+def needs_reference(evaluation: Optional[dict], fields=None) -> bool:
+    """Нужен ли эталон вопроса, чтобы показать запрошенные поля"""
+    if not evaluation or not evaluation.get(REFERENCE_FLAG):
+        return False
+    return fields is None or "correct_answer" in fields
+
+
+def unpack_evaluation(
+    evaluation: Optional[dict], reference_answer: Optional[str]
+) -> Optional[dict]:
+    """Оценка из хранилища: флаг эталона заменяется текстом эталона"""
+    if not evaluation or not evaluation.get(REFERENCE_FLAG):
+        return evaluation
+    evaluation = {
+        key: value for key, value in evaluation.items() if key != REFERENCE_FLAG
+    }
+    if reference_answer and reference_answer.strip():
+        evaluation["correct_answer"] = reference_answer.strip()
+    return evaluation
+
+
+def stored_evaluation(
+    evaluation: Optional[dict], feedback: Optional[str]
+) -> Optional[dict]:
+    """Оценка строки user_answers: JSONB или текст старых записей"""
+    if evaluation:
+        return evaluation
+    if feedback:
+        return plain_evaluation(feedback)
+    return None
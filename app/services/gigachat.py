@@ -1,211 +1,1002 @@
 from gigachat import GigaChat
+from gigachat.models import Chat, Messages, MessagesRole
+from gigachat.models.chat_function_call import ChatFunctionCall
 from app.config import settings
+from app.services.circuit_breaker import (
+    CircuitOpenError,
+    CircuitState,
+    make_gigachat_breaker,
+)
+from app.services.deadline import (
+    DeadlineExceeded,
+    LatencyWindow,
+    remaining,
+    timeout_for,
+)
+from app.services.feedback import (
+    EVALUATION_FIELDS,
+    feedback_message,
+    plain_evaluation,
+    select_fields,
+)
+from app.services.local_scorer import score_against_reference
+from app.services.metrics import metrics
+from app.services.scheduler import evaluation_scheduler
+from app.services.single_flight import reference_flights
+from app.services.structured_output import (
+    BATCH_EVALUATION_FUNCTION,
+    EVALUATION_FUNCTION,
+    batch_evaluation_function,
+    decode_result,
+    evaluation_fields,
+    evaluation_function,
+    normalize_evaluation,
+    response_result,
+)
+import asyncio
+import functools
+import httpx
+import json
 import logging
+import re
+import time
+from typing import AsyncIterator, Optional, Union
 
 logger = logging.getLogger(__name__)
 
+# Версия промпта оценки. Увеличивайте при изменении текста промпта или
+# формата хранимой оценки: закэшированные оценки старой версии перестанут
+# использоваться.
+PROMPT_VERSION = "v4"
+
+# Режимы промпта оценки (EVALUATION_PROMPT_MODE)
+PROMPT_MODE_GROUNDED = "grounded"
+PROMPT_MODE_FULL = "full"
+
+
+def prompt_version_prefix() -> str:
+    """Часть версии промпта, задающая бэкенд (у GigaChat — пустая)"""
+    if settings.EVALUATOR_BACKEND == "cascade":
+        # Результат каскада зависит от первой ступени
+        return f"cascade-{settings.EVALUATION_CASCADE_FIRST_TIER}-"
+    if settings.EVALUATOR_BACKEND != "gigachat":
+        # Оценки других бэкендов не смешиваются с оценками модели
+        return f"{settings.EVALUATOR_BACKEND}-"
+    return ""
+
+
+def current_prompt_version() -> str:
+    """Версия промпта с учётом режима и бэкенда — часть ключа кэша оценок"""
+    version = f"{prompt_version_prefix()}{PROMPT_VERSION}"
+    if settings.EVALUATOR_BACKEND not in ("gigachat", "cascade"):
+        return version
+    return f"{version}-{settings.EVALUATION_PROMPT_MODE}"
+
+
+def stale_prompt_version_patterns() -> tuple[str, str]:
+    """
+    Регулярные выражения для очистки кэша оценок: версии текущего бэкенда
+    и версии текущего промпта этого бэкенда.
+
+    Устаревшими считаются только оценки текущего бэкенда с другой версией
+    промпта: процесс с другим EVALUATOR_BACKEND (воркер, переоценка) не
+    удаляет чужие оценки, а смена режима промпта — оценки другого режима.
+    """
+    prefix = prompt_version_prefix()
+    return f"^{prefix}v[0-9]+(-|$)", f"^{prefix}{PROMPT_VERSION}(-|$)"
+
+
+# Ответы-заглушки при сбое оценки; такие результаты не кэшируются
+EVALUATION_FAILED_MESSAGE = "Не удалось оценить ответ. Пожалуйста, попробуйте еще раз."
+PARSING_FAILED_MESSAGE = "Не удалось обработать ответ. Пожалуйста, попробуйте еще раз."
+AUTO_EVALUATION_FAILED_MESSAGE = (
+    "Не удалось оценить ответ автоматически. Пожалуйста, попробуйте еще раз."
+)
+FAILED_EVALUATION_MESSAGES = frozenset(
+    {EVALUATION_FAILED_MESSAGE, PARSING_FAILED_MESSAGE, AUTO_EVALUATION_FAILED_MESSAGE}
+)
+
+# Начало обратной связи при локальной оценке, пока GigaChat недоступен.
+# Такие оценки не кэшируются и переоцениваются моделью позже.
+PROVISIONAL_FEEDBACK_PREFIX = "Предварительная оценка"
+
+
+def needs_regrading(evaluation: Union[dict, str, None]) -> bool:
+    """
+    Нужно ли переоценить ответ моделью: сбой или локальная оценка.
+
+    Принимает оценку или текст обратной связи (старые записи user_answers).
+    """
+    feedback = (
+        feedback_message(evaluation) if isinstance(evaluation, dict) else evaluation
+    )
+    if not feedback:
+        return False
+    return feedback in FAILED_EVALUATION_MESSAGES or feedback.startswith(
+        PROVISIONAL_FEEDBACK_PREFIX
+    )
+
+
+def provisional_evaluation(
+    user_answer: str, reference_answer: Optional[str]
+) -> tuple[float, dict]:
+    """
+    Оценка без модели: по совпадению с эталонным ответом из базы.
+
+    Результат предварительный — needs_regrading() для него истинно,
+    и ответ будет переоценен моделью, когда сервис оценки восстановится.
+    """
+    if not reference_answer or not reference_answer.strip():
+        # Сравнивать не с чем — возвращаем базовую оценку
+        return 0.0, plain_evaluation(AUTO_EVALUATION_FAILED_MESSAGE)
+
+    metrics.inc("evaluations_fallback_local")
+    score = score_against_reference(user_answer, reference_answer)
+    feedback = (
+        f"{PROVISIONAL_FEEDBACK_PREFIX}: сервис оценки временно недоступен, "
+        "ответ сравнён с эталоном автоматически. Оценка будет уточнена позже."
+    )
+    return score, plain_evaluation(feedback, reference_answer)
+
+
+EMPTY_ANSWER_MESSAGE = (
+    "Вы не предоставили ответ на вопрос. Пожалуйста, попробуйте ответить еще раз."
+)
+
+# Фразы, по которым ответ считается ответом "не знаю"
+NOT_KNOW_PHRASES = (
+    "не знаю",
+    "не помню",
+    "не уверен",
+    "затрудняюсь ответить",
+    "не могу ответить",
+)
+
+
+def is_not_know_answer(user_answer: str) -> bool:
+    """Содержит ли ответ признание, что пользователь не знает ответа"""
+    answer = user_answer.lower()
+    return any(phrase in answer for phrase in NOT_KNOW_PHRASES)
+
+
+# Критерии оценки, общие для одиночного и пакетного промптов
+EVALUATION_CRITERIA = """
+        Критерии оценки:
+        1. Если ответ пустой или не содержит полезной информации - оценка 0
+        2. Если ответ содержит только общие фразы без конкретики - оценка 0
+        3. Если ответ частично верный, но неполный - оценка 0.3-0.4
+        4. Если ответ верный, но с неточностями - оценка 0.5-0.7
+        5. Если ответ полностью верный - оценка 0.8-1.0
+        
+        Дополнительные критерии оценки:
+        - Техническая точность: насколько точно описаны технические детали
+        - Полнота ответа: охвачены ли все важные аспекты вопроса
+        - Структура ответа: логичность и последовательность изложения
+        - Примеры и иллюстрации: наличие конкретных примеров кода или аналогий
+        - Терминология: правильное использование профессиональной терминологии
+"""
+
+EVALUATION_FIELDS_FORMAT = """
+            "score": число от 0 до 1,
+            "feedback": "подробный комментарий к ответу с указанием, что именно было неверно или неполно",
+            "recommendations": [
+                "конкретные рекомендации по улучшению ответа",
+                "что именно нужно добавить или исправить",
+                "какие аспекты были упущены"
+            ],
+            "strengths": [
+                "сильные стороны ответа",
+                "что было сделано хорошо"
+            ],
+            "weaknesses": [
+                "слабые стороны ответа",
+                "что нужно улучшить"
+            ]"""
+
+EVALUATION_JSON_FORMAT = "{" + EVALUATION_FIELDS_FORMAT + """,
+            "correct_answer": "развернутый правильный ответ на вопрос"
+        }"""
+
+# В режиме grounded правильный ответ берётся из базы, модель его не пишет
+GROUNDED_JSON_FORMAT = "{" + EVALUATION_FIELDS_FORMAT + "\n        }"
+
+EVALUATION_RULES = """
+        Важно:
+        1. Будь строг в оценке. Ответ "не знаю" или "не помню" должен получить оценку 0
+        2. Предоставляй конкретные рекомендации по улучшению
+        3. Указывай как сильные, так и слабые стороны ответа
+        4. Если в ответе есть код, проверь его на корректность и соответствие лучшим практикам
+        5. Обрати внимание на использование правильной терминологии
+        6. Проверь, все ли важные аспекты вопроса были затронуты
+        7. Не добавляй дату и источник в ответ
+        8. Не используй форматирование типа "ИсточникРекомендации:"
+        9. Давай только чистый текст без дополнительных метаданных
+"""
+
+GROUNDED_RULES = """        10. Не пересказывай эталонный ответ: пользователь увидит его отдельно
+        11. Будь краток: не больше трёх пунктов в каждом списке
+"""
+
+
+@functools.lru_cache(maxsize=settings.EVALUATION_CACHE_SIZE)
+def _evaluation_prompt_parts(
+    question: str, reference_answer: Optional[str], structured: bool
+) -> tuple[str, str]:
+    """
+    Части промпта оценки до и после ответа пользователя.
+
+    Зависят только от вопроса, поэтому собираются один раз на вопрос
+    (заранее — при выдаче вопроса, см. GigaChatService.warm).
+    reference_answer передаётся только в режиме grounded.
+    """
+    grounded = reference_answer is not None
+    if structured:
+        response_format = f"Верни оценку, вызвав функцию {EVALUATION_FUNCTION}."
+    else:
+        response_format = "Верни ответ в формате JSON:\n        " + (
+            GROUNDED_JSON_FORMAT if grounded else EVALUATION_JSON_FORMAT
+        )
+
+    if grounded:
+        head = f"""
+        Ты - строгий экзаменатор по Python. Оцени ответ пользователя на вопрос интервью, сравнив его с эталонным ответом.
+        
+        Вопрос: {question}
+        Эталонный ответ: {reference_answer.strip()}
+        Ответ пользователя: """
+        tail = f"""
+        {EVALUATION_CRITERIA}
+        {response_format}
+        {EVALUATION_RULES}{GROUNDED_RULES}
+        """
+        return head, tail
+
+    head = f"""
+        Ты - строгий экзаменатор по Python. Оцени ответ пользователя на вопрос интервью.
+        
+        Вопрос: {question}
+        Ответ пользователя: """
+    tail = f"""
+        
+        Сначала сгенерируй правильный ответ на вопрос, а затем оцени ответ пользователя.
+        {EVALUATION_CRITERIA}
+        {response_format}
+        {EVALUATION_RULES}
+        """
+    return head, tail
+
+
+@functools.lru_cache(maxsize=None)
+def _evaluation_function(grounded: bool):
+    """Схема функции оценки; их всего две, собираем один раз"""
+    return evaluation_function(evaluation_fields(grounded))
+
+
+def _function_call_payload(prompt: str, function) -> Chat:
+    """Запрос, в котором модель обязана ответить вызовом функции"""
+    return Chat(
+        messages=[Messages(role=MessagesRole.USER, content=prompt)],
+        functions=[function],
+        function_call=ChatFunctionCall(name=function.name),
+    )
+
+
+def _request_timeout() -> tuple[float, bool]:
+    """
+    Таймаут запроса к модели: GIGACHAT_REQUEST_TIMEOUT, но не дольше остатка
+    бюджета, и признак, что его ограничивает именно бюджет вызывающего
+    """
+    timeout = timeout_for(settings.GIGACHAT_REQUEST_TIMEOUT)
+    return timeout, timeout < settings.GIGACHAT_REQUEST_TIMEOUT
+
+
+def _with_model(payload: Union[Chat, str], model: Optional[str]) -> Union[Chat, str]:
+    """Запрос к указанной модели вместо модели клиента"""
+    if model is None:
+        return payload
+    if isinstance(payload, str):
+        return Chat(
+            model=model, messages=[Messages(role=MessagesRole.USER, content=payload)]
+        )
+    return payload.copy(update={"model": model})
+
+
+def model_kind(kind: str, model: Optional[str]) -> str:
+    """Вид запроса для метрик: запросы к другой модели учитываются отдельно"""
+    if model is None:
+        return kind
+    return f"{kind}_{re.sub(r'[^a-z0-9]+', '_', model.lower())}"
+
+
+def _fill_correct_answer(evaluation: dict, reference_answer: Optional[str]) -> None:
+    """Подставить эталон из базы, если модель не вернула правильный ответ"""
+    if "correct_answer" not in evaluation and reference_answer:
+        evaluation["correct_answer"] = reference_answer.strip()
+
+
+class ConnectionTrace:
+    """
+    Трассировка одного HTTP-запроса через расширение httpcore "trace":
+    открывалось ли для запроса новое TCP-соединение
+    """
+
+    def __init__(self):
+        self.opened = False
+
+    async def __call__(self, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.opened = True
+
+
+async def _trace_request(request: httpx.Request) -> None:
+    """Хук запроса httpx: подключить трассировку соединения"""
+    request.extensions["trace"] = ConnectionTrace()
+
+
+async def _count_connection(response: httpx.Response) -> None:
+    """Хук ответа httpx: учесть новое или переиспользованное соединение"""
+    trace = response.request.extensions.get("trace")
+    if not isinstance(trace, ConnectionTrace):
+        return
+    if trace.opened:
+        metrics.inc("gigachat_connections_opened")
+    else:
+        metrics.inc("gigachat_connections_reused")
+
+
+def _instrument_http_client(client: GigaChat) -> None:
+    """
+    Повесить хуки учёта соединений на HTTP-клиент SDK.
+
+    SDK не принимает свой httpx-клиент или хуки, поэтому клиент берётся из
+    атрибута _aclient. Если после обновления SDK его там нет, метрики
+    соединений отключаются с предупреждением, а запросы работают как прежде.
+    """
+    http_client = getattr(client, "_aclient", None)
+    if not isinstance(http_client, httpx.AsyncClient):
+        logger.warning(
+            "HTTP-клиент GigaChat SDK не найден, метрики соединений отключены"
+        )
+        return
+    hooks = http_client.event_hooks
+    http_client.event_hooks = {
+        "request": [*hooks["request"], _trace_request],
+        "response": [*hooks["response"], _count_connection],
+    }
+
 
 class GigaChatService:
+    """
+    Сервис оценки ответов через GigaChat.
+
+    Один экземпляр клиента живёт всё время работы воркера: keep-alive
+    соединения и токен доступа переиспользуются между запросами.
+    """
+
     def __init__(self):
         self.client = GigaChat(
             credentials=settings.GIGACHAT_CREDENTIALS,
+            model=settings.GIGACHAT_MODEL,
             verify_ssl_certs=False,  # Отключаем проверку SSL-сертификата
         )
+        self.breaker = make_gigachat_breaker()
+        _instrument_http_client(self.client)
+        # Недавние задержки по видам запросов: порог для hedging
+        self._latency: dict[str, LatencyWindow] = {}
+        # Сгенерированные правильные ответы для вопросов без эталона.
+        # Банк вопросов конечен, поэтому словарь не растёт бесконечно.
+        self._generated_answers: dict[str, str] = {}
+
+    async def start(self) -> None:
+        """
+        Получить токен заранее, при старте воркера.
+
+        Дальше токен обновляет сам SDK: получив 401 на истёкший токен, он
+        запрашивает новый и повторяет запрос.
+        """
+        try:
+            await self.client.aget_token()
+            metrics.inc("gigachat_token_fetches")
+        except Exception as e:
+            # Не мешаем запуску приложения: токен будет запрошен при первом вызове
+            logger.error(f"Не удалось получить токен GigaChat при старте: {str(e)}")
+
+    async def close(self) -> None:
+        """Закрыть HTTP-соединения клиента"""
+        try:
+            await self.client.aclose()
+        except Exception as e:
+            logger.error(f"Ошибка при закрытии клиента GigaChat: {str(e)}")
+
+    async def _chat(self, payload, kind: str = "chat", model: Optional[str] = None):
+        """
+        Запрос к GigaChat через общий клиент с учётом лимитов планировщика.
+
+        Запрос укладывается в бюджет времени (app.services.deadline): при
+        исчерпанном бюджете — DeadlineExceeded, при разомкнутом
+        предохранителе — CircuitOpenError. Если включён hedging, а ответа нет
+        дольше обычного, параллельно отправляется второй запрос.
+        kind — вид запроса для метрик длительности и расхода токенов,
+        model — модель вместо модели клиента (лёгкая ступень каскада).
+        """
+        payload = _with_model(payload, model)
+        kind = model_kind(kind, model)
+        # Бюджет уже исчерпан — не встаём в очередь планировщика
+        budget = timeout_for(settings.GIGACHAT_REQUEST_TIMEOUT)
+        hedge_delay = self._hedge_delay(kind)
+        if hedge_delay is None or hedge_delay >= budget:
+            return await self._attempt(payload, kind)
+        return await self._hedged(payload, kind, hedge_delay)
+
+    def _hedge_delay(self, kind: str) -> Optional[float]:
+        """Через сколько секунд отправлять второй запрос; None — не отправлять"""
+        if not settings.GIGACHAT_HEDGE_ENABLED:
+            return None
+        window = self._latency.get(kind)
+        if window is None or len(window) < settings.GIGACHAT_HEDGE_MIN_SAMPLES:
+            return None
+        return max(
+            settings.GIGACHAT_HEDGE_MIN_DELAY,
+            window.quantile(settings.GIGACHAT_HEDGE_QUANTILE),
+        )
+
+    async def _hedged(self, payload, kind: str, hedge_delay: float):
+        """Первый запрос, а если он задерживается — ещё один; берём первый ответ"""
+        first = asyncio.create_task(self._attempt(payload, kind))
+        attempts = [first]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=hedge_delay)
+            # Пробный запрос полуоткрытого предохранителя не дублируем
+            if not done and self.breaker.state == CircuitState.CLOSED:
+                metrics.inc("gigachat_hedged_requests")
+                attempts.append(asyncio.create_task(self._attempt(payload, kind)))
+
+            pending = set(attempts)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            metrics.inc("gigachat_hedge_wins")
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in attempts:
+                task.cancel()
+
+    async def _attempt(self, payload, kind: str):
+        """
+        Одна попытка запроса.
+
+        Слот планировщика ждём не дольше остатка бюджета запроса. Таймаут
+        самого запроса считается после получения слота: GIGACHAT_REQUEST_TIMEOUT,
+        но не дольше остатка бюджета. Если время кончилось из-за бюджета
+        вызывающего (очередь, короткий срок), а не из-за провайдера, —
+        DeadlineExceeded, и предохранитель сбоем это не считает.
+        """
+        self.breaker.before_request()
+        recorded = False
+        acquired = False
+        try:
+            async with evaluation_scheduler.slot(timeout=remaining()):
+                acquired = True
+                timeout, limited_by_budget = _request_timeout()
+                started = time.perf_counter()
+                try:
+                    response = await asyncio.wait_for(
+                        self.client.achat(payload), timeout
+                    )
+                except asyncio.TimeoutError:
+                    if limited_by_budget:
+                        metrics.inc("deadline_exceeded")
+                        raise DeadlineExceeded(
+                            "Бюджет времени запроса исчерпан"
+                        ) from None
+                    self.breaker.record(time.perf_counter() - started, failed=True)
+                    recorded = True
+                    raise
+                except Exception:
+                    self.breaker.record(time.perf_counter() - started, failed=True)
+                    recorded = True
+                    raise
+                finally:
+                    metrics.inc("gigachat_requests")
+                    metrics.observe(
+                        "gigachat_request_seconds", time.perf_counter() - started
+                    )
+
+                duration = time.perf_counter() - started
+                self.breaker.record(duration, failed=False)
+                recorded = True
+                self._latency.setdefault(kind, LatencyWindow()).observe(duration)
+                self._record_usage(kind, response, duration)
+                return response
+        except asyncio.TimeoutError:
+            if acquired:
+                raise
+            # Бюджет кончился в очереди планировщика
+            metrics.inc("deadline_exceeded")
+            raise DeadlineExceeded("Бюджет времени запроса исчерпан") from None
+        finally:
+            if not recorded:
+                # Отмена, исчерпанный бюджет или не дождались слота —
+                # провайдер тут ни при чём
+                self.breaker.release()
+
+    def _record_usage(self, kind: str, response, duration: float) -> None:
+        """Учесть длительность и расход токенов запроса по его виду"""
+        metrics.observe(f"gigachat_{kind}_seconds", duration)
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        metrics.observe(f"gigachat_{kind}_prompt_tokens", usage.prompt_tokens)
+        metrics.observe(f"gigachat_{kind}_completion_tokens", usage.completion_tokens)
+        metrics.inc("gigachat_prompt_tokens", usage.prompt_tokens)
+        metrics.inc("gigachat_completion_tokens", usage.completion_tokens)
+
+    async def stream_evaluation(
+        self, question: str, user_answer: str, reference_answer: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Потоковая оценка: фрагменты ответа модели по мере генерации"""
+        # Бюджет уже исчерпан — не встаём в очередь планировщика
+        timeout_for(settings.GIGACHAT_REQUEST_TIMEOUT)
+        self.breaker.before_request()
+        kind = f"stream_{self.prompt_mode(reference_answer)}"
+        recorded = False
+        acquired = False
+        try:
+            async with evaluation_scheduler.slot(timeout=remaining()):
+                acquired = True
+                started = time.perf_counter()
+                first_chunk = True
+                last_chunk = None
+                try:
+                    chunks = self.client.astream(
+                        self.build_evaluation_prompt(
+                            question, user_answer, reference_answer
+                        )
+                    ).__aiter__()
+                    while True:
+                        # Пауза между фрагментами ограничена таймаутом запроса
+                        # и остатком бюджета
+                        timeout, limited_by_budget = _request_timeout()
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                        except StopAsyncIteration:
+                            break
+                        except asyncio.TimeoutError:
+                            if limited_by_budget:
+                                metrics.inc("deadline_exceeded")
+                                raise DeadlineExceeded(
+                                    "Бюджет времени запроса исчерпан"
+                                ) from None
+                            raise
+                        last_chunk = chunk
+                        if not chunk.choices or not chunk.choices[0].delta.content:
+                            continue
+                        if first_chunk:
+                            metrics.observe(
+                                "gigachat_first_chunk_seconds",
+                                time.perf_counter() - started,
+                            )
+                            first_chunk = False
+                        yield chunk.choices[0].delta.content
+                except DeadlineExceeded:
+                    # Кончился бюджет вызывающего — провайдер ни при чём
+                    raise
+                except Exception:
+                    self.breaker.record(time.perf_counter() - started, failed=True)
+                    recorded = True
+                    raise
+                finally:
+                    metrics.inc("gigachat_requests")
+                    metrics.observe(
+                        "gigachat_request_seconds", time.perf_counter() - started
+                    )
+
+                self.breaker.record(time.perf_counter() - started, failed=False)
+                recorded = True
+                # Расход токенов приходит в последнем фрагменте
+                self._record_usage(kind, last_chunk, time.perf_counter() - started)
+        except asyncio.TimeoutError:
+            if acquired:
+                raise
+            # Бюджет кончился в очереди планировщика
+            metrics.inc("deadline_exceeded")
+            raise DeadlineExceeded("Бюджет времени запроса исчерпан") from None
+        finally:
+            if not recorded:
+                # Клиент отключился, исчерпан бюджет или не дождались слота —
+                # провайдер ни при чём
+                self.breaker.release()
+
+    async def get_correct_answer(
+        self, question: str, reference_answer: Optional[str] = None
+    ) -> str:
+        """
+        Правильный ответ на вопрос: эталон из базы, если он есть,
+        иначе ответ, сгенерированный моделью один раз на вопрос
+        """
+        if reference_answer and reference_answer.strip():
+            metrics.inc("reference_answers_stored")
+            return reference_answer.strip()
+
+        if question in self._generated_answers:
+            metrics.inc("reference_answers_cached")
+            return self._generated_answers[question]
+
+        # Ответ может уже генерироваться для этого вопроса (см. warm)
+        return await reference_flights.run(
+            question, lambda: self._generate_correct_answer(question)
+        )
+
+    async def _generate_correct_answer(self, question: str) -> str:
+        metrics.inc("reference_answers_generated")
+        correct_answer_prompt = f"""
+        Ты - опытный Python-разработчик и интервьюер. 
+        Дай развернутый и правильный ответ на следующий вопрос интервью:
+        
+        Вопрос: {question}
+        
+        Требования к ответу:
+        1. Ответ должен быть полным и точным
+        2. Используй профессиональную терминологию
+        3. Приведи примеры кода, если это уместно
+        4. Объясни сложные концепции простым языком
+        5. Укажи практическое применение
+        6. Не добавляй дату и источник
+        7. Давай только чистый текст без дополнительных метаданных
+        """
+
+        correct_answer_response = await self._chat(
+            correct_answer_prompt, kind="reference_answer"
+        )
+        correct_answer = correct_answer_response.choices[0].message.content
+        self._generated_answers[question] = correct_answer
+        return correct_answer
+
+    async def warm(
+        self,
+        question: str,
+        reference_answer: Optional[str],
+        generate_reference: bool = False,
+    ) -> None:
+        """
+        Подготовить всё, что зависит только от вопроса: части промпта оценки
+        и, при generate_reference, правильный ответ для вопроса без эталона
+        """
+        grounded = self.prompt_mode(reference_answer) == PROMPT_MODE_GROUNDED
+        _evaluation_prompt_parts(
+            question,
+            reference_answer if grounded else None,
+            settings.EVALUATION_STRUCTURED_OUTPUT,
+        )
+        if generate_reference and not (reference_answer and reference_answer.strip()):
+            await self.get_correct_answer(question)
+
+    def prompt_mode(self, reference_answer: Optional[str]) -> str:
+        """Режим промпта: grounded возможен только при наличии эталона"""
+        if (
+            settings.EVALUATION_PROMPT_MODE == PROMPT_MODE_GROUNDED
+            and reference_answer
+            and reference_answer.strip()
+        ):
+            return PROMPT_MODE_GROUNDED
+        return PROMPT_MODE_FULL
+
+    def build_evaluation_prompt(
+        self,
+        question: str,
+        user_answer: str,
+        reference_answer: Optional[str] = None,
+        structured: bool = False,
+    ) -> str:
+        """
+        Промпт оценки ответа пользователя.
+
+        structured — ответ придёт вызовом функции, описывать JSON в тексте не нужно.
+        """
+        grounded = self.prompt_mode(reference_answer) == PROMPT_MODE_GROUNDED
+        head, tail = _evaluation_prompt_parts(
+            question, reference_answer if grounded else None, structured
+        )
+        return head + user_answer + tail
+
+    def build_evaluation_payload(
+        self, question: str, user_answer: str, reference_answer: Optional[str] = None
+    ) -> Union[Chat, str]:
+        """
+        Запрос оценки: при EVALUATION_STRUCTURED_OUTPUT модель обязана
+        вызвать функцию со строгой схемой полей, иначе — текстовый промпт
+        """
+        if not settings.EVALUATION_STRUCTURED_OUTPUT:
+            return self.build_evaluation_prompt(question, user_answer, reference_answer)
+
+        grounded = self.prompt_mode(reference_answer) == PROMPT_MODE_GROUNDED
+        return _function_call_payload(
+            self.build_evaluation_prompt(
+                question, user_answer, reference_answer, structured=True
+            ),
+            _evaluation_function(grounded),
+        )
+
+    def build_batch_prompt(
+        self, items: list[tuple[str, str, Optional[str]]], structured: bool = False
+    ) -> str:
+        """Промпт оценки нескольких ответов за один запрос"""
+        grounded = all(
+            self.prompt_mode(reference) == PROMPT_MODE_GROUNDED
+            for _, _, reference in items
+        )
+        blocks = []
+        for index, (question, user_answer, reference) in enumerate(items, start=1):
+            lines = [f"[{index}]", f"Вопрос: {question}"]
+            if grounded:
+                lines.append(f"Эталонный ответ: {reference.strip()}")
+            lines.append(f"Ответ пользователя: {user_answer}")
+            blocks.append("".join(f"\n        {line}" for line in lines))
+        answers = "\n".join(blocks)
+        if grounded:
+            instruction = "Сравни каждый ответ пользователя с эталонным ответом."
+            fields_format = GROUNDED_JSON_FORMAT
+            rules = EVALUATION_RULES + GROUNDED_RULES
+        else:
+            instruction = "Для каждого ответа сначала сгенерируй правильный ответ на вопрос, а затем оцени ответ пользователя."
+            fields_format = EVALUATION_JSON_FORMAT
+            rules = EVALUATION_RULES
+        if structured:
+            return f"""
+        Ты - строгий экзаменатор по Python. Оцени ответы пользователя на вопросы интервью.
+        Каждый ответ оценивай независимо от остальных.
+        {answers}
+        
+        {instruction}
+        {EVALUATION_CRITERIA}
+        Верни оценки всех ответов, вызвав функцию {BATCH_EVALUATION_FUNCTION}; index — номер ответа в квадратных скобках.
+        {rules}
+        """
+
+        return f"""
+        Ты - строгий экзаменатор по Python. Оцени ответы пользователя на вопросы интервью.
+        Каждый ответ оценивай независимо от остальных.
+        {answers}
+        
+        {instruction}
+        {EVALUATION_CRITERIA}
+        Верни ответ в формате JSON:
+        {{
+            "evaluations": [
+                {{
+                    "index": номер ответа в квадратных скобках,
+                    ...остальные поля оценки
+                }}
+            ]
+        }}
+        Поля оценки каждого ответа:
+        {fields_format}
+        {rules}
+        """
+
+    def decode_evaluation(
+        self, result: Union[dict, str, None], reference_answer: Optional[str] = None
+    ) -> tuple[Optional[dict], list[str]]:
+        """
+        Разобрать ответ модели: аргументы вызова функции или JSON в тексте.
+
+        Почти корректный JSON чинится; если модель не вернула правильный
+        ответ (режим grounded), подставляется эталон из базы.
+
+        Returns:
+            (оценка или None, если ответ не разобрать; отсутствующие поля)
+        """
+        evaluation, repaired = decode_result(result)
+        if repaired and evaluation is not None:
+            metrics.inc("evaluation_parse_repaired")
+        if evaluation is None:
+            logger.error(f"Не удалось разобрать ответ GigaChat: {result}")
+            return None, []
+
+        _fill_correct_answer(evaluation, reference_answer)
+        return evaluation, normalize_evaluation(evaluation, evaluation_fields(False))
+
+    def evaluation_result(
+        self, evaluation: Optional[dict], missing: list[str]
+    ) -> tuple[float, dict]:
+        """Оценка и её поля; заглушка, если разбор не удался"""
+        if evaluation is None:
+            metrics.inc("evaluation_parse_failed")
+            return 0.0, plain_evaluation(PARSING_FAILED_MESSAGE)
+        if missing:
+            logger.error(f"В оценке GigaChat нет полей {missing}: {evaluation}")
+            metrics.inc("evaluation_parse_failed")
+            return 0.0, plain_evaluation(EVALUATION_FAILED_MESSAGE)
+
+        metrics.inc("evaluation_parse_ok")
+        return evaluation["score"], select_fields(evaluation, EVALUATION_FIELDS)
+
+    def parse_evaluation(
+        self, result: Union[dict, str, None], reference_answer: Optional[str] = None
+    ) -> tuple[float, dict]:
+        """Разобрать ответ модели в оценку и её поля"""
+        return self.evaluation_result(*self.decode_evaluation(result, reference_answer))
+
+    async def _reask_missing_fields(
+        self,
+        question: str,
+        user_answer: str,
+        reference_answer: Optional[str],
+        evaluation: dict,
+        missing: list[str],
+        model: Optional[str] = None,
+    ) -> tuple[dict, list[str]]:
+        """Дозапросить у модели только недостающие поля оценки"""
+        metrics.inc("evaluation_parse_reask")
+        known = {key: value for key, value in evaluation.items() if key not in missing}
+        reference = (
+            f"\n        Эталонный ответ: {reference_answer.strip()}"
+            if self.prompt_mode(reference_answer) == PROMPT_MODE_GROUNDED
+            else ""
+        )
+        prompt = f"""
+        Ты - строгий экзаменатор по Python. Ты уже оценил ответ пользователя на вопрос интервью, но в оценке не хватает полей: {", ".join(missing)}.
+        
+        Вопрос: {question}{reference}
+        Ответ пользователя: {user_answer}
+        Оценка: {json.dumps(known, ensure_ascii=False)}
+        
+        Верни только недостающие поля.
+        """
+        if settings.EVALUATION_STRUCTURED_OUTPUT:
+            payload = _function_call_payload(prompt, evaluation_function(missing))
+        else:
+            payload = prompt + "        Ответ дай в формате JSON-объекта.\n"
+
+        response = await self._chat(payload, kind="evaluation_reask", model=model)
+        patch, _ = decode_result(response_result(response))
+        for field in missing:
+            if patch and field in patch:
+                evaluation[field] = patch[field]
+        return evaluation, normalize_evaluation(evaluation, evaluation_fields(False))
+
+    def parse_batch_evaluation(
+        self, result: Union[dict, str, None], references: list[Optional[str]]
+    ) -> list[Optional[tuple[float, dict]]]:
+        """
+        Разобрать ответ на пакетный промпт.
+
+        Возвращает список длины len(references); None — ответ, который модель
+        пропустила или вернула в неверном формате.
+        """
+        count = len(references)
+        evaluations: list[Optional[tuple[float, dict]]] = [None] * count
+        parsed, repaired = decode_result(result)
+        if parsed is None:
+            logger.error(f"Не удалось разобрать пакетную оценку GigaChat: {result}")
+            metrics.inc("evaluation_batch_parse_failed")
+            return evaluations
+        if repaired:
+            metrics.inc("evaluation_parse_repaired")
+
+        for evaluation in parsed.get("evaluations", []):
+            if not isinstance(evaluation, dict):
+                continue
+            index = evaluation.get("index")
+            if not isinstance(index, int) or not 1 <= index <= count:
+                continue
+            _fill_correct_answer(evaluation, references[index - 1])
+            if normalize_evaluation(evaluation, evaluation_fields(False)):
+                continue
+            evaluations[index - 1] = (
+                evaluation["score"],
+                select_fields(evaluation, EVALUATION_FIELDS),
+            )
+        return evaluations
+
+    async def evaluate_batch(
+        self, items: list[tuple[str, str, Optional[str]]]
+    ) -> list[Optional[tuple[float, dict]]]:
+        """
+        Оценить несколько ответов одним запросом к модели
+
+        Args:
+            items: Тройки (текст вопроса, ответ пользователя, эталонный ответ)
+
+        Returns:
+            Оценки в порядке items; None для ответов, которые не удалось разобрать
+        """
+        references = [reference for _, _, reference in items]
+        grounded = all(
+            self.prompt_mode(reference) == PROMPT_MODE_GROUNDED
+            for reference in references
+        )
+        if settings.EVALUATION_STRUCTURED_OUTPUT:
+            payload = _function_call_payload(
+                self.build_batch_prompt(items, structured=True),
+                batch_evaluation_function(evaluation_fields(grounded)),
+            )
+        else:
+            payload = self.build_batch_prompt(items)
+        try:
+            response = await self._chat(
+                payload,
+                kind=f"batch_{PROMPT_MODE_GROUNDED if grounded else PROMPT_MODE_FULL}",
+            )
+            evaluations = self.parse_batch_evaluation(
+                response_result(response), references
+            )
+        except Exception as e:
+            logger.error(f"Ошибка при пакетной оценке через GigaChat: {str(e)}")
+            evaluations = [None] * len(items)
+
+        metrics.inc("gigachat_batch_requests")
+        metrics.inc(
+            "gigachat_batch_missed_answers", sum(1 for e in evaluations if e is None)
+        )
+        return evaluations
 
     async def evaluate_answer(
-        self, question: str, user_answer: str
-    ) -> tuple[float, str]:
+        self,
+        question: str,
+        user_answer: str,
+        reference_answer: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> tuple[float, dict]:
         """
         Оценить ответ пользователя с помощью GigaChat
 
         Args:
             question: Текст вопроса
             user_answer: Ответ пользователя
+            reference_answer: Эталонный ответ из базы вопросов
+            model: Модель вместо GIGACHAT_MODEL (лёгкая ступень каскада)
 
         Returns:
-            tuple[float, str]: Оценка (от 0 до 1) и обратная связь
+            tuple[float, dict]: Оценка (от 0 до 1) и поля обратной связи
+            (см. app.services.feedback)
         """
         try:
             # Проверяем, не пустой ли ответ
             if not user_answer or user_answer.strip() == "":
-                return (
-                    0.0,
-                    "Вы не предоставили ответ на вопрос. Пожалуйста, попробуйте ответить еще раз.",
-                )
+                return 0.0, plain_evaluation(EMPTY_ANSWER_MESSAGE)
 
-            # Проверяем ответы типа "не знаю"
-            not_know_phrases = [
-                "не знаю",
-                "не помню",
-                "не уверен",
-                "затрудняюсь ответить",
-                "не могу ответить",
-            ]
-            if any(phrase in user_answer.lower() for phrase in not_know_phrases):
-                # Генерируем правильный ответ
-                correct_answer_prompt = f"""
-                Ты - опытный Python-разработчик и интервьюер. 
-                Дай развернутый и правильный ответ на следующий вопрос интервью:
-                
-                Вопрос: {question}
-                
-                Требования к ответу:
-                1. Ответ должен быть полным и точным
-                2. Используй профессиональную терминологию
-                3. Приведи примеры кода, если это уместно
-                4. Объясни сложные концепции простым языком
-                5. Укажи практическое применение
-                6. Не добавляй дату и источник
-                7. Давай только чистый текст без дополнительных метаданных
-                """
-
-                correct_answer_response = self.client.chat(correct_answer_prompt)
-                correct_answer = correct_answer_response.choices[0].message.content
-                return 0.0, f"Правильный ответ:\n{correct_answer}"
-
-            prompt = f"""
-            Ты - строгий экзаменатор по Python. Оцени ответ пользователя на вопрос интервью.
-            
-            Вопрос: {question}
-            Ответ пользователя: {user_answer}
-            
-            Сначала сгенерируй правильный ответ на вопрос, а затем оцени ответ пользователя.
-            
-            Критерии оценки:
-            1. Если ответ пустой или не содержит полезной информации - оценка 0
-            2. Если ответ содержит только общие фразы без конкретики - оценка 0
-            3. Если ответ частично верный, но неполный - оценка 0.3-0.4
-            4. Если ответ верный, но с неточностями - оценка 0.5-0.7
-            5. Если ответ полностью верный - оценка 0.8-1.0
-            
-            Дополнительные критерии оценки:
-            - Техническая точность: насколько точно описаны технические детали
-            - Полнота ответа: охвачены ли все важные аспекты вопроса
-            - Структура ответа: логичность и последовательность изложения
-            - Примеры и иллюстрации: наличие конкретных примеров кода или аналогий
-            - Терминология: правильное использование профессиональной терминологии
-            
-            Верни ответ в формате JSON:
-            {{
-                "score": число от 0 до 1,
-                "feedback": "подробный комментарий к ответу с указанием, что именно было неверно или неполно",
-                "recommendations": [
-                    "конкретные рекомендации по улучшению ответа",
-                    "что именно нужно добавить или исправить",
-                    "какие аспекты были упущены"
-                ],
-                "strengths": [
-                    "сильные стороны ответа",
-                    "что было сделано хорошо"
-                ],
-                "weaknesses": [
-                    "слабые стороны ответа",
-                    "что нужно улучшить"
-                ],
-                "correct_answer": "развернутый правильный ответ на вопрос"
-            }}
-            
-            Важно:
-            1. Будь строг в оценке. Ответ "не знаю" или "не помню" должен получить оценку 0
-            2. Предоставляй конкретные рекомендации по улучшению
-            3. Указывай как сильные, так и слабые стороны ответа
-            4. Если в ответе есть код, проверь его на корректность и соответствие лучшим практикам
-            5. Обрати внимание на использование правильной терминологии
-            6. Проверь, все ли важные аспекты вопроса были затронуты
-            7. Не добавляй дату и источник в ответ
-            8. Не используй форматирование типа "ИсточникРекомендации:"
-            9. Давай только чистый текст без дополнительных метаданных
-            """
-
-            response = self.client.chat(prompt)
-            result = response.choices[0].message.content
-
-            # Проверяем, не пустой ли ответ от GigaChat
-            if not result or result.strip() == "":
-                logger.error("Получен пустой ответ от GigaChat")
-                return 0.0, "Не удалось оценить ответ. Пожалуйста, попробуйте еще раз."
-
-            # Очищаем ответ от markdown-форматирования и лишнего текста
-            result = result.strip()
-
-            # Удаляем весь текст до первого {
-            start_idx = result.find("{")
-            if start_idx != -1:
-                result = result[start_idx:]
-
-            # Удаляем весь текст после последнего }
-            end_idx = result.rfind("}")
-            if end_idx != -1:
-                result = result[: end_idx + 1]
-
-            # Удаляем markdown-форматирование
-            result = result.replace("```json", "").replace("```", "").strip()
-
-            # Проверяем, что у нас есть валидный JSON
-            if not result.startswith("{") or not result.endswith("}"):
-                logger.error(f"Некорректный формат JSON от GigaChat: {result}")
-                return (
-                    0.0,
-                    "Не удалось обработать ответ. Пожалуйста, попробуйте еще раз.",
-                )
-
-            # Парсим JSON из ответа
-            import json
-
-            try:
-                evaluation = json.loads(result)
-            except json.JSONDecodeError as e:
-                logger.error(
-                    f"Ошибка парсинга JSON от GigaChat: {str(e)}, ответ: {result}"
-                )
-                return (
-                    0.0,
-                    "Не удалось обработать ответ. Пожалуйста, попробуйте еще раз.",
+            # На ответы типа "не знаю" показываем правильный ответ без оценки моделью
+            if is_not_know_answer(user_answer):
+                correct_answer = await self.get_correct_answer(
+                    question, reference_answer
                 )
+                return 0.0, {"correct_answer": correct_answer}
 
-            # Проверяем наличие необходимых полей
-            required_fields = [
-                "score",
-                "feedback",
-                "recommendations",
-                "strengths",
-                "weaknesses",
-                "correct_answer",
-            ]
-            if not all(key in evaluation for key in required_fields):
-                logger.error(f"Некорректный формат ответа от GigaChat: {evaluation}")
-                return 0.0, "Не удалось оценить ответ. Пожалуйста, попробуйте еще раз."
-
-            # Формируем полный фидбэк
-            feedback = f"{evaluation['feedback']}\n\n"
-            feedback += "**Оценка:**\n" + str(evaluation["score"]) + "\n\n"
-            feedback += (
-                "**Сильные стороны:**\n"
-                + "\n".join(f"- {s}" for s in evaluation["strengths"])
-                + "\n\n"
-            )
-            feedback += (
-                "**Что нужно улучшить:**\n"
-                + "\n".join(f"- {w}" for w in evaluation["weaknesses"])
-                + "\n\n"
+            # Асинхронный вызов не блокирует event loop на время ответа модели
+            response = await self._chat(
+                self.build_evaluation_payload(question, user_answer, reference_answer),
+                kind=f"evaluation_{self.prompt_mode(reference_answer)}",
+                model=model,
             )
-            feedback += (
-                "**Рекомендации:**\n"
-                + "\n".join(f"- {r}" for r in evaluation["recommendations"])
-                + "\n\n"
+            evaluation, missing = self.decode_evaluation(
+                response_result(response), reference_answer
             )
-            feedback += "**Правильный ответ:**\n" + str(evaluation["correct_answer"])
-
-            return evaluation["score"], feedback
+            if evaluation is not None and missing:
+                # Повторяем запрос только для недостающих полей, а не целиком
+                evaluation, missing = await self._reask_missing_fields(
+                    question, user_answer, reference_answer, evaluation, missing, model
+                )
+            return self.evaluation_result(evaluation, missing)
 
+        except CircuitOpenError:
+            metrics.inc("evaluations_fallback_circuit_open")
+            return provisional_evaluation(user_answer, reference_answer)
+        except (DeadlineExceeded, asyncio.TimeoutError):
+            # Не уложились в бюджет запроса — оценка уйдёт на переоценку
+            metrics.inc("evaluations_fallback_deadline")
+            return provisional_evaluation(user_answer, reference_answer)
         except Exception as e:
             logger.error(f"Ошибка при оценке ответа через GigaChat: {str(e)}")
-            # В случае ошибки возвращаем базовую оценку
-            return (
-                0.0,
-                "Не удалось оценить ответ автоматически. Пожалуйста, попробуйте еще раз.",
-            )
+            return provisional_evaluation(user_answer, reference_answer)
 
 
-# Создаем глобальный экземпляр сервиса
+# Единственный экземпляр сервиса на воркер; жизненным циклом управляет app.main
 gigachat_service = GigaChatService()
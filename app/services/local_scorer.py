@@ -0,0 +1,239 @@
+"""
+Локальная оценка ответа по совпадению с эталоном.
+
+Детерминированная и быстрая, без обращения к модели. Используется:
+- для предварительной оценки, когда GigaChat недоступен (позже ответ
+  переоценивается моделью);
+- для предварительного отбора: очевидные случаи (пустой, слишком короткий
+  или не относящийся к вопросу ответ) оцениваются сразу, в модель уходят
+  только неоднозначные.
+"""
+
+import math
+import re
+from collections import Counter, OrderedDict
+from typing import Iterable, Optional, Union
+
+from app.config import settings
+from app.services.feedback import feedback_message, plain_evaluation
+
+TOKEN_RE = re.compile(r"[a-zа-яё0-9_]+", re.IGNORECASE)
+
+# Длина основы слова: грубая замена стемминга, чтобы "потоки" и "потоков"
+# считались одним словом
+STEM_LENGTH = 6
+
+# Ответ короче стольких значимых слов считается неполным
+MIN_ANSWER_TERMS = 5
+
+STOP_WORDS = frozenset(
+    {
+        "это",
+        "как",
+        "что",
+        "для",
+        "или",
+        "при",
+        "так",
+        "его",
+        "она",
+        "они",
+        "оно",
+        "если",
+        "когда",
+        "также",
+        "может",
+        "можно",
+        "который",
+        "которые",
+        "которая",
+        "чтобы",
+        "быть",
+        "есть",
+        "нет",
+        "все",
+        "только",
+        "через",
+        "между",
+        "the",
+        "and",
+        "for",
+        "with",
+        "that",
+        "this",
+    }
+)
+
+
+def extract_terms(text: str) -> list[str]:
+    """Значимые слова текста, приведённые к основе"""
+    return [
+        token.lower()[:STEM_LENGTH]
+        for token in TOKEN_RE.findall(text or "")
+        if len(token) > 2 and token.lower() not in STOP_WORDS
+    ]
+
+
+def keyword_recall(user_answer: str, reference_answer: str) -> float:
+    """Доля ключевых слов эталона, встречающихся в ответе"""
+    reference_terms = set(extract_terms(reference_answer))
+    if not reference_terms:
+        return 0.0
+    answer_terms = set(extract_terms(user_answer))
+    return len(reference_terms & answer_terms) / len(reference_terms)
+
+
+def score_against_reference(user_answer: str, reference_answer: str) -> float:
+    """Оценка от 0 до 1 по совпадению ключевых слов с эталоном"""
+    recall = keyword_recall(user_answer, reference_answer)
+    # Полный ответ редко повторяет эталон дословно: половина ключевых слов — уже 1.0
+    score = min(1.0, recall * 2)
+    if len(extract_terms(user_answer)) < MIN_ANSWER_TERMS:
+        score /= 2
+    return round(score, 2)
+
+
+class LexicalIndex:
+    """
+    Веса слов (IDF) по эталонным ответам банка вопросов.
+
+    Частые для всего банка слова ("функция", "python") почти не влияют на
+    сходство, редкие термины вопроса — влияют сильно. Пока индекс не
+    построен, все слова весят одинаково.
+    """
+
+    # Сколько векторов эталонов держать готовыми
+    REFERENCE_CACHE_SIZE = 4096
+
+    def __init__(self):
+        self._idf: dict[str, float] = {}
+        self._unknown_idf = 1.0
+        # Эталон -> (TF-IDF вектор, его норма); сбрасывается при fit
+        self._references: OrderedDict[str, tuple[dict[str, float], float]] = (
+            OrderedDict()
+        )
+
+    def fit(self, documents: Iterable[str]) -> None:
+        document_frequency: Counter = Counter()
+        total = 0
+        for document in documents:
+            total += 1
+            document_frequency.update(set(extract_terms(document)))
+        self._idf = {
+            term: math.log((1 + total) / (1 + frequency)) + 1
+            for term, frequency in document_frequency.items()
+        }
+        self._unknown_idf = math.log(1 + total) + 1
+        self._references.clear()
+
+    def vector(self, text: str) -> dict[str, float]:
+        """TF-IDF вектор текста"""
+        return {
+            term: count * self._idf.get(term, self._unknown_idf)
+            for term, count in Counter(extract_terms(text)).items()
+        }
+
+    def reference_vector(self, reference: str) -> tuple[dict[str, float], float]:
+        """
+        Вектор эталона и его норма. Эталон один на вопрос, поэтому вектор
+        считается один раз (заранее — при выдаче вопроса, см. prefetch)
+        """
+        cached = self._references.get(reference)
+        if cached is not None:
+            self._references.move_to_end(reference)
+            return cached
+        vector = self.vector(reference)
+        cached = vector, math.sqrt(sum(w * w for w in vector.values()))
+        self._references[reference] = cached
+        if len(self._references) > self.REFERENCE_CACHE_SIZE:
+            self._references.popitem(last=False)
+        return cached
+
+    def similarity(self, text: str, reference: str) -> float:
+        """Косинусное сходство TF-IDF векторов текста и эталона, от 0 до 1"""
+        a = self.vector(text)
+        b, b_norm = self.reference_vector(reference)
+        if not a or not b:
+            return 0.0
+        dot = sum(weight * b.get(term, 0.0) for term, weight in a.items())
+        return dot / (math.sqrt(sum(w * w for w in a.values())) * b_norm)
+
+
+# Индекс строится при старте приложения и воркера по банку вопросов
+lexical_index = LexicalIndex()
+
+# Обратная связь при локальной оценке на этапе предварительного отбора
+SHORT_ANSWER_FEEDBACK = (
+    "Ответ слишком короткий: одного-двух слов недостаточно, " "чтобы раскрыть вопрос."
+)
+OFF_TOPIC_FEEDBACK = "Ответ не относится к заданному вопросу."
+MATCHES_REFERENCE_FEEDBACK = "Ответ полностью совпадает с эталонным."
+PRESCORE_FEEDBACKS = (
+    SHORT_ANSWER_FEEDBACK,
+    OFF_TOPIC_FEEDBACK,
+    MATCHES_REFERENCE_FEEDBACK,
+)
+
+
+def is_prescored_feedback(evaluation: Union[dict, str, None]) -> bool:
+    """
+    Выставлена ли оценка на этапе предварительного отбора.
+
+    Принимает оценку или текст обратной связи (старые записи user_answers).
+    """
+    feedback = (
+        feedback_message(evaluation) if isinstance(evaluation, dict) else evaluation
+    )
+    return bool(feedback) and feedback.startswith(PRESCORE_FEEDBACKS)
+
+
+def classify_answer(
+    user_answer: str,
+    reference_answer: Optional[str],
+    min_terms: Optional[int] = None,
+    off_topic_similarity: Optional[float] = None,
+    accept_similarity: Optional[float] = None,
+) -> tuple[Optional[str], float]:
+    """
+    Отнести ответ к очевидному случаю.
+
+    Returns:
+        (обратная связь очевидного случая или None, TF-IDF сходство с эталоном).
+        Пороги по умолчанию берутся из настроек PRESCORE_*.
+    """
+    if min_terms is None:
+        min_terms = settings.PRESCORE_MIN_TERMS
+    if off_topic_similarity is None:
+        off_topic_similarity = settings.PRESCORE_OFF_TOPIC_SIMILARITY
+    if accept_similarity is None:
+        accept_similarity = settings.PRESCORE_ACCEPT_SIMILARITY
+
+    if len(extract_terms(user_answer)) < min_terms:
+        return SHORT_ANSWER_FEEDBACK, 0.0
+    if not reference_answer or not reference_answer.strip():
+        # Без эталона судить о близости не можем — решает модель
+        return None, 0.0
+
+    similarity = lexical_index.similarity(user_answer, reference_answer)
+    if similarity < off_topic_similarity:
+        return OFF_TOPIC_FEEDBACK, similarity
+    if similarity >= accept_similarity:
+        return MATCHES_REFERENCE_FEEDBACK, similarity
+    return None, similarity
+
+
+def prescore_answer(
+    user_answer: str, reference_answer: Optional[str], **thresholds
+) -> Optional[tuple[float, dict]]:
+    """
+    Оценить очевидный ответ локально.
+
+    Returns:
+        Оценка и поля обратной связи или None, если ответ нужно отдать модели
+    """
+    verdict, _ = classify_answer(user_answer, reference_answer, **thresholds)
+    if verdict is None:
+        return None
+
+    score = 1.0 if verdict == MATCHES_REFERENCE_FEEDBACK else 0.0
+    return score, plain_evaluation(verdict, reference_answer)
@@ -0,0 +1,67 @@
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+
+class Metrics:
+    """
+    Простые in-process метрики: счётчики и агрегаты наблюдений.
+
+    Значения собираются отдельно в каждом воркере gunicorn.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._observations: Dict[str, Dict[str, float]] = {}
+        self._gauges: Dict[str, float] = {}
+
+    def inc(self, name: str, value: float = 1) -> None:
+        """Увеличить счётчик"""
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Установить текущее значение показателя"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        """Добавить наблюдение (например, длительность запроса)"""
+        with self._lock:
+            stats = self._observations.setdefault(
+                name, {"count": 0, "sum": 0.0, "max": 0.0}
+            )
+            stats["count"] += 1
+            stats["sum"] += value
+            stats["max"] = max(stats["max"], value)
+
+    def get(self, name: str) -> float:
+        """Текущее значение счётчика"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def average(self, name: str) -> Optional[float]:
+        """Среднее наблюдений; None — наблюдений ещё не было"""
+        with self._lock:
+            stats = self._observations.get(name)
+            if not stats or not stats["count"]:
+                return None
+            return stats["sum"] / stats["count"]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Снимок всех метрик"""
+        with self._lock:
+            observations = {
+                name: {**stats, "avg": stats["sum"] / stats["count"]}
+                for name, stats in self._observations.items()
+            }
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "observations": observations,
+            }
+
+
+# Глобальный реестр метрик процесса
+metrics = Metrics()
@@ -0,0 +1,104 @@
+"""
+Подготовка к оценке при выдаче вопроса.
+
+GET /interview/question уже знает, на какой вопрос пользователь будет
+отвечать. Пока он пишет ответ, в фоне готовим всё, что зависит только от
+вопроса (EvaluatorBackend.warm): TF-IDF вектор эталона для предварительного
+отбора, части промпта оценки и, если эталона нет, правильный ответ.
+
+Подготовка ограничена: не больше PREFETCH_MAX_TASKS задач на воркер, на
+пользователя — одна (новый вопрос отменяет подготовку предыдущего),
+запрос к модели — только когда очередь к ней пуста.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Hashable, Optional
+
+from app.config import settings
+from app.services.evaluators import evaluator
+from app.services.metrics import metrics
+from app.services.scheduler import evaluation_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """Фоновые задачи подготовки: не больше одной на пользователя"""
+
+    def __init__(self, max_tasks: int, timeout: float):
+        self.max_tasks = max_tasks
+        self.timeout = timeout
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def schedule(
+        self, user_key: Hashable, question: str, reference_answer: Optional[str]
+    ) -> bool:
+        """
+        Запустить подготовку вопроса в фоне.
+
+        Returns:
+            False — подготовка выключена или лимит задач исчерпан
+        """
+        if not settings.PREFETCH_ENABLED:
+            return False
+        self.cancel(user_key)
+        if len(self._tasks) >= self.max_tasks:
+            metrics.inc("prefetch_skipped")
+            return False
+
+        task = asyncio.create_task(self._warm(question, reference_answer))
+        self._tasks[user_key] = task
+        task.add_done_callback(lambda done: self._forget(user_key, done))
+        return True
+
+    def cancel(self, user_key: Hashable) -> None:
+        """Отменить подготовку для пользователя, если она ещё идёт"""
+        task = self._tasks.pop(user_key, None)
+        if task is not None and not task.done():
+            task.cancel()
+            metrics.inc("prefetch_cancelled")
+
+    async def close(self) -> None:
+        """Отменить все задачи при остановке"""
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _forget(self, user_key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(user_key) is task:
+            del self._tasks[user_key]
+
+    async def _warm(self, question: str, reference_answer: Optional[str]) -> None:
+        # Тратим запрос к модели, только если он никого не задержит
+        generate_reference = (
+            settings.PREFETCH_GENERATE_REFERENCE
+            and evaluator.is_available
+            and evaluation_scheduler.queue_depth == 0
+        )
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                evaluator.warm(question, reference_answer, generate_reference),
+                self.timeout,
+            )
+            metrics.inc("prefetch_done")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            metrics.inc("prefetch_errors")
+            logger.warning(f"Не удалось подготовить вопрос к оценке: {e!r}")
+        finally:
+            metrics.observe("prefetch_seconds", time.perf_counter() - started)
+
+
+# Подготовка вопросов в процессе API; останавливается в app.main
+prefetcher = Prefetcher(
+    max_tasks=settings.PREFETCH_MAX_TASKS, timeout=settings.PREFETCH_TIMEOUT
+)
@@ -0,0 +1,376 @@
+"""
+Кэш банка вопросов в памяти воркера.
+
+Вопросы меняются редко, а читаются на каждом старте интервью и при выдаче
+каждого вопроса. Таблицы pythonn и golangquestions загружаются целиком один
+раз и хранятся компактно: id и вес (chance) — в array, тексты — в списках,
+позиция вопроса — в словаре по id.
+
+Кэш перечитывается, только когда меняется версия банка в таблице
+question_bank_versions (её увеличивает триггер на таблицах вопросов; строки
+версий и триггеры создаёт миграция, а для базы из create_all —
+install_bank_versions при старте). Версия проверяется не чаще раза в QUESTION_BANK_CHECK_INTERVAL секунд,
+поэтому в остальное время выдача вопросов не обращается к базе.
+
+Вопросы интервью выбираются без повторов равновероятно (QUESTION_SAMPLING=
+uniform) или пропорционально весу chance — частоте вопроса на реальных
+собеседованиях (weighted). Для взвешенного выбора по банку один раз строится
+таблица псевдонимов (alias method): выбор одного вопроса — O(1), таблица
+перестраивается только вместе с банком при смене версии.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from array import array
+from functools import cached_property
+from typing import Container, Optional, Sequence
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.config import settings
+from app.interview.models import GolangQuestion, PythonQuestion, QuestionBankVersion
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Попыток случайного выбора до перебора оставшихся вопросов
+SAMPLE_ATTEMPTS = 8
+
+# Режимы выбора вопросов (QUESTION_SAMPLING)
+SAMPLING_MODES = ("uniform", "weighted")
+
+QUESTION_MODELS = {"pythonn": PythonQuestion, "golangquestions": GolangQuestion}
+
+# Ключ advisory-блокировки: воркеры gunicorn стартуют одновременно
+INSTALL_LOCK_KEY = 0x62616E6B
+
+# Функция триггера та же, что в миграции 5d2f8a61c3b7
+BUMP_VERSION_FUNCTION_SQL = """
+    CREATE OR REPLACE FUNCTION bump_question_bank_version() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO question_bank_versions (question_type, version)
+        VALUES (TG_TABLE_NAME, 1)
+        ON CONFLICT (question_type)
+        DO UPDATE SET version = question_bank_versions.version + 1;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """
+
+
+class ExcludedIds:
+    """
+    Объединение исключений без копирования: id исключён, если он есть хотя
+    бы в одной части (множество, битовое множество недавних вопросов и т.п.)
+    """
+
+    def __init__(self, *parts: Container[int]):
+        self.parts = parts
+
+    def __contains__(self, question_id: int) -> bool:
+        return any(question_id in part for part in self.parts)
+
+
+def _as_excluded(exclude: Container[int]) -> Container[int]:
+    """Списки и кортежи — во множество, чтобы проверка была O(1)"""
+    return set(exclude) if isinstance(exclude, Sequence) else exclude
+
+
+class AliasTable:
+    """
+    Таблица псевдонимов (метод Уокера) для выбора позиции по весам.
+
+    Каждая ячейка хранит вероятность оставить свою позицию и позицию-псевдоним:
+    выбор — одна случайная ячейка и одно сравнение. Отрицательные и пустые
+    веса считаются нулевыми; если все веса нулевые, выбор равновероятный.
+    """
+
+    def __init__(self, weights: Sequence[float]):
+        size = len(weights)
+        self.prob = array("d", [1.0]) * size
+        self.alias = array("q", range(size))
+        total = sum(weight for weight in weights if weight and weight > 0)
+        if not total:
+            return
+
+        scaled = [
+            (weight * size / total if weight and weight > 0 else 0.0)
+            for weight in weights
+        ]
+        small = [i for i, weight in enumerate(scaled) if weight < 1.0]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Остатки из-за погрешности округления — вероятность 1
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def __len__(self) -> int:
+        return len(self.prob)
+
+    def draw(self, rng: random.Random = random) -> int:
+        """Случайная позиция с вероятностью, пропорциональной её весу"""
+        position = rng.randrange(len(self.prob))
+        if rng.random() < self.prob[position]:
+            return position
+        return self.alias[position]
+
+
+class QuestionTable:
+    """Вопросы одного типа в компактном виде"""
+
+    def __init__(self, model, version: Optional[int], rows: Sequence):
+        self.model = model
+        self.version = version
+        self.ids = array("q", (row.id for row in rows))
+        self.chances = array(
+            "d", (row.chance if row.chance is not None else 0.0 for row in rows)
+        )
+        self.questions = [row.question for row in rows]
+        self.tags = [row.tag for row in rows]
+        self.answers = [row.answer for row in rows]
+        self.positions = {question_id: i for i, question_id in enumerate(self.ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, question_id: int) -> bool:
+        return question_id in self.positions
+
+    @cached_property
+    def alias(self) -> AliasTable:
+        """Таблица псевдонимов по весам chance, строится при первом обращении"""
+        return AliasTable(self.chances)
+
+    def sample(
+        self,
+        exclude: Container[int] = (),
+        rng: random.Random = random,
+        weighted: bool = False,
+    ) -> Optional[int]:
+        """
+        Выбрать id вопроса не из exclude; None — вопросов нет.
+
+        Случайная позиция в плотном массиве id (weighted — по таблице
+        псевдонимов), исключения — проверка по множеству: время не зависит
+        от размера банка. Выбор с отбрасыванием исключённых даёт то же
+        распределение, что и выбор среди оставшихся. Если почти все вопросы
+        исключены и несколько попыток подряд неудачны, выбираем из оставшихся.
+        """
+        if not self.ids:
+            return None
+        excluded = _as_excluded(exclude)
+        for _ in range(SAMPLE_ATTEMPTS):
+            if weighted:
+                position = self.alias.draw(rng)
+            else:
+                position = rng.randrange(len(self.ids))
+            if self.ids[position] not in excluded:
+                return self.ids[position]
+
+        remaining = [i for i, qid in enumerate(self.ids) if qid not in excluded]
+        if not remaining:
+            return None
+        weights = [max(self.chances[i], 0.0) for i in remaining] if weighted else None
+        if weights and sum(weights) > 0:
+            return self.ids[rng.choices(remaining, weights)[0]]
+        # Остались только вопросы с нулевым весом — равновероятно
+        return self.ids[rng.choice(remaining)]
+
+    def sample_many(
+        self,
+        count: int,
+        exclude: Container[int] = (),
+        rng: random.Random = random,
+        weighted: bool = False,
+    ) -> list[int]:
+        """До count разных id вопросов не из exclude (выбор без возвращения)"""
+        chosen = set()
+        excluded = ExcludedIds(chosen, _as_excluded(exclude))
+        selected = []
+        while len(selected) < count:
+            question_id = self.sample(excluded, rng, weighted)
+            if question_id is None:
+                break
+            selected.append(question_id)
+            chosen.add(question_id)
+        return selected
+
+    def get(self, question_id: int):
+        """Вопрос по id (не привязан к сессии) или None"""
+        position = self.positions.get(question_id)
+        if position is None:
+            return None
+        return self.model(
+            id=question_id,
+            chance=self.chances[position],
+            question=self.questions[position],
+            tag=self.tags[position],
+            answer=self.answers[position],
+        )
+
+
+class QuestionBank:
+    """Банки вопросов всех типов с перезагрузкой по версии"""
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._tables: dict[str, QuestionTable] = {}
+        self._checked_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        """Перечитать все банки при следующем обращении"""
+        self._tables.clear()
+        self._checked_at = None
+
+    async def table(self, session: AsyncSession, question_type: str) -> QuestionTable:
+        """Банк вопросов типа, при необходимости перечитанный из базы"""
+        if self._is_stale(question_type):
+            async with self._lock:
+                # Пока ждали блокировку, банк мог обновить другой запрос
+                if self._is_stale(question_type):
+                    await self._refresh(session, question_type)
+        metrics.inc("question_bank_reads")
+        return self._tables[question_type]
+
+    async def ids(self, session: AsyncSession, question_type: str) -> Sequence[int]:
+        """ID всех вопросов типа"""
+        return (await self.table(session, question_type)).ids
+
+    async def get(self, session: AsyncSession, question_type: str, question_id: int):
+        """Вопрос по типу и id или None"""
+        return (await self.table(session, question_type)).get(question_id)
+
+    async def random_question(
+        self,
+        session: AsyncSession,
+        question_type: str,
+        exclude_ids: Container[int] = (),
+    ):
+        """Случайный вопрос типа, кроме exclude_ids; None — вопросов не осталось"""
+        table = await self.table(session, question_type)
+        question_id = table.sample(exclude_ids, weighted=_is_weighted(None))
+        return None if question_id is None else table.get(question_id)
+
+    async def select_questions(
+        self,
+        session: AsyncSession,
+        question_type: str,
+        count: int,
+        exclude_ids: Container[int] = (),
+        mode: Optional[str] = None,
+    ) -> list[int]:
+        """
+        До count разных id вопросов типа для интервью.
+
+        mode — uniform или weighted (по chance); по умолчанию QUESTION_SAMPLING.
+        """
+        table = await self.table(session, question_type)
+        return table.sample_many(count, exclude_ids, weighted=_is_weighted(mode))
+
+    def _is_stale(self, question_type: str) -> bool:
+        if question_type not in self._tables or self._checked_at is None:
+            return True
+        return time.monotonic() - self._checked_at >= self.check_interval
+
+    async def _refresh(self, session: AsyncSession, question_type: str) -> None:
+        """Сверить версии и перечитать изменившиеся банки"""
+        result = await session.execute(
+            select(QuestionBankVersion.question_type, QuestionBankVersion.version)
+        )
+        versions = dict(result.all())
+        if question_type not in versions:
+            # Строку создаст install_bank_versions или первое изменение банка;
+            # до тех пор считаем версию нулевой
+            logger.warning(
+                f"Нет версии банка вопросов {question_type} в question_bank_versions"
+            )
+        self._checked_at = time.monotonic()
+
+        for loaded_type, table in list(self._tables.items()):
+            if table.version != versions.get(loaded_type, 0):
+                del self._tables[loaded_type]
+        if question_type not in self._tables:
+            await self._load(session, question_type, versions.get(question_type, 0))
+
+    async def _load(
+        self, session: AsyncSession, question_type: str, version: int
+    ) -> None:
+        model = QUESTION_MODELS.get(question_type, PythonQuestion)
+        started = time.perf_counter()
+        result = await session.execute(
+            select(
+                model.id, model.chance, model.question, model.tag, model.answer
+            ).order_by(model.id)
+        )
+        table = QuestionTable(model, version, result.all())
+        self._tables[question_type] = table
+        metrics.inc("question_bank_loads")
+        metrics.observe("question_bank_load_seconds", time.perf_counter() - started)
+        logger.info(
+            f"Банк вопросов {question_type} загружен: {len(table)} вопросов, "
+            f"версия {version}"
+        )
+
+
+def _is_weighted(mode: Optional[str]) -> bool:
+    mode = mode or settings.QUESTION_SAMPLING
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"Неизвестный режим выбора вопросов: {mode}")
+    return mode == "weighted"
+
+
+# Кэш вопросов процесса
+question_bank = QuestionBank(check_interval=settings.QUESTION_BANK_CHECK_INTERVAL)
+
+
+async def install_bank_versions(conn: AsyncConnection) -> None:
+    """
+    Создать недостающие строки версий и триггеры банков вопросов.
+
+    Выполняется при старте приложения: база, созданная create_all без
+    миграций, тоже получает версии и их сброс при изменении вопросов.
+    Существующие строки, функция и триггеры не трогаются, поэтому повторный
+    старт не блокирует таблицы вопросов.
+    """
+    await conn.execute(
+        text("SELECT pg_advisory_xact_lock(:key)"), {"key": INSTALL_LOCK_KEY}
+    )
+    for question_type in QUESTION_MODELS:
+        await conn.execute(
+            text(
+                "INSERT INTO question_bank_versions (question_type, version) "
+                "VALUES (:question_type, 1) ON CONFLICT (question_type) DO NOTHING"
+            ),
+            {"question_type": question_type},
+        )
+
+    function_exists = await conn.scalar(
+        text("SELECT to_regprocedure('bump_question_bank_version()') IS NOT NULL")
+    )
+    if not function_exists:
+        await conn.execute(text(BUMP_VERSION_FUNCTION_SQL))
+    for question_type in QUESTION_MODELS:
+        trigger = f"{question_type}_bank_version"
+        trigger_exists = await conn.scalar(
+            text(
+                "SELECT EXISTS (SELECT 1 FROM pg_trigger "
+                "WHERE tgname = :name AND tgrelid = to_regclass(:table))"
+            ),
+            {"name": trigger, "table": question_type},
+        )
+        if not trigger_exists:
+            logger.info(f"Создаётся триггер версии банка {trigger}")
+            await conn.execute(text(f"""
+                CREATE TRIGGER {trigger}
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {question_type}
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_question_bank_version()
+                """))
@@ -0,0 +1,90 @@
+"""
+Недавно заданные пользователю вопросы в компактном виде.
+
+Чтобы вопрос не попадал в интервью подряд, при завершении интервью его
+вопросы добавляются в битовое множество пользователя (бит номер id вопроса),
+а при выборе вопросов нового интервью кандидаты из множества отбрасываются.
+История ответов при этом не читается.
+
+Множество хранится двумя поколениями: текущее копит вопросы, пока в нём не
+наберётся generation_size вопросов, затем становится предыдущим, а текущее
+начинается заново. Недавними считаются вопросы обоих поколений, поэтому
+вопрос снова может попасть в интервью через одно-два поколения. В базе
+поколение хранится сжатым zlib: десятки бит на банк из тысяч вопросов
+занимают сотни байт.
+"""
+
+import zlib
+from typing import Iterable, Optional
+
+
+class QuestionBitSet:
+    """Множество неотрицательных id вопросов на битах целого числа"""
+
+    __slots__ = ("bits",)
+
+    def __init__(self, bits: int = 0):
+        self.bits = bits
+
+    @classmethod
+    def from_bytes(cls, data: bytes | None) -> "QuestionBitSet":
+        """Прочитать множество, сохранённое to_bytes (пустые данные — пусто)"""
+        if not data:
+            return cls()
+        return cls(int.from_bytes(zlib.decompress(data), "little"))
+
+    def to_bytes(self) -> bytes:
+        """Сжатое представление для хранения в базе"""
+        if not self.bits:
+            return b""
+        raw = self.bits.to_bytes((self.bits.bit_length() + 7) // 8, "little")
+        return zlib.compress(raw, 9)
+
+    def add(self, question_id: int) -> None:
+        self.bits |= 1 << question_id
+
+    def __contains__(self, question_id: int) -> bool:
+        return question_id >= 0 and (self.bits >> question_id) & 1 == 1
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+
+class RecentQuestions:
+    """Вопросы последних интервью пользователя: текущее и предыдущее поколения"""
+
+    def __init__(
+        self,
+        current: Optional[QuestionBitSet] = None,
+        previous: Optional[QuestionBitSet] = None,
+    ):
+        self.current = current if current is not None else QuestionBitSet()
+        self.previous = previous if previous is not None else QuestionBitSet()
+
+    @classmethod
+    def from_bytes(cls, current: bytes | None, previous: bytes | None):
+        return cls(
+            QuestionBitSet.from_bytes(current), QuestionBitSet.from_bytes(previous)
+        )
+
+    def add(self, question_ids: Iterable[int], generation_size: int) -> None:
+        """
+        Добавить вопросы завершённого интервью.
+
+        Повторное добавление тех же вопросов (интервью завершено ещё раз,
+        например после переоценки) не увеличивает поколение.
+        """
+        for question_id in question_ids:
+            if question_id in self.previous:
+                # Вопрос задан снова (например, на повторение) — переносим
+                # его в текущее поколение, чтобы он не выпал раньше времени
+                self.previous.bits &= ~(1 << question_id)
+            self.current.add(question_id)
+        if len(self.current) >= max(1, generation_size):
+            self.previous, self.current = self.current, QuestionBitSet()
+
+    def __contains__(self, question_id: int) -> bool:
+        return question_id in self.current or question_id in self.previous
+
+    def __len__(self) -> int:
+        return len(self.current) + len(self.previous)
@@ -0,0 +1,153 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Hashable, Optional
+
+from app.config import settings
+from app.services.metrics import metrics
+
+# Пользователь, от имени которого выполняется оценка. Устанавливается
+# в роутере и используется планировщиком для справедливой очереди.
+current_evaluation_user: ContextVar[Optional[Hashable]] = ContextVar(
+    "current_evaluation_user", default=None
+)
+
+
+class EvaluationScheduler:
+    """
+    Планировщик запросов к GigaChat.
+
+    - не более max_concurrency запросов одновременно;
+    - не чаще rate запросов в секунду (token bucket с запасом burst);
+    - справедливая очередь: пользователи обслуживаются по кругу, поэтому
+      один активный пользователь не вытесняет остальных.
+
+    Ограничения действуют в пределах процесса (воркера gunicorn); общие
+    лимиты делятся между процессами в make_evaluation_scheduler.
+    """
+
+    def __init__(self, max_concurrency: int, rate: float, burst: int):
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._queues: "OrderedDict[Hashable, deque[asyncio.Future]]" = OrderedDict()
+        self._active = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    @asynccontextmanager
+    async def slot(
+        self, user_key: Optional[Hashable] = None, timeout: Optional[float] = None
+    ) -> AsyncIterator[None]:
+        """
+        Дождаться своей очереди на запрос к модели.
+
+        timeout — сколько ждать слот; по истечении asyncio.TimeoutError.
+        """
+        if user_key is None:
+            user_key = current_evaluation_user.get()
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(user_key, deque()).append(future)
+        started = time.perf_counter()
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(future, timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            if future.done() and not future.cancelled():
+                # Слот выдан одновременно с отменой — возвращаем его
+                self._release()
+            else:
+                self._remove(user_key, future)
+            raise
+
+        metrics.observe(
+            "evaluation_scheduler_wait_seconds", time.perf_counter() - started
+        )
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _remove(self, user_key: Hashable, future: asyncio.Future) -> None:
+        queue = self._queues.get(user_key)
+        if queue and future in queue:
+            queue.remove(future)
+            if not queue:
+                del self._queues[user_key]
+        self._report()
+
+    def _release(self) -> None:
+        self._active -= 1
+        self._dispatch()
+
+    def _take_token(self) -> float:
+        """Взять токен; вернуть 0 или сколько секунд ждать следующего"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._refilled_at) * self.rate
+        )
+        self._refilled_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def _dispatch(self) -> None:
+        """Выдать свободные слоты ожидающим, по одному пользователю за раз"""
+        while self._queues and self._active < self.max_concurrency:
+            wait = self._take_token()
+            if wait > 0:
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(
+                        wait, self._on_timer
+                    )
+                break
+
+            user_key, queue = self._queues.popitem(last=False)
+            future = queue.popleft()
+            if queue:
+                # Пользователь встаёт в конец круга
+                self._queues[user_key] = queue
+            if future.done():
+                continue
+            self._active += 1
+            future.set_result(None)
+        self._report()
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def _report(self) -> None:
+        metrics.set_gauge("evaluation_scheduler_queue_depth", self.queue_depth)
+        metrics.set_gauge("evaluation_scheduler_active", self._active)
+
+
+def make_evaluation_scheduler() -> EvaluationScheduler:
+    """
+    Планировщик с долей общих лимитов GigaChat, приходящейся на процесс.
+
+    Процессы не координируются друг с другом, поэтому лимиты делятся на
+    GIGACHAT_PROCESSES поровну (не меньше одного запроса на процесс).
+    """
+    processes = max(1, settings.GIGACHAT_PROCESSES)
+    return EvaluationScheduler(
+        max_concurrency=max(1, settings.GIGACHAT_MAX_CONCURRENCY // processes),
+        rate=settings.GIGACHAT_RATE_LIMIT / processes,
+        burst=max(1, settings.GIGACHAT_RATE_BURST // processes),
+    )
+
+
+# Общий планировщик запросов к GigaChat в процессе
+evaluation_scheduler = make_evaluation_scheduler()
@@ -0,0 +1,106 @@
+"""
+Объединение одинаковых одновременных оценок (single flight).
+
+Двойной клик, повтор запроса клиентом или одинаковые ответы разных
+пользователей на один вопрос не должны порождать несколько запросов к
+модели. Первый запрос по ключу кэша оценки становится ведущим, остальные
+ждут его результат. Реестр живёт в памяти процесса; между воркерами
+запросы объединяются advisory-блокировкой Postgres
+(EVALUATION_SINGLE_FLIGHT_DB, см. UserAnswerDAO.evaluate_answer).
+"""
+
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Hashable, Iterator, Optional, TypeVar
+
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    # Ошибку ведущего получает он сам; без ожидающих asyncio не должен
+    # писать "exception was never retrieved"
+    if not future.cancelled():
+        future.exception()
+
+
+class SingleFlight:
+    """Реестр выполняющихся запросов: ключ -> future с результатом ведущего"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    @contextmanager
+    def lead(self, key: Hashable) -> Iterator[asyncio.Future]:
+        """
+        Зарегистрироваться ведущим по ключу.
+
+        Ведущий сам выставляет результат future. Если он вышел, не выставив
+        результат (отмена, обрыв потока), future отменяется и ожидающие
+        повторяют попытку сами.
+        """
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        self._flights[key] = future
+        try:
+            yield future
+        finally:
+            if not future.done():
+                future.cancel()
+            if self._flights.get(key) is future:
+                del self._flights[key]
+
+    async def wait(self, key: Hashable) -> Optional[T]:
+        """Дождаться результата выполняющегося запроса; None — запроса нет"""
+        while True:
+            future = self._flights.get(key)
+            if future is None:
+                return None
+            metrics.inc(f"{self.name}_shared")
+            try:
+                # shield: отмена ожидающего не должна отменять ведущего
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled() and not self._cancelling():
+                    # Ведущий ушёл без результата — пробуем снова
+                    continue
+                raise
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Выполнить func, если по ключу ещё нет запроса, иначе дождаться его"""
+        result = await self.wait(key)
+        if result is not None:
+            return result
+
+        metrics.inc(f"{self.name}_leader")
+        with self.lead(key) as future:
+            try:
+                result = await func()
+            except Exception as e:
+                future.set_exception(e)
+                raise
+            future.set_result(result)
+            return result
+
+    @staticmethod
+    def _cancelling() -> bool:
+        # Отменили ли саму ожидающую задачу (Python 3.11+)
+        task = asyncio.current_task()
+        return task is not None and getattr(task, "cancelling", lambda: 0)() > 0
+
+
+# Одинаковые оценки: ключ — EvaluationCacheKey
+evaluation_flights = SingleFlight("evaluation_single_flight")
+# Генерация правильного ответа для вопроса без эталона: ключ — текст вопроса
+reference_flights = SingleFlight("reference_answer_single_flight")
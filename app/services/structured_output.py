@@ -0,0 +1,210 @@
+"""
+Структурированный ответ модели при оценке.
+
+Схемы функций для function calling GigaChat, разбор ответа (аргументы
+вызова функции или JSON в тексте), дешёвый ремонт почти корректного JSON
+и приведение полей оценки к ожидаемым типам.
+"""
+
+import json
+import logging
+import re
+from typing import Any, Optional, Union
+
+from gigachat.models import Function, FunctionParameters
+
+logger = logging.getLogger(__name__)
+
+EVALUATION_FUNCTION = "submit_evaluation"
+BATCH_EVALUATION_FUNCTION = "submit_evaluations"
+
+LIST_FIELDS = ("recommendations", "strengths", "weaknesses")
+
+EVALUATION_PROPERTIES: dict[str, dict] = {
+    "score": {"type": "number", "description": "Оценка ответа от 0 до 1"},
+    "feedback": {
+        "type": "string",
+        "description": "Комментарий: что именно было неверно или неполно",
+    },
+    "recommendations": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Конкретные рекомендации по улучшению ответа",
+    },
+    "strengths": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Сильные стороны ответа",
+    },
+    "weaknesses": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Слабые стороны ответа",
+    },
+    "correct_answer": {
+        "type": "string",
+        "description": "Развернутый правильный ответ на вопрос",
+    },
+}
+
+
+def evaluation_fields(grounded: bool) -> list[str]:
+    """Поля оценки; в режиме grounded правильный ответ берётся из базы"""
+    return [
+        field
+        for field in EVALUATION_PROPERTIES
+        if not (grounded and field == "correct_answer")
+    ]
+
+
+def evaluation_function(fields: list[str]) -> Function:
+    """Функция, аргументы которой — поля оценки"""
+    return Function(
+        name=EVALUATION_FUNCTION,
+        description="Сохранить оценку ответа пользователя",
+        parameters=FunctionParameters(
+            type="object",
+            properties={field: EVALUATION_PROPERTIES[field] for field in fields},
+            required=fields,
+        ),
+    )
+
+
+def batch_evaluation_function(fields: list[str]) -> Function:
+    """Функция для пакетной оценки: список оценок с номерами ответов"""
+    item_properties = {
+        "index": {"type": "integer", "description": "Номер ответа"},
+        **{field: EVALUATION_PROPERTIES[field] for field in fields},
+    }
+    return Function(
+        name=BATCH_EVALUATION_FUNCTION,
+        description="Сохранить оценки ответов пользователя",
+        parameters=FunctionParameters(
+            type="object",
+            properties={
+                "evaluations": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": item_properties,
+                        "required": ["index", *fields],
+                    },
+                }
+            },
+            required=["evaluations"],
+        ),
+    )
+
+
+def response_result(response) -> Union[dict, str, None]:
+    """Аргументы вызова функции, если модель её вызвала, иначе текст ответа"""
+    message = response.choices[0].message
+    function_call = getattr(message, "function_call", None)
+    if function_call is not None and isinstance(function_call.arguments, dict):
+        return function_call.arguments
+    return message.content
+
+
+def extract_json_object(result: str) -> str:
+    """Вырезать JSON-объект из ответа модели: текст вокруг и markdown-разметку"""
+    result = result.strip()
+
+    # Удаляем весь текст до первого {
+    start_idx = result.find("{")
+    if start_idx != -1:
+        result = result[start_idx:]
+
+    # Удаляем весь текст после последнего }
+    end_idx = result.rfind("}")
+    if end_idx != -1:
+        result = result[: end_idx + 1]
+
+    # Удаляем markdown-форматирование
+    return result.replace("```json", "").replace("```", "").strip()
+
+
+def repair_json(text: str) -> Optional[Any]:
+    """
+    Починить почти корректный JSON: «умные» кавычки, висячие запятые,
+    незакрытые скобки (ответ оборвался). None — починить не удалось.
+    """
+    repaired = (
+        text.replace("“", '"').replace("”", '"').replace("«", '"').replace("»", '"')
+    )
+    repaired = re.sub(r",\s*([}\]])", r"\1", repaired)
+
+    # Дописываем закрывающие скобки для оборванного ответа
+    stack = []
+    in_string = escaped = False
+    for char in repaired:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    if in_string:
+        repaired += '"'
+    repaired = re.sub(r",\s*$", "", repaired) + "".join(reversed(stack))
+
+    try:
+        return json.loads(repaired)
+    except json.JSONDecodeError:
+        return None
+
+
+def decode_result(result: Union[dict, str, None]) -> tuple[Optional[dict], bool]:
+    """
+    Получить словарь из ответа модели.
+
+    Returns:
+        (словарь или None, был ли нужен ремонт JSON)
+    """
+    if isinstance(result, dict):
+        return result, False
+    if not result or not result.strip():
+        return None, False
+
+    text = extract_json_object(result)
+    try:
+        parsed, repaired = json.loads(text), False
+    except json.JSONDecodeError as e:
+        logger.warning(f"Некорректный JSON от GigaChat: {str(e)}, пробуем починить")
+        parsed, repaired = repair_json(text), True
+    if not isinstance(parsed, dict):
+        return None, repaired
+    return parsed, repaired
+
+
+def normalize_evaluation(evaluation: dict, fields: list[str]) -> list[str]:
+    """
+    Привести поля оценки к ожидаемым типам.
+
+    Returns:
+        Список отсутствующих или некорректных полей
+    """
+    missing = []
+    for field in fields:
+        value = evaluation.get(field)
+        if value is None or value == "":
+            missing.append(field)
+        elif field == "score":
+            try:
+                evaluation["score"] = min(1.0, max(0.0, float(value)))
+            except (TypeError, ValueError):
+                missing.append(field)
+        elif field in LIST_FIELDS:
+            if isinstance(value, str):
+                evaluation[field] = [value]
+            elif not isinstance(value, list):
+                missing.append(field)
+        elif not isinstance(value, str):
+            evaluation[field] = str(value)
+    return missing
@@ -0,0 +1,236 @@
+"""
+Воркер отложенной оценки ответов.
+
+Забирает задания из таблицы evaluation_jobs (FOR UPDATE SKIP LOCKED),
+оценивает ответы выбранным бэкендом (EVALUATOR_BACKEND) с ограниченной
+параллельностью и записывает оценку в user_answers. Можно запускать несколько
+экземпляров независимо от API-воркеров.
+
+Через ту же очередь переоцениваются ответы, получившие предварительную
+локальную оценку, пока GigaChat был недоступен.
+
+Запуск:
+    python -m app.worker
+"""
+
+import asyncio
+import logging
+import signal
+
+from app.config import settings
+from app.auth.models import User  # noqa: F401 — связи Interview.user
+from app.dao.session_maker import async_session_maker
+from app.interview.dao import (
+    QuestionDAO,
+    InterviewDAO,
+    UserAnswerDAO,
+    EvaluationJobDAO,
+)
+from app.interview.models import (
+    Interview,
+    UserAnswer,
+    InterviewStatus,
+    EvaluationJobStatus,
+)
+from app.services.evaluators import evaluator
+from app.services.feedback import feedback_message
+from app.services.gigachat import needs_regrading
+from app.services.local_scorer import lexical_index
+from app.services.metrics import metrics
+from app.services.scheduler import current_evaluation_user
+
+logger = logging.getLogger(__name__)
+
+
+async def claim_jobs(limit: int) -> list[tuple[int, int]]:
+    """Забрать задания в отдельной короткой транзакции"""
+    async with async_session_maker() as session:
+        async with session.begin():
+            # Задания, брошенные упавшими воркерами без оставшихся попыток
+            for interview_id in await EvaluationJobDAO.fail_abandoned(
+                session,
+                settings.EVALUATION_JOB_LOCK_TIMEOUT,
+                settings.EVALUATION_JOB_MAX_ATTEMPTS,
+            ):
+                metrics.inc("evaluation_jobs_failed")
+                await _finalize_interview(session, interview_id)
+            return await EvaluationJobDAO.claim(
+                session,
+                limit,
+                settings.EVALUATION_JOB_LOCK_TIMEOUT,
+                settings.EVALUATION_JOB_MAX_ATTEMPTS,
+            )
+
+
+async def process_job(job_id: int, user_answer_id: int) -> None:
+    """
+    Оценить один ответ и сохранить результат.
+
+    Каждое задание занимает одно соединение воркера на время оценки —
+    их число ограничено EVALUATION_WORKER_CONCURRENCY и не влияет на пул API.
+    """
+    try:
+        async with async_session_maker() as session:
+            async with session.begin():
+                await _evaluate(session, job_id, user_answer_id)
+    except Exception as e:
+        metrics.inc("evaluation_jobs_errors")
+        logger.error(f"Ошибка обработки задания {job_id}: {str(e)}")
+        try:
+            await _give_up_if_exhausted(job_id, str(e))
+        except Exception as error:
+            logger.error(f"Не удалось обновить задание {job_id}: {str(error)}")
+
+
+async def _give_up_if_exhausted(job_id: int, error: str) -> None:
+    """
+    Пометить failed задание, упавшее с исключением на последней попытке.
+
+    Иначе задание останется в processing и будет забрано повторно по таймауту.
+    """
+    async with async_session_maker() as session:
+        async with session.begin():
+            job = await EvaluationJobDAO.find_one_or_none_by_id(job_id, session)
+            if (
+                job is None
+                or job.status != EvaluationJobStatus.PROCESSING
+                or job.attempts < settings.EVALUATION_JOB_MAX_ATTEMPTS
+            ):
+                return
+            await EvaluationJobDAO.mark(
+                session, job_id, EvaluationJobStatus.FAILED, error
+            )
+            metrics.inc("evaluation_jobs_failed")
+            user_answer = await session.get(UserAnswer, job.user_answer_id)
+            if user_answer is not None:
+                await _finalize_interview(session, user_answer.interview_id)
+
+
+async def _evaluate(session, job_id: int, user_answer_id: int) -> None:
+    job = await EvaluationJobDAO.find_one_or_none_by_id(job_id, session)
+    user_answer = await session.get(UserAnswer, user_answer_id)
+    if job is None or user_answer is None:
+        # Ответ удалён, пока задание ждало в очереди
+        if job is not None:
+            await EvaluationJobDAO.mark(
+                session, job_id, EvaluationJobStatus.FAILED, "Ответ не найден"
+            )
+        metrics.inc("evaluation_jobs_failed")
+        return
+    interview = await session.get(Interview, user_answer.interview_id)
+    # Справедливая очередь к GigaChat работает по пользователям и в воркере
+    current_evaluation_user.set(interview.user_id)
+    question = await QuestionDAO.find_one_or_none_by_id(
+        user_answer.question_id, session, question_type=user_answer.question_type
+    )
+    if question is None:
+        await EvaluationJobDAO.mark(
+            session, job_id, EvaluationJobStatus.FAILED, "Вопрос не найден"
+        )
+        metrics.inc("evaluation_jobs_failed")
+        return
+
+    score, evaluation = await UserAnswerDAO.evaluate_answer(
+        session, question, user_answer.user_answer
+    )
+    feedback = feedback_message(evaluation)
+
+    # Сбой или локальная оценка при недоступном GigaChat
+    failed = needs_regrading(evaluation)
+    if failed and job.attempts < settings.EVALUATION_JOB_MAX_ATTEMPTS:
+        # Вернём задание в очередь для повторной попытки
+        await EvaluationJobDAO.mark(
+            session, job_id, EvaluationJobStatus.PENDING, feedback
+        )
+        metrics.inc("evaluation_jobs_retried")
+        logger.warning(f"Оценка ответа {user_answer_id} не удалась, повторим позже")
+        return
+
+    UserAnswerDAO.apply_evaluation(user_answer, score, evaluation, question.answer)
+    status = EvaluationJobStatus.FAILED if failed else EvaluationJobStatus.DONE
+    await EvaluationJobDAO.mark(session, job_id, status, feedback if failed else None)
+    metrics.inc(f"evaluation_jobs_{status.value}")
+
+    await _finalize_interview(session, user_answer.interview_id)
+
+
+async def _finalize_interview(session, interview_id: int) -> None:
+    """Пересчитать итог завершенного интервью, когда оценены все его ответы"""
+    # Блокировка строки интервью: задания одного интервью, завершившиеся
+    # одновременно, проверяют остаток по очереди, и последнее из них видит
+    # все остальные завершёнными (иначе каждое видит другое в processing)
+    interview = await InterviewDAO.lock(session, interview_id)
+    if interview is None or interview.status != InterviewStatus.COMPLETED:
+        return
+    if await EvaluationJobDAO.count_unfinished(session, interview_id) > 0:
+        return
+    await InterviewDAO.complete_interview(session, interview)
+    logger.info(f"Интервью {interview_id} оценено полностью")
+
+
+async def run_worker(stop: asyncio.Event) -> None:
+    """Основной цикл: забираем задания, пока есть свободные слоты"""
+    concurrency = settings.EVALUATION_WORKER_CONCURRENCY
+    in_flight: set[asyncio.Task] = set()
+
+    while not stop.is_set():
+        free_slots = concurrency - len(in_flight)
+        if not evaluator.is_available:
+            # Сервис оценки недоступен — не тратим попытки, задания подождут
+            jobs = []
+        elif evaluator.is_probing:
+            # Предохранитель пропустит только пробный запрос: берём одно
+            # задание и ждём его результата, прежде чем брать остальные
+            jobs = [] if in_flight else await claim_jobs(1)
+        else:
+            jobs = await claim_jobs(free_slots) if free_slots > 0 else []
+
+        for job_id, user_answer_id in jobs:
+            task = asyncio.create_task(process_job(job_id, user_answer_id))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        metrics.set_gauge("evaluation_jobs_in_flight", len(in_flight))
+
+        if free_slots <= 0:
+            # Все слоты заняты — ждём завершения любого задания
+            await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+        elif not jobs:
+            # Очередь пуста — ждём следующего опроса
+            try:
+                await asyncio.wait_for(
+                    stop.wait(), timeout=settings.EVALUATION_WORKER_POLL_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    # Даём текущим заданиям завершиться; незавершённые заберут после таймаута
+    if in_flight:
+        await asyncio.gather(*in_flight, return_exceptions=True)
+
+
+async def main() -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    async with async_session_maker() as session:
+        lexical_index.fit(await QuestionDAO.get_reference_answers(session))
+    await evaluator.start()
+    logger.info(
+        f"Воркер оценки запущен, параллельность {settings.EVALUATION_WORKER_CONCURRENCY}"
+    )
+    try:
+        await run_worker(stop)
+    finally:
+        await evaluator.close()
+        logger.info("Воркер оценки остановлен")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
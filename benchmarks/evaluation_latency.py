@@ -0,0 +1,170 @@
+"""
+Бенчмарк: задержка «посторонних» эндпоинтов, пока выполняются оценки ответов.
+
+Поднимает минимальное FastAPI-приложение с двумя маршрутами:
+  - /ping     — лёгкий эндпоинт (аналог /history или /auth/me/);
+  - /evaluate — вызывает GigaChatService.evaluate_answer.
+
+Клиент GigaChat подменяется заглушкой с задержкой LLM_LATENCY секунд.
+Режим "sync" имитирует старое поведение (блокирующий client.chat внутри
+async-функции), режим "async" — текущее (await client.achat).
+
+Запуск:
+    python -m benchmarks.evaluation_latency --inflight 8 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from types import SimpleNamespace
+
+# Настройки приложения обязательны при импорте app.config
+for key, value in {
+    "DB_NAME": "bench",
+    "DB_USER": "bench",
+    "DB_PASSWORD": "bench",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "SECRET_KEY": "bench",
+    "ALGORITHM": "HS256",
+    "GIGACHAT_CREDENTIALS": "bench",
+}.items():
+    os.environ.setdefault(key, value)
+
+import httpx
+from fastapi import FastAPI
+
+from app.services.gigachat import GigaChatService
+
+EVALUATION = json.dumps(
+    {
+        "score": 0.5,
+        "feedback": "ok",
+        "recommendations": [],
+        "strengths": [],
+        "weaknesses": [],
+        "correct_answer": "ok",
+    }
+)
+
+
+class _Message:
+    content = EVALUATION
+
+
+class _Choice:
+    message = _Message()
+
+
+class _Response:
+    choices = [_Choice()]
+
+
+class FakeClient:
+    """Заглушка клиента GigaChat с фиксированной задержкой"""
+
+    def __init__(self, latency: float, blocking: bool):
+        self.latency = latency
+        self.blocking = blocking
+        self._access_token = None
+
+    async def aget_token(self):
+        # Токен «действует» ещё час
+        self._access_token = SimpleNamespace(expires_at=(time.time() + 3600) * 1000)
+        return self._access_token
+
+    async def achat(self, payload):
+        if self.blocking:
+            # Так вёл себя старый код: синхронный вызов внутри корутины
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        return _Response()
+
+
+def build_app(service: GigaChatService) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/evaluate")
+    async def evaluate():
+        score, _ = await service.evaluate_answer("Что такое GIL?", "Блокировка")
+        return {"score": score}
+
+    return app
+
+
+def percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(mode: str, inflight: int, latency: float, pings: int) -> dict:
+    service = GigaChatService()
+    service.client = FakeClient(latency, blocking=mode == "sync")
+    transport = httpx.ASGITransport(app=build_app(service))
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        # Оценки стартуют равномерно в течение окна измерения
+        window = latency * inflight
+        origin = time.perf_counter()
+
+        async def evaluate(delay: float):
+            await asyncio.sleep(delay)
+            return await client.get("/evaluate")
+
+        evaluations = [
+            asyncio.create_task(evaluate(i * window / inflight))
+            for i in range(inflight)
+        ]
+
+        # Запросы к /ping идут по расписанию; задержка считается от планового
+        # момента отправки, чтобы учесть время, когда event loop был занят
+        interval = window / pings
+        durations = []
+        for i in range(pings):
+            scheduled = origin + i * interval
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            await client.get("/ping")
+            durations.append((time.perf_counter() - scheduled) * 1000)
+
+        await asyncio.gather(*evaluations)
+
+    return {
+        "mode": mode,
+        "p50_ms": statistics.median(durations),
+        "p99_ms": percentile(durations, 99),
+        "max_ms": max(durations),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--inflight", type=int, default=8, help="Оценок в полёте")
+    parser.add_argument("--latency", type=float, default=0.5, help="Задержка LLM, с")
+    parser.add_argument("--pings", type=int, default=50, help="Запросов к /ping")
+    args = parser.parse_args()
+
+    print(
+        f"N={args.inflight} оценок в полёте, задержка LLM {args.latency}s, "
+        f"{args.pings} запросов к /ping"
+    )
+    for mode in ("sync", "async"):
+        result = asyncio.run(run(mode, args.inflight, args.latency, args.pings))
+        print(
+            f"{result['mode']:>5}: p50={result['p50_ms']:.1f}ms "
+            f"p99={result['p99_ms']:.1f}ms max={result['max_ms']:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
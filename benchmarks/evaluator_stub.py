@@ -0,0 +1,103 @@
+"""
+Заглушка сервиса оценки для нагрузочного тестирования.
+
+Отвечает на POST /evaluate так же, как HttpEvaluator ожидает от внешнего
+сервиса, но вместо модели оценивает ответ локально. Задержка берётся из
+логнормального распределения (медиана и разброс настраиваются), часть
+запросов завершается ошибкой 503 — так воспроизводятся хвостовые задержки
+и сбои провайдера без реальных токенов.
+
+Запуск заглушки и API против неё:
+    python -m benchmarks.evaluator_stub --port 8100 --median 1.5 --sigma 0.6 --error-rate 0.02
+    EVALUATOR_BACKEND=http EVALUATOR_HTTP_URL=http://localhost:8100 gunicorn app.main:app ...
+"""
+
+import argparse
+import asyncio
+import os
+import random
+from typing import Optional
+
+# Настройки приложения обязательны при импорте app.config
+for key, value in {
+    "DB_NAME": "stub",
+    "DB_USER": "stub",
+    "DB_PASSWORD": "stub",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "SECRET_KEY": "stub",
+    "ALGORITHM": "HS256",
+    "GIGACHAT_CREDENTIALS": "stub",
+}.items():
+    os.environ.setdefault(key, value)
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from app.services.local_scorer import score_against_reference
+
+
+class EvaluateRequest(BaseModel):
+    question: str
+    user_answer: str
+    reference_answer: Optional[str] = None
+
+
+class EvaluateResponse(BaseModel):
+    score: float
+    feedback: str
+
+
+def create_app(
+    median: float, sigma: float, max_latency: float, error_rate: float, seed: int
+) -> FastAPI:
+    app = FastAPI(title="Evaluator stub")
+    rng = random.Random(seed)
+
+    @app.post("/evaluate", response_model=EvaluateResponse)
+    async def evaluate(request: EvaluateRequest):
+        # Логнормальная задержка: медиана median, «хвост» задаётся sigma
+        latency = min(max_latency, median * rng.lognormvariate(0, sigma))
+        await asyncio.sleep(latency)
+        if rng.random() < error_rate:
+            raise HTTPException(status_code=503, detail="Сервис оценки перегружен")
+
+        score = score_against_reference(
+            request.user_answer, request.reference_answer or ""
+        )
+        return EvaluateResponse(
+            score=score,
+            feedback=f"Оценка заглушки (задержка {latency:.2f} с): {score}",
+        )
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument(
+        "--median", type=float, default=1.5, help="Медианная задержка, с"
+    )
+    parser.add_argument(
+        "--sigma", type=float, default=0.5, help="Разброс логнормальной задержки"
+    )
+    parser.add_argument(
+        "--max-latency", type=float, default=60.0, help="Потолок задержки, с"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Доля ответов 503"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    app = create_app(
+        args.median, args.sigma, args.max_latency, args.error_rate, args.seed
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Отчёт: согласие локального отбора ответов с оценками GigaChat.
+
+Прогоняет предварительный отбор (app.services.local_scorer) по ответам
+из user_answers, уже оцененным моделью, и сравнивает решения с
+историческими оценками. Помогает подобрать пороги PRESCORE_*: какую долю
+ответов отбор снимает с модели и насколько часто ошибается.
+
+Запуск (нужна база с историей ответов):
+    python -m benchmarks.prescore_agreement --off-topic 0.05 --accept 0.9
+"""
+
+import argparse
+import asyncio
+import statistics
+from collections import defaultdict
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.dao.session_maker import async_session_maker
+from app.interview.dao import QuestionDAO
+from app.interview.models import UserAnswer
+from app.services.feedback import stored_evaluation
+from app.services.gigachat import is_not_know_answer, needs_regrading
+from app.services.local_scorer import (
+    MATCHES_REFERENCE_FEEDBACK,
+    classify_answer,
+    is_prescored_feedback,
+    lexical_index,
+)
+
+AMBIGUOUS = "в модель"
+
+
+async def load_history(limit: int) -> list[tuple[str, str, float]]:
+    """Ответы, оцененные моделью: (ответ, эталон, оценка)"""
+    rows = []
+    async with async_session_maker() as session:
+        lexical_index.fit(await QuestionDAO.get_reference_answers(session))
+        for question_type, model in QuestionDAO.question_models.items():
+            query = (
+                select(
+                    UserAnswer.user_answer,
+                    UserAnswer.evaluation,
+                    UserAnswer.feedback,
+                    UserAnswer.score,
+                    model.answer,
+                )
+                .join(model, model.id == UserAnswer.question_id)
+                .filter(
+                    UserAnswer.question_type == question_type,
+                    UserAnswer.score.is_not(None),
+                )
+                .order_by(UserAnswer.id.desc())
+                .limit(limit)
+            )
+            result = await session.execute(query)
+            for user_answer, evaluation, feedback, score, reference in result:
+                evaluation = stored_evaluation(evaluation, feedback)
+                # Оставляем только оценки, выставленные моделью
+                if (
+                    not user_answer.strip()
+                    or is_not_know_answer(user_answer)
+                    or needs_regrading(evaluation)
+                    or is_prescored_feedback(evaluation)
+                ):
+                    continue
+                rows.append((user_answer, reference, score))
+    return rows
+
+
+def build_report(rows, min_terms, off_topic, accept, tolerance) -> str:
+    verdicts = defaultdict(list)
+    similarities, scores = [], []
+    for user_answer, reference, llm_score in rows:
+        verdict, similarity = classify_answer(
+            user_answer,
+            reference,
+            min_terms=min_terms,
+            off_topic_similarity=off_topic,
+            accept_similarity=accept,
+        )
+        verdicts[verdict or AMBIGUOUS].append(llm_score)
+        similarities.append(similarity)
+        scores.append(llm_score)
+
+    lines = [
+        f"Ответов с оценкой модели: {len(rows)}",
+        f"Пороги: min_terms={min_terms}, off_topic={off_topic}, accept={accept}",
+        "",
+    ]
+    local_total = agreed_total = 0
+    for verdict, llm_scores in sorted(verdicts.items()):
+        lines.append(f"{verdict[:40]:<40} {len(llm_scores):>6}")
+        if verdict == AMBIGUOUS:
+            continue
+        local_score = 1.0 if verdict == MATCHES_REFERENCE_FEEDBACK else 0.0
+        errors = [abs(score - local_score) for score in llm_scores]
+        agreed = sum(1 for error in errors if error <= tolerance)
+        local_total += len(llm_scores)
+        agreed_total += agreed
+        lines.append(
+            f"    согласие ±{tolerance}: {agreed / len(llm_scores):.1%}, "
+            f"средняя ошибка {statistics.mean(errors):.3f}, "
+            f"средняя оценка модели {statistics.mean(llm_scores):.2f}"
+        )
+
+    lines.append("")
+    if rows:
+        lines.append(f"Оценено локально: {local_total / len(rows):.1%} ответов")
+    if local_total:
+        lines.append(f"Общее согласие: {agreed_total / local_total:.1%}")
+    if len(rows) > 1 and statistics.pstdev(similarities) > 0:
+        correlation = statistics.correlation(similarities, scores)
+        lines.append(f"Корреляция сходства с оценкой модели: {correlation:.3f}")
+    return "\n".join(lines)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--min-terms", type=int, default=settings.PRESCORE_MIN_TERMS)
+    parser.add_argument(
+        "--off-topic", type=float, default=settings.PRESCORE_OFF_TOPIC_SIMILARITY
+    )
+    parser.add_argument(
+        "--accept", type=float, default=settings.PRESCORE_ACCEPT_SIMILARITY
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Допустимое расхождение с оценкой модели",
+    )
+    parser.add_argument(
+        "--limit", type=int, default=10000, help="Ответов на тип вопросов"
+    )
+    args = parser.parse_args()
+
+    rows = await load_history(args.limit)
+    print(
+        build_report(rows, args.min_terms, args.off_topic, args.accept, args.tolerance)
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
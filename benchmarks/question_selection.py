@@ -0,0 +1,188 @@
+"""
+Бенчмарк: выбор случайного вопроса на большом банке вопросов.
+
+Сравнивает прежний QuestionDAO.get_random_question (COUNT(*) по подзапросу
+с NOT IN и OFFSET случайного числа строк) с выбором по плотному массиву id
+из кэша банка вопросов (QuestionTable.sample) при разном числе исключённых
+вопросов, а также выбор набора вопросов интервью без повторов: равновероятный
+и взвешенный по chance (таблица псевдонимов).
+
+Выбор по массиву измеряется всегда. Прежний запрос — только с --database:
+во временной таблице базы из настроек приложения создаётся --rows вопросов
+(после завершения таблица удаляется).
+
+Запуск:
+    python -m benchmarks.question_selection --rows 100000
+    python -m benchmarks.question_selection --rows 100000 --database
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+# Настройки приложения обязательны при импорте app.config
+for key, value in {
+    "DB_NAME": "bench",
+    "DB_USER": "bench",
+    "DB_PASSWORD": "bench",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "SECRET_KEY": "bench",
+    "ALGORITHM": "HS256",
+    "GIGACHAT_CREDENTIALS": "bench",
+}.items():
+    os.environ.setdefault(key, value)
+
+from sqlalchemy import Column, Float, Integer, MetaData, Table, Text, func, select
+from sqlalchemy import text
+
+from app.auth.models import User  # noqa: F401 — связи Interview.user
+from app.interview.models import PythonQuestion
+from app.services.question_bank import QuestionTable
+
+bench_questions = Table(
+    "bench_questions",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("chance", Float),
+    Column("question", Text),
+    Column("tag", Text),
+    Column("answer", Text),
+)
+
+
+def make_rows(count: int) -> list:
+    return [
+        SimpleNamespace(
+            id=i,
+            chance=random.paretovariate(1.5),
+            question=f"Вопрос {i}",
+            tag=f"tag{i % 50}",
+            answer=f"Ответ на вопрос {i}",
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def measure(func, repeat: int) -> dict:
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - started) * 1e6)
+    return {"p50_us": statistics.median(durations), "max_us": max(durations)}
+
+
+async def measure_async(func, repeat: int) -> dict:
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func()
+        durations.append((time.perf_counter() - started) * 1e6)
+    return {"p50_us": statistics.median(durations), "max_us": max(durations)}
+
+
+def bench_memory(rows: list, exclude_sizes: list[int], repeat: int) -> None:
+    started = time.perf_counter()
+    table = QuestionTable(PythonQuestion, 1, rows)
+    print(
+        f"Загрузка {len(rows)} вопросов в массивы: "
+        f"{(time.perf_counter() - started) * 1000:.1f}ms (один раз на версию банка)"
+    )
+    # Первое создание объекта вопроса настраивает мапперы SQLAlchemy
+    table.get(table.sample())
+    for size in exclude_sizes:
+        exclude = set(random.sample(range(1, len(rows) + 1), size))
+        result = measure(lambda: table.get(table.sample(exclude)), repeat)
+        print(
+            f"  массив id, исключено {size:>6}: "
+            f"p50={result['p50_us']:.1f}us max={result['max_us']:.1f}us"
+        )
+
+    started = time.perf_counter()
+    table.alias
+    print(
+        f"Таблица псевдонимов по chance: "
+        f"{(time.perf_counter() - started) * 1000:.1f}ms (один раз на версию банка)"
+    )
+    for weighted in (False, True):
+        result = measure(lambda: table.sample_many(10, weighted=weighted), repeat)
+        print(
+            f"  10 вопросов интервью, {'weighted' if weighted else 'uniform '}: "
+            f"p50={result['p50_us']:.1f}us max={result['max_us']:.1f}us"
+        )
+
+
+async def bench_database(rows: int, exclude_sizes: list[int], repeat: int) -> None:
+    from app.dao.session_maker import engine
+
+    async with engine.connect() as conn:
+        await conn.execute(text("""
+                CREATE TEMP TABLE bench_questions (
+                    id serial PRIMARY KEY, chance double precision,
+                    question text, tag text, answer text
+                )
+                """))
+        await conn.execute(
+            text("""
+                INSERT INTO bench_questions (chance, question, tag, answer)
+                SELECT 1.0, 'Вопрос ' || i, 'tag' || (i % 50), 'Ответ на вопрос ' || i
+                FROM generate_series(1, :rows) AS i
+                """),
+            {"rows": rows},
+        )
+        await conn.execute(text("ANALYZE bench_questions"))
+
+        for size in exclude_sizes:
+            exclude = random.sample(range(1, rows + 1), size)
+
+            async def count_offset():
+                # Прежний алгоритм get_random_question
+                query = select(bench_questions)
+                if exclude:
+                    query = query.filter(bench_questions.c.id.not_in(exclude))
+                count = await conn.scalar(
+                    select(func.count()).select_from(query.subquery())
+                )
+                offset = random.randint(0, count - 1)
+                result = await conn.execute(query.offset(offset).limit(1))
+                return result.first()
+
+            result = await measure_async(count_offset, repeat)
+            print(
+                f"  COUNT+OFFSET, исключено {size:>6}: "
+                f"p50={result['p50_us'] / 1000:.1f}ms "
+                f"max={result['max_us'] / 1000:.1f}ms"
+            )
+        await conn.rollback()
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000, help="Вопросов в банке")
+    parser.add_argument(
+        "--exclude",
+        default="0,10,1000,10000",
+        help="Сколько вопросов исключить, через запятую",
+    )
+    parser.add_argument("--repeat", type=int, default=200, help="Выборов на замер")
+    parser.add_argument(
+        "--database", action="store_true", help="Замерить и прежний SQL-запрос"
+    )
+    args = parser.parse_args()
+    exclude_sizes = [int(size) for size in args.exclude.split(",")]
+
+    print(f"Банк из {args.rows} вопросов")
+    bench_memory(make_rows(args.rows), exclude_sizes, args.repeat)
+    if args.database:
+        # Запрос к базе заметно дольше — хватит меньшего числа повторов
+        asyncio.run(bench_database(args.rows, exclude_sizes, max(1, args.repeat // 10)))
+
+
+if __name__ == "__main__":
+    main()
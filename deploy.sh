@@ -3,4 +3,6 @@ cd /home/n1x9s/viewTrain
 git pull
 source .venv/bin/activate
 pip install -r requirements.txt
-sudo systemctl restart viewtrain
+# Триггеры и служебные таблицы (версии банка вопросов и др.) создают только миграции
+alembic upgrade head
+sudo systemctl restart viewtrain viewtrain-worker
@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.interview import dao
+from app.interview.dao import QuestionDAO, UserQuestionReviewDAO
+from app.interview.models import PythonQuestion
+from app.services.question_bank import QuestionTable
+from app.services.recent_questions import RecentQuestions
+
+
+class FakeBank:
+    def __init__(self, count):
+        rows = [
+            SimpleNamespace(id=i, chance=1.0, question="", tag=None, answer="")
+            for i in range(1, count + 1)
+        ]
+        self._table = QuestionTable(PythonQuestion, 1, rows)
+
+    async def table(self, session, question_type):
+        return self._table
+
+    async def select_questions(self, session, question_type, count, exclude_ids=()):
+        return self._table.sample_many(count, exclude_ids)
+
+
+@pytest.fixture
+def reviews(monkeypatch):
+    """История пользователя: due — пора повторить, scheduled — освоены"""
+    state = SimpleNamespace(due=[], scheduled=set(), checked=[])
+
+    async def get_due_question_ids(session, user_id, question_type, limit):
+        return state.due[:limit]
+
+    async def get_scheduled_question_ids(session, user_id, question_type, ids):
+        state.checked.append(len(ids))
+        return state.scheduled & set(ids)
+
+    monkeypatch.setattr(
+        UserQuestionReviewDAO, "get_due_question_ids", get_due_question_ids
+    )
+    monkeypatch.setattr(
+        UserQuestionReviewDAO, "get_scheduled_question_ids", get_scheduled_question_ids
+    )
+    return state
+
+
+@pytest.mark.asyncio
+async def test_due_questions_come_first_and_mastered_are_skipped(monkeypatch, reviews):
+    monkeypatch.setattr(dao, "question_bank", FakeBank(40))
+    # Раундов хватает, чтобы перебрать весь банк: результат не зависит от случая
+    monkeypatch.setattr(dao.settings, "ADAPTIVE_FILL_ROUNDS", 100)
+    # 404 удалён из банка, 1..8 пора повторить, но повторений не больше половины
+    reviews.due = [404, 1, 2, 3, 4, 5, 6, 7, 8]
+    reviews.scheduled = set(range(9, 40))
+
+    selected = await QuestionDAO.select_user_questions(None, "pythonn", 10, 1)
+
+    assert len(selected) == len(set(selected)) == 10
+    assert selected[:4] == [1, 2, 3, 4]
+    assert 40 in selected
+    # Проверяются только кандидаты, а не вся история пользователя
+    assert all(checked <= 20 for checked in reviews.checked)
+
+
+@pytest.mark.asyncio
+async def test_mastered_questions_fill_small_bank(monkeypatch, reviews):
+    monkeypatch.setattr(dao, "question_bank", FakeBank(6))
+    reviews.scheduled = set(range(1, 7))
+
+    selected = await QuestionDAO.select_user_questions(None, "pythonn", 10, 1)
+
+    assert sorted(selected) == [1, 2, 3, 4, 5, 6]
+
+
+@pytest.mark.asyncio
+async def test_recent_questions_are_skipped(monkeypatch, reviews):
+    monkeypatch.setattr(dao, "question_bank", FakeBank(30))
+    recent = RecentQuestions()
+    recent.add(range(1, 21), generation_size=50)
+
+    # Недавние вопросы не выбираются вовсе: результат не зависит от случая
+    for _ in range(50):
+        selected = await QuestionDAO.select_user_questions(
+            None, "pythonn", 10, 1, adaptive=False, recent=recent
+        )
+        assert sorted(selected) == list(range(21, 31))
+    assert reviews.checked == []
+
+
+@pytest.mark.asyncio
+async def test_recent_questions_fill_when_nothing_else_left(monkeypatch, reviews):
+    monkeypatch.setattr(dao, "question_bank", FakeBank(12))
+    recent = RecentQuestions()
+    recent.add(range(1, 10), generation_size=50)
+    # Из не недавних 10 освоен: сначала он, затем недавние
+    reviews.scheduled = {10}
+
+    for _ in range(20):
+        selected = await QuestionDAO.select_user_questions(
+            None, "pythonn", 10, 1, recent=recent
+        )
+        assert len(selected) == len(set(selected)) == 10
+        assert selected[:3] in ([11, 12, 10], [12, 11, 10])
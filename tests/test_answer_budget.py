@@ -0,0 +1,106 @@
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+from app.config import settings
+from app.interview import router
+from app.interview.dao import UserAnswerDAO
+from app.interview.models import InterviewMode
+from app.interview.schemas import AnswerRequest, AnswerResponse
+from app.services.answer_budget import fit_answer
+from app.services.metrics import metrics
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    monkeypatch.setattr(settings, "EVALUATION_INPUT_BUDGET", 300)
+    monkeypatch.setattr(settings, "EVALUATION_INPUT_BUDGETS", {"golangquestions": 0})
+
+
+def test_short_answer_is_unchanged(budget):
+    answer = "GIL не даёт потокам выполнять байткод параллельно"
+
+    assert fit_answer(answer, "pythonn") == answer
+
+
+def test_code_is_trimmed_before_explanation(budget):
+    explanation = "GIL защищает счётчики ссылок, поэтому потоки не ускоряют CPU-задачи."
+    code = "\n".join(f"    total += worker_{i}()" for i in range(100))
+    answer = f"{explanation}\n\n```python\ndef run():\n{code}\n    return total\n```"
+
+    fitted = fit_answer(answer, "pythonn")
+
+    assert len(fitted) <= 300
+    assert fitted.startswith(explanation)
+    assert "def run():" in fitted
+    assert fitted.endswith("    return total\n```")
+    assert "пропущено строк" in fitted
+
+
+def test_plain_text_keeps_head_and_tail(budget):
+    answer = "начало " + "слово " * 200 + "конец"
+
+    fitted = fit_answer(answer, "pythonn")
+
+    assert len(fitted) <= 300
+    assert fitted.startswith("начало")
+    assert fitted.endswith("конец")
+
+
+def test_budget_per_question_type(budget):
+    answer = "слово " * 200
+
+    assert fit_answer(answer, "golangquestions") == answer
+
+
+def test_request_length_is_limited():
+    with pytest.raises(ValidationError):
+        AnswerRequest(question_id=1, user_answer="x" * (settings.ANSWER_MAX_LENGTH + 1))
+
+
+class FakeSession:
+    async def close(self):
+        pass
+
+    @asynccontextmanager
+    async def begin(self):
+        yield
+
+
+@asynccontextmanager
+async def fake_session_maker():
+    yield FakeSession()
+
+
+@pytest.mark.asyncio
+async def test_cached_stream_answer_is_not_counted_over_budget(budget, monkeypatch):
+    question = SimpleNamespace(id=1, question="Что такое GIL?", answer="Блокировка")
+
+    async def get_answer_context(session, current_user, answer_data):
+        return 1, "pythonn", InterviewMode.STANDARD, question
+
+    async def get_cached_evaluation(session, key, reference_answer):
+        return 0.9, {"feedback": "Верно"}
+
+    async def save_answer(session, *args):
+        return AnswerResponse(score=0.9, interview_completed=False)
+
+    monkeypatch.setattr(router, "_get_answer_context", get_answer_context)
+    monkeypatch.setattr(router, "_save_answer", save_answer)
+    monkeypatch.setattr(router, "async_session_maker", fake_session_maker)
+    monkeypatch.setattr(UserAnswerDAO, "prescore", lambda question, answer: None)
+    monkeypatch.setattr(UserAnswerDAO, "get_cached_evaluation", get_cached_evaluation)
+    over_budget = metrics.get("answers_over_budget")
+
+    response = await router.submit_answer_stream(
+        AnswerRequest(question_id=1, user_answer="слово " * 200),
+        SimpleNamespace(id=1),
+        FakeSession(),
+    )
+    events = [event async for event in response.body_iterator]
+
+    assert events[-1].startswith("event: result")
+    # Ответ из кэша модели не отправлялся и не урезался
+    assert metrics.get("answers_over_budget") == over_budget
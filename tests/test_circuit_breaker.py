@@ -0,0 +1,66 @@
+import pytest
+
+from app.services.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+)
+
+
+def make_breaker(**overrides) -> CircuitBreaker:
+    params = dict(
+        name="test",
+        window_seconds=60,
+        min_requests=4,
+        failure_ratio=0.5,
+        slow_seconds=5,
+        open_seconds=30,
+    )
+    params.update(overrides)
+    return CircuitBreaker(**params)
+
+
+def test_opens_on_failure_ratio():
+    breaker = make_breaker()
+    for failed in (False, True, False, True):
+        breaker.before_request()
+        breaker.record(0.1, failed=failed)
+
+    assert breaker.state == CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+def test_slow_responses_count_as_failures():
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(10, failed=False)
+
+    assert breaker.is_open
+
+
+def test_half_open_probe_closes_breaker():
+    breaker = make_breaker(open_seconds=0)
+    for _ in range(4):
+        breaker.record(0.1, failed=True)
+
+    breaker.before_request()
+    assert breaker.state == CircuitState.HALF_OPEN
+    # Пока идёт пробный запрос, остальные отклоняются
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    breaker.record(0.1, failed=False)
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_probing_after_cooldown():
+    breaker = make_breaker(open_seconds=0)
+    assert not breaker.is_probing
+    for _ in range(4):
+        breaker.record(0.1, failed=True)
+
+    assert breaker.is_probing
+    breaker.before_request()
+    breaker.record(0.1, failed=False)
+    assert not breaker.is_probing
@@ -0,0 +1,60 @@
+import re
+
+import pytest
+
+from app.config import settings
+from app.services import gigachat
+from app.services.evaluation_cache import LRUCache, make_cache_key, normalize_answer
+from app.services.gigachat import current_prompt_version, stale_prompt_version_patterns
+
+
+def test_equivalent_answers_share_cache_key():
+    """Регистр, пробелы и пунктуация по краям не меняют ключ"""
+    first = make_cache_key("pythonn", 1, "  Не знаю. ")
+    second = make_cache_key("pythonn", 1, "не   знаю")
+
+    assert normalize_answer("  Не   ЗНАЮ!") == "не знаю"
+    assert first == second
+    assert first != make_cache_key("pythonn", 2, "не знаю")
+    assert first != make_cache_key("golangquestions", 1, "не знаю")
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", (0.1, "a"))
+    cache.put("b", (0.2, "b"))
+    cache.get("a")
+    cache.put("c", (0.3, "c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") == (0.1, "a")
+    assert len(cache) == 2
+
+
+@pytest.mark.parametrize(
+    "backend, stale, kept",
+    [
+        ("gigachat", ["v3-full", "v3"], ["v4-full", "v4-grounded", "local-v3"]),
+        ("local", ["local-v3"], ["local-v4", "v3-full", "cascade-local-v3-full"]),
+        (
+            "cascade",
+            ["cascade-local-v3-grounded"],
+            ["cascade-local-v4-full", "cascade-http-v3-full", "v3-full"],
+        ),
+    ],
+)
+def test_only_older_versions_of_current_backend_are_stale(
+    monkeypatch, backend, stale, kept
+):
+    monkeypatch.setattr(settings, "EVALUATOR_BACKEND", backend)
+    monkeypatch.setattr(settings, "EVALUATION_CASCADE_FIRST_TIER", "local")
+    monkeypatch.setattr(gigachat, "PROMPT_VERSION", "v4")
+    backend_pattern, current_pattern = stale_prompt_version_patterns()
+
+    def is_stale(version):
+        return bool(re.search(backend_pattern, version)) and not re.search(
+            current_pattern, version
+        )
+
+    assert re.search(current_pattern, current_prompt_version())
+    assert [version for version in stale + kept if is_stale(version)] == stale
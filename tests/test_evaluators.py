@@ -0,0 +1,101 @@
+import httpx
+import pytest
+
+from app.services.evaluators import (
+    CascadeEvaluator,
+    HttpEvaluator,
+    LocalEvaluator,
+    create_evaluator,
+)
+from app.services.gigachat import needs_regrading
+from benchmarks.evaluator_stub import create_app
+
+REFERENCE = "GIL — глобальная блокировка интерпретатора CPython"
+
+
+def make_http_evaluator(error_rate: float) -> HttpEvaluator:
+    evaluator = HttpEvaluator()
+    app = create_app(
+        median=0.001, sigma=0, max_latency=0.01, error_rate=error_rate, seed=1
+    )
+    evaluator._client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://stub"
+    )
+    return evaluator
+
+
+@pytest.mark.asyncio
+async def test_local_evaluator_is_deterministic():
+    evaluator = LocalEvaluator()
+    answer = "Глобальная блокировка интерпретатора в CPython"
+
+    first = await evaluator.evaluate_answer("Что такое GIL?", answer, REFERENCE)
+    second = await evaluator.evaluate_answer("Что такое GIL?", answer, REFERENCE)
+
+    assert first == second
+    assert first[0] > 0
+    assert first[1]["correct_answer"] == REFERENCE
+
+
+@pytest.mark.asyncio
+async def test_http_evaluator_uses_stub_server():
+    evaluator = make_http_evaluator(error_rate=0)
+
+    score, feedback = await evaluator.evaluate_answer(
+        "Что такое GIL?", "Глобальная блокировка интерпретатора CPython", REFERENCE
+    )
+
+    assert score > 0
+    assert feedback["feedback"].startswith("Оценка заглушки")
+    await evaluator.close()
+
+
+@pytest.mark.asyncio
+async def test_http_evaluator_falls_back_on_errors():
+    evaluator = make_http_evaluator(error_rate=1)
+
+    _, feedback = await evaluator.evaluate_answer(
+        "Что такое GIL?", "Глобальная блокировка интерпретатора CPython", REFERENCE
+    )
+
+    assert needs_regrading(feedback)
+    await evaluator.close()
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_evaluator("openai")
+
+
+class FakeService:
+    """Полная модель каскада: запоминает, какие ответы до неё дошли"""
+
+    def __init__(self):
+        self.answers = []
+
+    async def evaluate_answer(
+        self, question, user_answer, reference_answer, model=None
+    ):
+        self.answers.append((user_answer, model))
+        return 0.6, {"feedback": "Оценка модели"}
+
+    def prompt_mode(self, reference_answer):
+        return "grounded"
+
+
+@pytest.mark.asyncio
+async def test_cascade_escalates_only_uncertain_answers():
+    evaluator = CascadeEvaluator()
+    evaluator.service = FakeService()
+    borderline = "Глобальная блокировка интерпретатора в CPython"
+
+    exact = await evaluator.evaluate_answer("Что такое GIL?", REFERENCE, REFERENCE)
+    off_topic = await evaluator.evaluate_answer(
+        "Что такое GIL?", "Декоратор оборачивает функцию", REFERENCE
+    )
+    escalated = await evaluator.evaluate_answer("Что такое GIL?", borderline, REFERENCE)
+
+    assert exact[0] == 1.0
+    assert off_topic[0] == 0.0
+    assert escalated == (0.6, {"feedback": "Оценка модели"})
+    assert evaluator.service.answers == [(borderline, None)]
@@ -0,0 +1,50 @@
+from app.services.feedback import (
+    REFERENCE_FLAG,
+    needs_reference,
+    pack_evaluation,
+    plain_evaluation,
+    render_feedback,
+    stored_evaluation,
+    unpack_evaluation,
+)
+
+REFERENCE = "GIL — глобальная блокировка интерпретатора CPython"
+
+EVALUATION = {
+    "feedback": "Хороший ответ",
+    "score": 0.7,
+    "strengths": ["Верная терминология"],
+    "weaknesses": ["Мало деталей"],
+    "correct_answer": REFERENCE,
+}
+
+
+def test_render_only_requested_fields():
+    full = render_feedback(EVALUATION)
+    partial = render_feedback(EVALUATION, ["strengths"])
+
+    assert full.startswith("Хороший ответ")
+    assert "**Сильные стороны:**\n- Верная терминология" in full
+    assert REFERENCE in full
+    assert partial == "**Сильные стороны:**\n- Верная терминология"
+
+
+def test_reference_is_stored_as_flag():
+    packed = pack_evaluation(EVALUATION, REFERENCE)
+
+    assert "correct_answer" not in packed
+    assert packed[REFERENCE_FLAG] is True
+    assert needs_reference(packed)
+    assert not needs_reference(packed, ["score"])
+    assert unpack_evaluation(packed, REFERENCE) == EVALUATION
+
+
+def test_generated_answer_is_stored_as_is():
+    evaluation = dict(EVALUATION, correct_answer="Другой ответ")
+
+    assert pack_evaluation(evaluation, REFERENCE) == evaluation
+
+
+def test_legacy_feedback_is_readable():
+    assert stored_evaluation(None, "Старый текст") == plain_evaluation("Старый текст")
+    assert stored_evaluation(None, None) is None
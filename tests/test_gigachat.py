@@ -0,0 +1,423 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from gigachat.models import Chat
+
+from app.config import settings
+from app.services.deadline import LatencyWindow, deadline_scope
+from app.services.feedback import render_feedback
+from app.services import gigachat as gigachat_module
+from app.services.gigachat import GigaChatService, needs_regrading
+from app.services.metrics import metrics
+from app.services.scheduler import EvaluationScheduler
+
+EVALUATION = {
+    "score": 0.7,
+    "feedback": "Хороший ответ",
+    "recommendations": ["Добавьте пример"],
+    "strengths": ["Верная терминология"],
+    "weaknesses": ["Мало деталей"],
+    "correct_answer": "Эталон",
+}
+
+
+class FakeClient:
+    """Заглушка клиента GigaChat"""
+
+    def __init__(self, content: str = json.dumps(EVALUATION)):
+        self.content = content
+        self.token_requests = 0
+        self.prompts = []
+        self.functions = []
+
+    def reply(self, prompt: str):
+        return SimpleNamespace(content=self.content, function_call=None)
+
+    async def aget_token(self):
+        self.token_requests += 1
+        return SimpleNamespace(access_token="token")
+
+    async def achat(self, payload):
+        if isinstance(payload, Chat):
+            self.functions.append(payload.functions[0])
+            payload = payload.messages[0].content
+        self.prompts.append(payload)
+        message = self.reply(payload)
+        usage = SimpleNamespace(prompt_tokens=len(payload), completion_tokens=100)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    async def astream(self, payload):
+        self.prompts.append(payload)
+        for start in range(0, len(self.content), 16):
+            delta = SimpleNamespace(content=self.content[start : start + 16])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+@pytest.fixture(autouse=True)
+def idle_scheduler(monkeypatch):
+    """
+    Свободный планировщик: общий планировщик процесса ограничен долей лимитов,
+    а предыдущие тесты могли израсходовать его токены
+    """
+    monkeypatch.setattr(
+        gigachat_module,
+        "evaluation_scheduler",
+        EvaluationScheduler(max_concurrency=4, rate=0, burst=1),
+    )
+
+
+def make_service(client: FakeClient) -> GigaChatService:
+    service = GigaChatService()
+    service.client = client
+    return service
+
+
+@pytest.mark.asyncio
+async def test_token_fetched_at_start():
+    """Токен запрашивается при старте, дальше его обновляет SDK"""
+    client = FakeClient()
+    service = make_service(client)
+    before = metrics.get("gigachat_token_fetches")
+
+    await service.start()
+    await asyncio.gather(
+        *(service.evaluate_answer("Что такое GIL?", "Блокировка") for _ in range(3))
+    )
+
+    assert client.token_requests == 1
+    assert metrics.get("gigachat_token_fetches") - before == 1
+
+
+def test_sdk_http_client_is_instrumented():
+    """Хуки учёта соединений встают на HTTP-клиент текущей версии SDK"""
+    service = GigaChatService()
+
+    hooks = service.client._aclient.event_hooks
+    assert gigachat_module._trace_request in hooks["request"]
+    assert gigachat_module._count_connection in hooks["response"]
+
+
+@pytest.mark.asyncio
+async def test_connections_counted_from_trace():
+    """Новое соединение — по событию httpcore, а не по догадке о пуле"""
+    connected = False
+
+    async def handler(request):
+        nonlocal connected
+        if not connected:
+            # Первый запрос открывает соединение, остальные его переиспользуют
+            await request.extensions["trace"]("connection.connect_tcp.complete", {})
+            connected = True
+        return httpx.Response(200)
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    gigachat_module._instrument_http_client(SimpleNamespace(_aclient=http_client))
+    opened = metrics.get("gigachat_connections_opened")
+    reused = metrics.get("gigachat_connections_reused")
+
+    async with http_client:
+        for _ in range(3):
+            await http_client.get("https://gigachat.test/chat")
+
+    assert metrics.get("gigachat_connections_opened") - opened == 1
+    assert metrics.get("gigachat_connections_reused") - reused == 2
+
+
+@pytest.mark.asyncio
+async def test_evaluation_is_structured():
+    client = FakeClient()
+    service = make_service(client)
+
+    score, evaluation = await service.evaluate_answer("Что такое GIL?", "Блокировка")
+
+    assert score == 0.7
+    assert evaluation["strengths"] == ["Верная терминология"]
+    assert evaluation["correct_answer"] == "Эталон"
+    assert "**Сильные стороны:**" in render_feedback(evaluation)
+
+
+@pytest.mark.asyncio
+async def test_not_know_answer_uses_stored_reference():
+    """На "не знаю" возвращается эталон из базы без обращения к модели"""
+    client = FakeClient()
+    service = make_service(client)
+
+    score, feedback = await service.evaluate_answer(
+        "Что такое GIL?", "Честно, не знаю", reference_answer="Global Interpreter Lock"
+    )
+
+    assert score == 0.0
+    assert "Global Interpreter Lock" in render_feedback(feedback)
+    assert client.prompts == []
+
+
+@pytest.mark.asyncio
+async def test_generated_reference_is_cached_per_question():
+    client = FakeClient(content="Сгенерированный ответ")
+    service = make_service(client)
+
+    for _ in range(3):
+        _, feedback = await service.evaluate_answer("Что такое GIL?", "не помню")
+
+    assert "Сгенерированный ответ" in render_feedback(feedback)
+    assert len(client.prompts) == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_evaluation_yields_parsable_chunks():
+    client = FakeClient()
+    service = make_service(client)
+
+    chunks = [
+        chunk
+        async for chunk in service.stream_evaluation("Что такое GIL?", "Блокировка")
+    ]
+    score, feedback = service.parse_evaluation("".join(chunks))
+
+    assert len(chunks) > 1
+    assert score == 0.7
+    assert "Эталон" in render_feedback(feedback)
+
+
+@pytest.mark.asyncio
+async def test_batch_evaluation_maps_results_by_index():
+    """Пакетная оценка раскладывает ответы по индексам, пропуски — None"""
+    second = {**EVALUATION, "index": 2, "score": 0.9}
+    client = FakeClient(content=json.dumps({"evaluations": [second]}))
+    service = make_service(client)
+
+    evaluations = await service.evaluate_batch(
+        [("Вопрос 1", "Ответ 1", None), ("Вопрос 2", "Ответ 2", None)]
+    )
+
+    assert len(client.prompts) == 1
+    assert evaluations[0] is None
+    assert evaluations[1][0] == 0.9
+
+
+class FailingClient(FakeClient):
+    async def achat(self, payload):
+        self.prompts.append(payload)
+        raise ConnectionError("GigaChat недоступен")
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_and_falls_back_to_reference():
+    """После серии ошибок запросы не уходят в GigaChat, оценка — по эталону"""
+    client = FailingClient()
+    service = make_service(client)
+    reference = "GIL — глобальная блокировка интерпретатора CPython"
+
+    for _ in range(10):
+        score, feedback = await service.evaluate_answer(
+            "Что такое GIL?",
+            "Глобальная блокировка интерпретатора в CPython",
+            reference_answer=reference,
+        )
+
+    assert service.breaker.is_open
+    assert len(client.prompts) == service.breaker.min_requests
+    assert score > 0
+    assert needs_regrading(feedback)
+    assert reference in render_feedback(feedback)
+
+
+@pytest.mark.asyncio
+async def test_grounded_prompt_uses_stored_reference():
+    """Эталон из базы передаётся в промпт и попадает в обратную связь"""
+    evaluation = {k: v for k, v in EVALUATION.items() if k != "correct_answer"}
+    client = FakeClient(content=json.dumps(evaluation))
+    service = make_service(client)
+    before = metrics.snapshot()["observations"].get(
+        "gigachat_evaluation_grounded_completion_tokens", {"count": 0}
+    )
+
+    score, feedback = await service.evaluate_answer(
+        "Что такое GIL?", "Блокировка", reference_answer="Global Interpreter Lock"
+    )
+
+    assert "Эталонный ответ: Global Interpreter Lock" in client.prompts[0]
+    assert "Сначала сгенерируй правильный ответ" not in client.prompts[0]
+    assert score == 0.7
+    assert "Global Interpreter Lock" in render_feedback(feedback)
+    after = metrics.snapshot()["observations"][
+        "gigachat_evaluation_grounded_completion_tokens"
+    ]
+    assert after["count"] == before["count"] + 1
+
+
+class FunctionCallClient(FakeClient):
+    """Отвечает вызовом функции; на первый запрос — без части полей"""
+
+    def reply(self, prompt: str):
+        fields = self.functions[-1].parameters.properties
+        if len(self.prompts) == 1:
+            fields = [field for field in fields if field != "weaknesses"]
+        arguments = {field: EVALUATION[field] for field in fields}
+        return SimpleNamespace(
+            content="",
+            function_call=SimpleNamespace(
+                name="submit_evaluation", arguments=arguments
+            ),
+        )
+
+
+@pytest.mark.asyncio
+async def test_structured_output_reasks_only_missing_fields():
+    client = FunctionCallClient()
+    service = make_service(client)
+
+    score, feedback = await service.evaluate_answer(
+        "Что такое GIL?", "Блокировка", reference_answer="Global Interpreter Lock"
+    )
+
+    assert score == 0.7
+    assert "Мало деталей" in render_feedback(feedback)
+    assert len(client.prompts) == 2
+    assert list(client.functions[1].parameters.properties) == ["weaknesses"]
+
+
+def test_near_valid_json_is_repaired():
+    service = make_service(FakeClient())
+    content = json.dumps(EVALUATION, ensure_ascii=False)
+    # Висячая запятая и оборванный конец ответа
+    broken = "```json\n" + content[:-1].replace('"Эталон"', '"Эталон",')
+
+    score, feedback = service.parse_evaluation(broken)
+
+    assert score == 0.7
+    assert "Эталон" in render_feedback(feedback)
+
+
+@pytest.mark.asyncio
+async def test_warm_generates_reference_once_for_not_know_answer():
+    """Ответ «не знаю» во время подготовки вопроса ждёт ту же генерацию эталона"""
+    client = FakeClient(content="Сгенерированный ответ")
+    service = make_service(client)
+
+    warm = asyncio.create_task(
+        service.warm("Что такое GIL?", None, generate_reference=True)
+    )
+    await asyncio.sleep(0)
+    score, feedback = await service.evaluate_answer("Что такое GIL?", "не знаю")
+    await warm
+
+    assert score == 0.0
+    assert "Сгенерированный ответ" in render_feedback(feedback)
+    assert len(client.prompts) == 1
+
+
+class SlowFirstClient(FakeClient):
+    """Первый запрос «зависает», следующие отвечают сразу"""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+        self.calls = 0
+
+    async def achat(self, payload):
+        self.calls += 1
+        if self.calls == 1:
+            await asyncio.sleep(self.delay)
+        return await super().achat(payload)
+
+
+@pytest.mark.asyncio
+async def test_exhausted_deadline_returns_provisional_evaluation(idle_scheduler):
+    """Медленный ответ модели не держит запрос дольше бюджета"""
+    service = make_service(SlowFirstClient(delay=5))
+
+    started = time.perf_counter()
+    with deadline_scope(0.2):
+        score, feedback = await service.evaluate_answer(
+            "Что такое GIL?", "Блокировка интерпретатора", "GIL — блокировка"
+        )
+
+    assert time.perf_counter() - started < 1
+    assert needs_regrading(feedback)
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_takes_first_response(monkeypatch, idle_scheduler):
+    """Задержавшийся запрос дублируется, побеждает первый ответ"""
+    monkeypatch.setattr(settings, "GIGACHAT_HEDGE_ENABLED", True)
+    monkeypatch.setattr(settings, "GIGACHAT_HEDGE_MIN_DELAY", 0.05)
+    monkeypatch.setattr(settings, "GIGACHAT_HEDGE_MIN_SAMPLES", 1)
+    client = SlowFirstClient(delay=5)
+    service = make_service(client)
+    service._latency["evaluation_grounded"] = LatencyWindow()
+    service._latency["evaluation_grounded"].observe(0.01)
+    before = metrics.get("gigachat_hedge_wins")
+
+    started = time.perf_counter()
+    score, _ = await service.evaluate_answer(
+        "Что такое GIL?", "Блокировка интерпретатора", "GIL — блокировка"
+    )
+
+    assert time.perf_counter() - started < 1
+    assert score == EVALUATION["score"]
+    assert client.calls == 2
+    assert metrics.get("gigachat_hedge_wins") - before == 1
+
+
+class SlowClient(FakeClient):
+    """Каждый запрос отвечает с задержкой"""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    async def achat(self, payload):
+        await asyncio.sleep(self.delay)
+        return await super().achat(payload)
+
+
+@pytest.fixture
+def serial_scheduler(monkeypatch):
+    """Планировщик на один запрос одновременно"""
+    monkeypatch.setattr(
+        gigachat_module,
+        "evaluation_scheduler",
+        EvaluationScheduler(max_concurrency=1, rate=0, burst=1),
+    )
+
+
+@pytest.mark.asyncio
+async def test_queue_wait_does_not_shorten_request_timeout(
+    monkeypatch, serial_scheduler
+):
+    """Без бюджета запроса таймаут модели отсчитывается после получения слота"""
+    monkeypatch.setattr(settings, "GIGACHAT_REQUEST_TIMEOUT", 0.5)
+    service = make_service(SlowClient(delay=0.3))
+
+    results = await asyncio.gather(
+        *(
+            service.evaluate_answer("Что такое GIL?", "Блокировка", "GIL")
+            for _ in range(4)
+        )
+    )
+
+    assert not any(needs_regrading(feedback) for _, feedback in results)
+    assert not any(failed for _, failed in service.breaker._outcomes)
+
+
+@pytest.mark.asyncio
+async def test_exhausted_budget_is_not_a_provider_failure(serial_scheduler):
+    """Бюджет, кончившийся в очереди, не размыкает предохранитель"""
+    service = make_service(SlowClient(delay=0.3))
+
+    with deadline_scope(0.5):
+        results = await asyncio.gather(
+            *(
+                service.evaluate_answer("Что такое GIL?", "Блокировка", "GIL")
+                for _ in range(4)
+            )
+        )
+
+    assert not needs_regrading(results[0][1])
+    assert any(needs_regrading(feedback) for _, feedback in results[1:])
+    assert not any(failed for _, failed in service.breaker._outcomes)
@@ -0,0 +1,115 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.interview import router
+from app.interview.dao import InterviewDAO, UserAnswerDAO
+from app.interview.models import InterviewMode
+from app.interview.schemas import AnswerRequest
+
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+
+    def fetchone(self):
+        return self.row
+
+
+class FakeSession:
+    """Сессия с активным интервью из трёх вопросов (маленький банк)"""
+
+    def __init__(self, interview):
+        self.interview = interview
+        self.committed = False
+
+    async def execute(self, statement, params=None):
+        interview = self.interview
+        return FakeResult(
+            (
+                interview.id,
+                interview.question_ids,
+                interview.user_interview_id,
+                interview.question_type,
+            )
+        )
+
+    def add(self, obj):
+        obj.id = 100
+
+    async def flush(self):
+        pass
+
+    async def commit(self):
+        self.committed = True
+
+
+@pytest.fixture
+def exam(monkeypatch):
+    interview = SimpleNamespace(
+        id=1,
+        user_id=1,
+        user_interview_id=1,
+        question_ids="1,2,3",
+        question_type="pythonn",
+        mode=InterviewMode.EXAM,
+    )
+    state = SimpleNamespace(interview=interview, answered=[1, 2, 3], graded=[])
+
+    async def find_one_or_none_by_id(data_id, session):
+        return interview
+
+    async def count_answers(session, interview_id):
+        return len(state.answered)
+
+    async def get_answered_question_ids(session, interview_id):
+        return state.answered
+
+    async def grade_interview_answers(session, graded_interview):
+        state.graded.append(graded_interview.id)
+
+    async def complete_interview(session, completed_interview):
+        completed_interview.status = "completed"
+        return 0.5, "Средний результат."
+
+    async def load_evaluations(session, answers):
+        return {answer.id: {"feedback": "ok"} for answer in answers}
+
+    monkeypatch.setattr(InterviewDAO, "find_one_or_none_by_id", find_one_or_none_by_id)
+    monkeypatch.setattr(InterviewDAO, "complete_interview", complete_interview)
+    monkeypatch.setattr(UserAnswerDAO, "count_answers", count_answers)
+    monkeypatch.setattr(
+        UserAnswerDAO, "get_answered_question_ids", get_answered_question_ids
+    )
+    monkeypatch.setattr(
+        UserAnswerDAO, "grade_interview_answers", grade_interview_answers
+    )
+    monkeypatch.setattr(UserAnswerDAO, "load_evaluations", load_evaluations)
+    return state
+
+
+@pytest.mark.asyncio
+async def test_last_exam_answer_in_small_interview_is_graded(exam):
+    session = FakeSession(exam.interview)
+
+    response = await router._save_exam_answer(
+        session, 1, "pythonn", AnswerRequest(question_id=3, user_answer="ответ")
+    )
+
+    assert response.interview_completed
+    assert response.final_score == 50
+    assert exam.graded == [1]
+
+
+@pytest.mark.asyncio
+async def test_get_question_grades_exam_when_all_answered(exam):
+    session = FakeSession(exam.interview)
+
+    with pytest.raises(HTTPException) as error:
+        await router.get_question(SimpleNamespace(id=1), session)
+
+    assert error.value.status_code == 404
+    assert exam.graded == [1]
+    assert exam.interview.status == "completed"
+    assert session.committed
@@ -0,0 +1,53 @@
+from app.services.local_scorer import (
+    LexicalIndex,
+    is_prescored_feedback,
+    prescore_answer,
+)
+
+REFERENCE = (
+    "GIL — глобальная блокировка интерпретатора CPython. Она не позволяет "
+    "нескольким потокам одновременно выполнять байткод Python."
+)
+
+
+def test_short_answer_is_scored_locally():
+    score, feedback = prescore_answer("GIL", REFERENCE)
+
+    assert score == 0.0
+    assert is_prescored_feedback(feedback)
+    assert feedback["correct_answer"] == REFERENCE
+
+
+def test_off_topic_answer_is_scored_locally():
+    score, _ = prescore_answer(
+        "Декоратор оборачивает функцию другой функцией", REFERENCE
+    )
+
+    assert score == 0.0
+
+
+def test_ambiguous_answer_goes_to_model():
+    answer = "Блокировка интерпретатора, из-за неё потоки не работают параллельно"
+
+    assert prescore_answer(answer, REFERENCE) is None
+
+
+def test_copy_of_reference_gets_full_score():
+    score, _ = prescore_answer(REFERENCE, REFERENCE)
+
+    assert score == 1.0
+
+
+def test_idf_downweights_common_terms():
+    index = LexicalIndex()
+    index.fit(
+        [
+            "функция python декоратор",
+            "функция python генератор",
+            "функция python блокировка",
+        ]
+    )
+
+    assert index.similarity(
+        "функция python", "функция python декоратор"
+    ) < index.similarity("декоратор", "функция python декоратор")
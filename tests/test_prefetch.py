@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from app.services import prefetch
+from app.services.local_scorer import lexical_index
+from app.services.prefetch import Prefetcher
+
+
+class SlowEvaluator:
+    is_available = True
+
+    def __init__(self):
+        self.warmed = []
+
+    async def warm(self, question, reference_answer, generate_reference=False):
+        await asyncio.sleep(0.05)
+        self.warmed.append(question)
+
+
+@pytest.mark.asyncio
+async def test_new_question_cancels_previous_prefetch(monkeypatch):
+    evaluator = SlowEvaluator()
+    monkeypatch.setattr(prefetch, "evaluator", evaluator)
+    prefetcher = Prefetcher(max_tasks=4, timeout=1)
+
+    prefetcher.schedule("user", "Первый вопрос", None)
+    await asyncio.sleep(0)
+    prefetcher.schedule("user", "Второй вопрос", None)
+    await asyncio.sleep(0.1)
+
+    assert evaluator.warmed == ["Второй вопрос"]
+    assert len(prefetcher) == 0
+
+
+@pytest.mark.asyncio
+async def test_prefetch_is_bounded(monkeypatch):
+    monkeypatch.setattr(prefetch, "evaluator", SlowEvaluator())
+    prefetcher = Prefetcher(max_tasks=2, timeout=1)
+
+    scheduled = [prefetcher.schedule(user, "Вопрос", None) for user in ("a", "b", "c")]
+    await prefetcher.close()
+
+    assert scheduled == [True, True, False]
+
+
+def test_reference_vector_is_reused():
+    reference = "GIL — глобальная блокировка интерпретатора"
+    first = lexical_index.reference_vector(reference)
+
+    assert lexical_index.reference_vector(reference) is first
+    assert lexical_index.similarity(reference, reference) == pytest.approx(1.0)
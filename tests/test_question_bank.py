@@ -0,0 +1,172 @@
+import random
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+from app.interview.models import PythonQuestion
+from app.services.question_bank import (
+    AliasTable,
+    QuestionBank,
+    QuestionTable,
+    install_bank_versions,
+)
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Сессия с таблицей версий и таблицей вопросов pythonn"""
+
+    def __init__(self):
+        self.version = 1
+        self.questions = [
+            SimpleNamespace(
+                id=1,
+                chance=0.5,
+                question="Что такое GIL?",
+                tag="gil",
+                answer="Блокировка",
+            ),
+            SimpleNamespace(
+                id=7,
+                chance=None,
+                question="Что такое yield?",
+                tag=None,
+                answer="Генератор",
+            ),
+        ]
+        self.queries = 0
+
+    async def execute(self, query):
+        self.queries += 1
+        if "question_bank_versions" in str(query):
+            return FakeResult([("pythonn", self.version)])
+        return FakeResult(self.questions)
+
+
+@pytest.mark.asyncio
+async def test_bank_is_loaded_once():
+    bank = QuestionBank(check_interval=60)
+    session = FakeSession()
+
+    assert list(await bank.ids(session, "pythonn")) == [1, 7]
+    question = await bank.get(session, "pythonn", 7)
+    missing = await bank.get(session, "pythonn", 2)
+
+    assert isinstance(question, PythonQuestion)
+    assert (question.question, question.answer, question.chance) == (
+        "Что такое yield?",
+        "Генератор",
+        0.0,
+    )
+    assert missing is None
+    # Версии и вопросы — по одному запросу
+    assert session.queries == 2
+
+
+@pytest.mark.asyncio
+async def test_bank_reloads_when_version_changes():
+    bank = QuestionBank(check_interval=0)
+    session = FakeSession()
+    await bank.ids(session, "pythonn")
+
+    await bank.ids(session, "pythonn")
+    assert session.queries == 3  # только проверка версии
+
+    session.version = 2
+    session.questions = session.questions[:1]
+    assert list(await bank.ids(session, "pythonn")) == [1]
+
+
+def test_sample_skips_excluded_questions():
+    rows = FakeSession().questions
+    table = QuestionTable(PythonQuestion, 1, rows)
+
+    assert {table.sample({1}) for _ in range(20)} == {7}
+    assert table.sample([1, 7]) is None
+    assert QuestionTable(PythonQuestion, 1, []).sample() is None
+
+
+def test_alias_table_follows_weights():
+    alias = AliasTable([1.0, 0.0, 3.0, None])
+    rng = random.Random(1)
+
+    draws = Counter(alias.draw(rng) for _ in range(8000))
+
+    assert set(draws) == {0, 2}
+    assert draws[2] / draws[0] == pytest.approx(3.0, rel=0.1)
+
+
+def test_weighted_sample_many_without_replacement():
+    rows = [
+        SimpleNamespace(id=i, chance=chance, question="", tag=None, answer="")
+        for i, chance in [(1, 5.0), (2, 0.0), (3, 1.0), (4, 2.0)]
+    ]
+    table = QuestionTable(PythonQuestion, 1, rows)
+    rng = random.Random(2)
+
+    selected = table.sample_many(3, rng=rng, weighted=True)
+    assert sorted(selected) == [1, 3, 4]
+    # Вопрос с нулевым весом выбирается, только когда других не осталось
+    assert sorted(table.sample_many(10, exclude={1}, rng=rng, weighted=True)) == [
+        2,
+        3,
+        4,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_select_questions_rejects_unknown_mode():
+    bank = QuestionBank(check_interval=60)
+    session = FakeSession()
+
+    assert sorted(await bank.select_questions(session, "pythonn", 10)) == [1, 7]
+    with pytest.raises(ValueError):
+        await bank.select_questions(session, "pythonn", 10, mode="popular")
+
+
+@pytest.mark.asyncio
+async def test_missing_version_row_is_version_zero():
+    """База без миграций: банк загружается с нулевой версией и не перечитывается"""
+    bank = QuestionBank(check_interval=0)
+    session = FakeSession()
+
+    assert list(await bank.ids(session, "golangquestions")) == [1, 7]
+    session.version = 0
+    await bank.ids(session, "golangquestions")
+    assert session.queries == 3  # только проверка версии
+
+
+class FakeConnection:
+    """Соединение, в котором уже есть функция и триггер pythonn"""
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+
+    async def scalar(self, statement, params=None):
+        if "to_regprocedure" in str(statement):
+            return True
+        return params["name"] == "pythonn_bank_version"
+
+
+@pytest.mark.asyncio
+async def test_install_creates_only_missing_objects():
+    conn = FakeConnection()
+
+    await install_bank_versions(conn)
+
+    statements = " ".join(conn.statements)
+    assert statements.count("ON CONFLICT (question_type) DO NOTHING") == 2
+    assert "CREATE OR REPLACE FUNCTION" not in statements
+    assert "CREATE TRIGGER golangquestions_bank_version" in statements
+    assert "CREATE TRIGGER pythonn_bank_version" not in statements
@@ -0,0 +1,35 @@
+import random
+
+from app.services.recent_questions import QuestionBitSet, RecentQuestions
+
+
+def test_bitset_roundtrip_is_compact():
+    question_ids = random.Random(1).sample(range(1, 5000), 50)
+    bitset = QuestionBitSet()
+    for question_id in question_ids:
+        bitset.add(question_id)
+
+    data = bitset.to_bytes()
+    restored = QuestionBitSet.from_bytes(data)
+
+    assert len(data) < 300
+    assert len(restored) == 50
+    assert all(question_id in restored for question_id in question_ids)
+    assert 0 not in restored
+    assert len(QuestionBitSet.from_bytes(b"")) == 0
+
+
+def test_recent_questions_rotate_generations():
+    recent = RecentQuestions()
+    recent.add([1, 2, 3], generation_size=4)
+    recent.add([1, 2, 3], generation_size=4)
+    assert len(recent.current) == 3
+
+    recent.add([4, 5], generation_size=4)
+    assert 1 in recent and 5 in recent
+    assert len(recent.current) == 0
+
+    recent.add([6, 7, 8, 9], generation_size=4)
+    # Первое поколение вытеснено
+    assert 1 not in recent
+    assert 5 not in recent and 9 in recent
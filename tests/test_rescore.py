@@ -0,0 +1,107 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from app import rescore
+from app.interview.dao import UserAnswerDAO
+from app.rescore import Checkpoint, Progress, Rescorer, Watermark
+
+
+def test_watermark_waits_for_slowest_answer():
+    watermark = Watermark(10)
+    for item_id in (11, 14, 20):
+        watermark.start(item_id)
+
+    watermark.done(14)
+    watermark.done(20)
+    assert watermark.value == 10
+
+    watermark.done(11)
+    assert watermark.value == 20
+
+
+def test_checkpoint_roundtrip(tmp_path):
+    path = str(tmp_path / "rescore.json")
+    checkpoint = Checkpoint(path, only_failed=False, question_type="pythonn")
+    checkpoint.last_id = 42
+    checkpoint.regraded = 3
+    checkpoint.interview_ids = {7, 5}
+    checkpoint.save()
+
+    loaded = Checkpoint.load(path, only_failed=False, question_type="pythonn")
+
+    assert loaded.last_id == 42
+    assert loaded.regraded == 3
+    assert loaded.interview_ids == {5, 7}
+    with pytest.raises(ValueError):
+        Checkpoint.load(path, only_failed=True, question_type="pythonn")
+
+
+def test_progress_eta():
+    progress = Progress(total=100)
+    assert progress.eta is None
+
+    progress.started -= 10
+    progress.done = 20
+
+    assert progress.rate == pytest.approx(2.0, rel=0.01)
+    assert progress.eta == pytest.approx(40.0, rel=0.01)
+
+
+class FakeSessionMaker:
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+@pytest.mark.asyncio
+async def test_failed_answer_is_retried_next_run(tmp_path, monkeypatch):
+    rows = {
+        answer_id: SimpleNamespace(id=answer_id, interview_id=1)
+        for answer_id in (1, 2, 3)
+    }
+
+    async def stream_for_rescoring(
+        session, after_id, only_failed, question_type, batch_size, only_ids=None
+    ):
+        for answer_id in sorted(rows):
+            if answer_id > after_id and (only_ids is None or answer_id in only_ids):
+                yield rows[answer_id]
+
+    async def count_for_rescoring(
+        session, after_id, only_failed, question_type, only_ids=None
+    ):
+        return 0
+
+    monkeypatch.setattr(rescore, "async_session_maker", FakeSessionMaker)
+    monkeypatch.setattr(rescore, "evaluator", SimpleNamespace(is_available=True))
+    monkeypatch.setattr(UserAnswerDAO, "stream_for_rescoring", stream_for_rescoring)
+    monkeypatch.setattr(UserAnswerDAO, "count_for_rescoring", count_for_rescoring)
+    monkeypatch.setattr(Rescorer, "finalize_interviews", lambda self: asyncio.sleep(0))
+
+    path = str(tmp_path / "rescore.json")
+    processed = []
+
+    async def rescore_answer(self, row):
+        processed.append(row.id)
+        # Ответ 2 не удаётся оценить в первом запуске
+        return row.id != 2 or processed.count(2) > 1
+
+    monkeypatch.setattr(Rescorer, "_rescore", rescore_answer)
+
+    first = Rescorer(Checkpoint.load(path), 2, 10, 60)
+    await first.run(asyncio.Event())
+
+    saved = Checkpoint.load(path)
+    assert saved.last_id == 3
+    assert saved.retry_ids == {2}
+
+    second = Rescorer(saved, 2, 10, 60)
+    await second.run(asyncio.Event())
+
+    assert sorted(processed) == [1, 2, 2, 3]
+    assert not os.path.exists(path)
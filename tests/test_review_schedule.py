@@ -0,0 +1,144 @@
+import os
+
+import pytest
+from sqlalchemy import text
+
+from app.interview import review_schedule
+from app.interview.review_schedule import (
+    install_review_trigger,
+    review_function_body,
+    review_function_sql,
+)
+
+# Триггер проверяется на настоящей базе: postgresql+asyncpg://...
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+
+class FakeConnection:
+    """Соединение с заданными установленной функцией и триггером"""
+
+    def __init__(self, body=None, trigger=False):
+        self.body = body
+        self.trigger = trigger
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+
+    async def scalar(self, statement, params=None):
+        return self.body if "prosrc" in str(statement) else self.trigger
+
+
+def test_function_takes_thresholds_from_settings(monkeypatch):
+    monkeypatch.setattr(review_schedule.settings, "REVIEW_PASS_SCORE", 0.75)
+    monkeypatch.setattr(review_schedule.settings, "REVIEW_BASE_INTERVAL_DAYS", 2)
+    monkeypatch.setattr(review_schedule.settings, "REVIEW_MAX_INTERVAL_DAYS", 30)
+
+    sql = review_function_sql()
+
+    assert "NEW.score >= 0.75" in sql
+    assert "interval '1 day' * 2.0 * power(2" in sql
+    assert "interval '1 day' * 30.0)" in sql
+    assert "0.6" not in sql
+
+
+@pytest.mark.asyncio
+async def test_install_creates_missing_function_and_trigger():
+    conn = FakeConnection()
+
+    await install_review_trigger(conn)
+
+    assert "pg_advisory_xact_lock" in conn.statements[0]
+    assert "CREATE OR REPLACE FUNCTION record_question_review()" in conn.statements[1]
+    assert "CREATE TRIGGER user_answers_question_review" in conn.statements[2]
+    assert not any("DROP" in statement for statement in conn.statements)
+
+
+@pytest.mark.asyncio
+async def test_install_skips_unchanged_function():
+    conn = FakeConnection(body=review_function_body(), trigger=True)
+
+    await install_review_trigger(conn)
+
+    # Обычный перезапуск: только блокировка установки, user_answers не трогается
+    assert len(conn.statements) == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not POSTGRES_URL, reason="нужен TEST_POSTGRES_URL")
+async def test_trigger_schedules_reviews():
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(POSTGRES_URL)
+    try:
+        async with engine.connect() as conn:
+            transaction = await conn.begin()
+            # Всё в отдельной схеме и откатывается в конце теста
+            await conn.execute(text("CREATE SCHEMA review_schedule_test"))
+            await conn.execute(text("SET LOCAL search_path TO review_schedule_test"))
+            await conn.execute(text("""
+                CREATE TABLE interviews (
+                    id integer PRIMARY KEY, user_id integer NOT NULL
+                )
+                """))
+            await conn.execute(text("""
+                CREATE TABLE user_answers (
+                    id integer PRIMARY KEY, interview_id integer NOT NULL,
+                    question_type varchar NOT NULL, question_id integer NOT NULL,
+                    score double precision
+                )
+                """))
+            await conn.execute(text("""
+                CREATE TABLE user_question_reviews (
+                    user_id integer, question_type varchar, question_id integer,
+                    answer_id integer NOT NULL, score double precision NOT NULL,
+                    box integer NOT NULL, previous_box integer NOT NULL,
+                    reviewed_at timestamp NOT NULL, due_at timestamp NOT NULL,
+                    PRIMARY KEY (user_id, question_type, question_id)
+                )
+                """))
+            await conn.execute(text("INSERT INTO interviews VALUES (1, 7), (2, 7)"))
+            await install_review_trigger(conn)
+
+            async def review():
+                result = await conn.execute(text("""
+                    SELECT answer_id, box, round(
+                        extract(epoch FROM due_at - reviewed_at) / 86400
+                    ) AS days
+                    FROM user_question_reviews
+                    WHERE user_id = 7 AND question_type = 'pythonn'
+                      AND question_id = 5
+                    """))
+                return tuple(result.one())
+
+            # Верный ответ — первое повторение через день
+            await conn.execute(
+                text("INSERT INTO user_answers VALUES (10, 1, 'pythonn', 5, 0.8)")
+            )
+            assert await review() == (10, 1, 1)
+
+            # Переоценка того же ответа заменяет его результат
+            await conn.execute(
+                text("UPDATE user_answers SET score = 0.3 WHERE id = 10")
+            )
+            assert await review() == (10, 0, 0)
+            await conn.execute(
+                text("UPDATE user_answers SET score = 0.9 WHERE id = 10")
+            )
+            assert await review() == (10, 1, 1)
+
+            # Новый верный ответ — следующий шаг, интервал удваивается
+            await conn.execute(
+                text("INSERT INTO user_answers VALUES (11, 2, 'pythonn', 5, 0.9)")
+            )
+            assert await review() == (11, 2, 2)
+
+            # Переоценка более старого ответа расписание не меняет
+            await conn.execute(
+                text("UPDATE user_answers SET score = 0.1 WHERE id = 10")
+            )
+            assert await review() == (11, 2, 2)
+
+            await transaction.rollback()
+    finally:
+        await engine.dispose()
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services.scheduler import EvaluationScheduler, make_evaluation_scheduler
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_capped():
+    scheduler = EvaluationScheduler(max_concurrency=2, rate=0, burst=1)
+    active = peak = 0
+
+    async def request():
+        nonlocal active, peak
+        async with scheduler.slot("user"):
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(request() for _ in range(6)))
+
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_users_are_served_round_robin():
+    """Пользователь с длинной очередью не вытесняет остальных"""
+    scheduler = EvaluationScheduler(max_concurrency=1, rate=0, burst=1)
+    release = asyncio.Event()
+    order = []
+
+    async def request(user):
+        async with scheduler.slot(user):
+            order.append(user)
+            await release.wait()
+
+    tasks = [asyncio.create_task(request("heavy")) for _ in range(4)]
+    tasks += [asyncio.create_task(request(user)) for user in ("a", "b")]
+    await asyncio.sleep(0.01)
+    release.set()
+    await asyncio.gather(*tasks)
+
+    assert order == ["heavy", "heavy", "a", "b", "heavy", "heavy"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_frees_queue():
+    scheduler = EvaluationScheduler(max_concurrency=1, rate=0, burst=1)
+    release = asyncio.Event()
+
+    async def hold():
+        async with scheduler.slot("a"):
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    release.set()
+    await holder
+
+    assert scheduler.queue_depth == 0
+    assert scheduler._active == 0
+
+
+def test_limits_are_split_between_processes(monkeypatch):
+    monkeypatch.setattr(settings, "GIGACHAT_MAX_CONCURRENCY", 8)
+    monkeypatch.setattr(settings, "GIGACHAT_RATE_LIMIT", 2.0)
+    monkeypatch.setattr(settings, "GIGACHAT_RATE_BURST", 2)
+    monkeypatch.setattr(settings, "GIGACHAT_PROCESSES", 4)
+
+    scheduler = make_evaluation_scheduler()
+
+    assert scheduler.max_concurrency == 2
+    assert scheduler.rate == 0.5
+    # Меньше одного запроса на процесс не бывает
+    assert scheduler.burst == 1
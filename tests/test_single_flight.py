@@ -0,0 +1,121 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import settings
+from app.interview import dao
+from app.interview.dao import UserAnswerDAO
+from app.services.single_flight import SingleFlight, evaluation_flights
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_result():
+    flights = SingleFlight("test_flight")
+    calls = 0
+    release = asyncio.Event()
+
+    async def evaluate():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return 0.8, "ok"
+
+    tasks = [asyncio.create_task(flights.run("key", evaluate)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*tasks) == [(0.8, "ok")] * 5
+    assert calls == 1
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_leader_error_reaches_waiters():
+    flights = SingleFlight("test_flight")
+    release = asyncio.Event()
+
+    async def fail():
+        await release.wait()
+        raise RuntimeError("boom")
+
+    tasks = [asyncio.create_task(flights.run("key", fail)) for _ in range(2)]
+    await asyncio.sleep(0)
+    release.set()
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_waiter_retries_when_leader_is_cancelled():
+    flights = SingleFlight("test_flight")
+    calls = 0
+
+    async def evaluate():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01 if calls > 1 else 10)
+        return 1.0, "ok"
+
+    leader = asyncio.create_task(flights.run("key", evaluate))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flights.run("key", evaluate))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await waiter == (1.0, "ok")
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_single_evaluation_waits_for_batch(monkeypatch):
+    """Одиночная оценка того же ответа ждёт пакет, а не зовёт модель снова"""
+    release = asyncio.Event()
+    sent = []
+    single_calls = 0
+
+    class FakeEvaluator:
+        async def evaluate_batch(self, batch):
+            sent.append(len(batch))
+            await release.wait()
+            return [(0.9, {"feedback": "ok"})] * len(batch)
+
+        async def evaluate_answer(self, **kwargs):
+            nonlocal single_calls
+            single_calls += 1
+            return 0.1, {"feedback": "другая оценка"}
+
+    async def get_cached_evaluation(session, key, reference_answer):
+        return None
+
+    async def store_evaluation(session, key, score, evaluation, reference_answer):
+        pass
+
+    monkeypatch.setattr(dao, "evaluator", FakeEvaluator())
+    monkeypatch.setattr(settings, "EVALUATION_SINGLE_FLIGHT_DB", False)
+    monkeypatch.setattr(UserAnswerDAO, "prescore", lambda question, answer: None)
+    monkeypatch.setattr(UserAnswerDAO, "get_cached_evaluation", get_cached_evaluation)
+    monkeypatch.setattr(UserAnswerDAO, "store_evaluation", store_evaluation)
+    question = SimpleNamespace(
+        __tablename__="pythonquestions", id=1, question="Что такое GIL?", answer=None
+    )
+
+    batch = asyncio.create_task(
+        UserAnswerDAO.evaluate_answers_batch(
+            None, [(question, "Блокировка"), (question, "Блокировка")]
+        )
+    )
+    await asyncio.sleep(0.01)
+    single = asyncio.create_task(
+        UserAnswerDAO.evaluate_answer(None, question, "Блокировка")
+    )
+    await asyncio.sleep(0.01)
+    release.set()
+
+    assert await batch == [(0.9, {"feedback": "ok"})] * 2
+    assert await single == (0.9, {"feedback": "ok"})
+    # Повтор в пакете тоже не уходит модели
+    assert sent == [1]
+    assert single_calls == 0
+    assert len(evaluation_flights) == 0
@@ -0,0 +1,117 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from app import worker
+from app.interview.dao import EvaluationJobDAO
+from app.interview.models import EvaluationJobStatus
+
+
+class FakeSession:
+    """Сессия, в которой есть только заданные ответы"""
+
+    def __init__(self, answers):
+        self.answers = answers
+
+    async def get(self, model, object_id):
+        return self.answers.get(object_id)
+
+    @asynccontextmanager
+    async def begin(self):
+        yield
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    state = SimpleNamespace(
+        job=SimpleNamespace(
+            id=1,
+            user_answer_id=2,
+            status=EvaluationJobStatus.PROCESSING,
+            attempts=1,
+        ),
+        answers={},
+        marked=[],
+        finalized=[],
+    )
+
+    @asynccontextmanager
+    async def session_maker():
+        yield FakeSession(state.answers)
+
+    async def find_one_or_none_by_id(data_id, session):
+        return state.job
+
+    async def mark(session, job_id, status, error=None):
+        state.marked.append((job_id, status))
+
+    async def finalize_interview(session, interview_id):
+        state.finalized.append(interview_id)
+
+    monkeypatch.setattr(worker, "async_session_maker", session_maker)
+    monkeypatch.setattr(worker, "_finalize_interview", finalize_interview)
+    monkeypatch.setattr(
+        EvaluationJobDAO, "find_one_or_none_by_id", find_one_or_none_by_id
+    )
+    monkeypatch.setattr(EvaluationJobDAO, "mark", mark)
+    monkeypatch.setattr(worker.settings, "EVALUATION_JOB_MAX_ATTEMPTS", 3)
+    return state
+
+
+@pytest.mark.asyncio
+async def test_deleted_answer_fails_job(jobs):
+    await worker._evaluate(FakeSession({}), 1, 2)
+
+    assert jobs.marked == [(1, EvaluationJobStatus.FAILED)]
+
+
+@pytest.mark.asyncio
+async def test_error_on_last_attempt_fails_job(jobs, monkeypatch):
+    async def evaluate(session, job_id, user_answer_id):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(worker, "_evaluate", evaluate)
+    jobs.answers[2] = SimpleNamespace(id=2, interview_id=5)
+
+    # Попытки остались — задание заберут повторно по таймауту
+    await worker.process_job(1, 2)
+    assert jobs.marked == []
+
+    jobs.job.attempts = 3
+    await worker.process_job(1, 2)
+    assert jobs.marked == [(1, EvaluationJobStatus.FAILED)]
+    assert jobs.finalized == [5]
+
+
+@pytest.mark.asyncio
+async def test_half_open_breaker_gets_one_job(monkeypatch):
+    stop = asyncio.Event()
+    state = SimpleNamespace(limits=[], running=0, max_running=0)
+
+    async def claim_jobs(limit):
+        state.limits.append(limit)
+        if len(state.limits) == 3:
+            stop.set()
+        return [(len(state.limits), len(state.limits))]
+
+    async def process_job(job_id, user_answer_id):
+        state.running += 1
+        state.max_running = max(state.max_running, state.running)
+        await asyncio.sleep(0.02)
+        state.running -= 1
+
+    monkeypatch.setattr(worker, "claim_jobs", claim_jobs)
+    monkeypatch.setattr(worker, "process_job", process_job)
+    monkeypatch.setattr(
+        worker, "evaluator", SimpleNamespace(is_available=True, is_probing=True)
+    )
+    monkeypatch.setattr(worker.settings, "EVALUATION_WORKER_CONCURRENCY", 8)
+    monkeypatch.setattr(worker.settings, "EVALUATION_WORKER_POLL_INTERVAL", 0.01)
+
+    await asyncio.wait_for(worker.run_worker(stop), timeout=5)
+
+    # Следующее задание берётся только после результата пробного
+    assert state.limits == [1, 1, 1]
+    assert state.max_running == 1